@@ -1,130 +1,76 @@
 # -*- coding: utf-8 -*-
-import requests
 import pytest
-from collections import namedtuple
-import glob
 import os
-import json
+import sys
 import logging
 import re
 import warnings
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utility'))
+from chain_registry import load_registry
+from endpoint_prober import probe_endpoints
+import endpoint_cases
+import instrumentation
+
 # Setup basic configuration for logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-EndpointTest = namedtuple('EndpointTest', ['chain', 'endpoint', 'provider', 'address'])
-
-# Set this to False to ignore the whitelist and process all providers
-use_whitelist = True
-
-# Whitelist for specific chains and providers
-whitelist = {
-    # If chains whitelist empty, all chains will be evaluated.
-    "chains": [
-        # "axelar",
-        # "celestia",
-        # "composable",
-        # "cosmoshub",
-        # "dydx",
-        # "dymension",
-        # "evmos",
-        # "injective",
-        # "neutron",
-        # "noble",
-        # "osmosis",
-        # "stargaze",
-        # "stride"
-    ],
-    "providers": [
-        # "Osmosis Foundation",
-        # "Polkachu",
-        # "CryptoCrew",
-        # # "forbole",
-        # "Imperator.co",
-        # # "Lavender.Five Nodes 🐝",
-        # # "WhisperNode 🤐",
-        # "chainlayer",
-        # "Numia",
-        # # "Enigma",
-        # # "kjnodes",
-        # # "Stake&Relax 🦥",
-        # "Allnodes ⚡️ Nodes & Staking",
-        # "Lava",
-        # "Golden Ratio Staking",
-        # "Stargaze Foundation",
-    ]
-} if use_whitelist else {'chains': [], 'providers': []}
+# REGISTRY_TRACE=trace.json writes a Chrome trace of the run (see utility/instrumentation.py)
+instrumentation.from_environment()
 
-def generate_endpoint_tests():
-    test_cases = []
-    files_found = glob.glob('*/chain.json', recursive=True)
+TIMEOUT_SECONDS = 2
+CONCURRENCY = 256
+# max requests per second started against any single provider (None = unlimited)
+PROVIDER_RATE = None
+# set ENDPOINT_HISTORY to an sqlite file to keep every run's results (see utility/endpoint_history.py)
+HISTORY_PATH = os.environ.get('ENDPOINT_HISTORY')
 
-    if not files_found:
-        warnings.warn("No chain.json files found in the current directory or its subdirectories.")
+# Which endpoints are tested is chosen with --chains/--providers and --shard (or the
+# ENDPOINT_CHAINS/ENDPOINT_PROVIDERS/ENDPOINT_SHARD environment variables, see conftest.py).
+# The cases come from a cache that is only rebuilt when a chain.json changes (see utility/endpoint_cases.py).
 
-    for filename in files_found:
-        try:
-            with open(filename) as f:
-                data = json.load(f)
-                chain_name = data.get('chain_name', 'unknown')
-                if 'apis' in data:
-                    if not isinstance(data['apis'], dict):
-                        warnings.warn(f"Invalid 'apis' format in file '{filename}'. Expected a dictionary.")
-                        continue
-                    for api_type in ['rpc', 'rest']:
-                        if api_type not in data['apis']:
-                            warnings.warn(f"Missing '{api_type}' key in 'apis' of file '{filename}'.")
-                            continue
-                        if not isinstance(data['apis'][api_type], list):
-                            warnings.warn(f"Invalid '{api_type}' format in 'apis' of file '{filename}'. Expected a list.")
-                            continue
-                        for api in data['apis'].get(api_type, []):
-                            if 'provider' not in api:
-                                warnings.warn(f"Missing 'provider' key in '{api_type}' of file '{filename}'.")
-                                continue
-                            if not isinstance(api['provider'], str):
-                                warnings.warn(f"Invalid 'provider' format in '{api_type}' of file '{filename}'. Expected a string.")
-                                continue
-                            if (
-                                not use_whitelist or
-                                (not whitelist['chains'] or chain_name in whitelist['chains']) and
-                                (not whitelist['providers'] or api['provider'] in whitelist['providers'])
-                            ):
-                                address = api.get('address')
-                                if not address:
-                                    warnings.warn(f"Missing 'address' key in '{api_type}' of file '{filename}'.")
-                                    continue
-                                if api_type == 'rpc':
-                                    address += '/status'
-                                elif api_type == 'rest':
-                                    address += '/cosmos/base/tendermint/v1beta1/syncing'
-                                test_cases.append(EndpointTest(chain=chain_name, endpoint=api_type, provider=api['provider'], address=address))
-                else:
-                    warnings.warn(f"Missing 'apis' key in file '{filename}'.")
-        except json.JSONDecodeError as e:
-            warnings.warn(f"Failed to decode JSON file '{filename}': {str(e)}")
-        except Exception as e:
-            warnings.warn(f"An error occurred while processing file '{filename}': {str(e)}")
+def generate_endpoint_tests(registry=None):
+    test_cases, problems = endpoint_cases.build_cases(registry or load_registry())
+    for problem in problems:
+        warnings.warn(problem)
+    return test_cases
 
+def selected_test_cases(config):
+    test_cases, problems = endpoint_cases.load_cases()
+    for problem in problems:
+        warnings.warn(problem)
+    test_cases = endpoint_cases.select(test_cases, endpoint_cases.split_names(config.getoption('chains')),
+                                       endpoint_cases.split_names(config.getoption('providers')))
+    if config.getoption('shard'):
+        test_cases = endpoint_cases.shard(test_cases, *config.getoption('shard'), by=config.getoption('shard_by'))
     return test_cases
 
-test_cases = generate_endpoint_tests()
+def test_id(test_case):
+    return f"{test_case.chain}-{test_case.endpoint}-{re.sub(r'[^a-zA-Z0-9]+', ' ', test_case.provider).strip()}"
 
-def generate_test_function(test_case):
-    def test(self):
-        try:
-            response = requests.get(test_case.address, timeout=2)
-            assert response.status_code == 200, f"{test_case.chain.upper()}-{test_case.endpoint.upper()}-{test_case.provider} endpoint not reachable"
-        except requests.exceptions.Timeout:
-            logging.error(f"{test_case.chain.upper()}-{test_case.endpoint.upper()}-{test_case.provider} endpoint timed out after 2 seconds")
-            pytest.fail(f"{test_case.chain.upper()}-{test_case.endpoint.upper()}-{test_case.provider} endpoint timed out after 2 seconds")
-    return test
+def pytest_generate_tests(metafunc):
+    if 'endpoint_test' in metafunc.fixturenames:
+        test_cases = selected_test_cases(metafunc.config)
+        metafunc.parametrize('endpoint_test', test_cases, ids=[test_id(test_case) for test_case in test_cases])
 
-class Test:
-    pass
+@pytest.fixture(scope='session')
+def probe_results(request):
+    # every selected endpoint is probed once, concurrently, the first time a test asks for a result
+    selected = [item.callspec.params['endpoint_test'] for item in request.session.items
+                if hasattr(item, 'callspec') and 'endpoint_test' in item.callspec.params]
+    results = probe_endpoints(selected, timeout=TIMEOUT_SECONDS, concurrency=CONCURRENCY, provider_rate=PROVIDER_RATE)
+    if HISTORY_PATH:
+        from endpoint_history import open_history
+        with open_history(HISTORY_PATH) as history:
+            history.record(results)
+    return {result.test: result for result in results}
 
-for test_case in test_cases:
-    test_name = f"chain: {test_case.chain.capitalize()[:15].ljust(15)} ▌ {test_case.endpoint.upper()[:4].ljust(4)} ▌ {re.sub(r'[^a-zA-Z0-9]+', ' ', test_case.provider)[:30].ljust(30)}"
-    generate_tests = generate_test_function(test_case)
-    setattr(Test, test_name, generate_tests)
+class Test:
 
+    def chain(self, probe_results, endpoint_test):
+        result = probe_results[endpoint_test]
+        label = f"{endpoint_test.chain.upper()}-{endpoint_test.endpoint.upper()}-{endpoint_test.provider}"
+        if result.error == 'Timeout':
+            logging.error(f"{label} endpoint timed out after {TIMEOUT_SECONDS} seconds")
+            pytest.fail(f"{label} endpoint timed out after {TIMEOUT_SECONDS} seconds")
+        assert result.status == 200, f"{label} endpoint not reachable ({result.error or result.status})"
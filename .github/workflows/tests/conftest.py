@@ -0,0 +1,31 @@
+# Options selecting which endpoints apis.py tests, each with an environment variable
+# for when pytest's arguments can't be changed, e.g.
+#   pytest .github/workflows/tests --chains osmosis,cosmoshub
+#   ENDPOINT_PROVIDERS=Polkachu ENDPOINT_SHARD=1/4 pytest .github/workflows/tests
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utility'))
+import endpoint_cases
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('endpoints', 'endpoint selection (see utility/endpoint_cases.py)')
+    group.addoption('--chains', default=os.environ.get('ENDPOINT_CHAINS'),
+                    help="comma separated chain names to test (env ENDPOINT_CHAINS, default: all)")
+    group.addoption('--providers', default=os.environ.get('ENDPOINT_PROVIDERS'),
+                    help="comma separated provider names to test (env ENDPOINT_PROVIDERS, default: all)")
+    group.addoption('--shard', type=endpoint_cases.parse_shard, metavar='INDEX/COUNT',
+                    default=os.environ.get('ENDPOINT_SHARD'),
+                    help="only test shard INDEX of COUNT, numbered from 1 (env ENDPOINT_SHARD)")
+    group.addoption('--shard-by', choices=endpoint_cases.shardKeys,
+                    default=os.environ.get('ENDPOINT_SHARD_BY', 'chain'),
+                    help="keep the endpoints of one chain or one provider in the same shard (env ENDPOINT_SHARD_BY)")
+    group.addoption('--rebuild-cases', action='store_true',
+                    help="rebuild the saved endpoint cases from the registry")
+
+
+def pytest_configure(config):
+    # (re)build the saved cases before collection, which reads them back in apis.py;
+    # every endpoint is probed concurrently in this one process, so there are no workers to share them with
+    endpoint_cases.load_cases(rebuild=config.getoption('rebuild_cases'))
@@ -0,0 +1,295 @@
+# Purpose:
+#   to time the Python tooling on synthetic registries 1x, 10x and 100x the
+#   size of this one, and print the timings as JSON so runs can be compared
+#   over time. A synthetic registry at scale N is N renamed copies of the real
+#   chains and _IBC files. Covered: loading the registry (cold and from the
+#   parse cache), generate_endpoint_tests() from tests/apis.py, checkChains()
+#   with stubbed SLIP tables, the _IBC validator, and endpoint probing against
+#   a local stub server with injected latency.
+#
+# Usage:
+#   python benchmarks.py [--scales 1,10,100] [--repeat 3] [--output results.json]
+#                        [--latency-ms 20] [--max-probes 10000] [--workdir DIR]
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import warnings
+
+from chain_registry import chainRegistryRoot, fileToFileNameMap, ibc_pair, load_registry
+
+BENCHMARK_VERSION = 1
+testsDirectory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests")
+
+
+def copy_suffix(copy):
+    # copy 0 keeps the real names; "x" keeps the copies from colliding with real names like terra2
+    return f"x{copy}" if copy else ""
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+def make_synthetic_registry(source, root, scale):
+    # `scale` renamed copies of every chain and _IBC file of the source registry
+    for copy in range(scale):
+        suffix = copy_suffix(copy)
+        for chain in source.chains.values():
+            directory = os.path.join(os.path.dirname(chain.directory), chain.name + suffix)
+            for file, file_name in fileToFileNameMap.items():
+                data = getattr(chain, file)
+                if data is None:
+                    continue
+                data = dict(data, chain_name=chain.name + suffix)
+                if file == "chain" and "chain_id" in data:
+                    data["chain_id"] += suffix
+                _write_json(os.path.join(root, directory, file_name), data)
+        for connection in source.ibc.values():
+            data = connection.data
+            # renaming can change the alphabetical order of the pair, and with it which side is chain_1
+            first, second = "chain_1", "chain_2"
+            names = (data[first]["chain_name"] + suffix, data[second]["chain_name"] + suffix)
+            if ibc_pair(*names) != names:
+                first, second = second, first
+                names = names[::-1]
+            copied = dict(data, chain_1=dict(data[first], chain_name=names[0]),
+                          chain_2=dict(data[second], chain_name=names[1]))
+            copied["channels"] = [dict(channel, chain_1=channel[first], chain_2=channel[second])
+                                  for channel in data.get("channels", [])]
+            file_name = "-".join(names) + ".json"
+            _write_json(os.path.join(root, os.path.dirname(connection.file), file_name), copied)
+
+
+def stub_slip_state(registry):
+    # validate_data's SLIP tables, built from the registry itself so every chain passes the SLIP checks
+    websites, mainnet, testnet, by_number, by_name = {}, {}, {}, {}, {}
+    for chain in registry.chains.values():
+        data = chain.chain or {}
+        pretty_name = data.get("pretty_name")
+        if not pretty_name:
+            continue
+        websites[pretty_name] = data.get("website", "")
+        prefixes = testnet if data.get("network_type") == "testnet" else mainnet
+        if "bech32_prefix" in data:
+            prefixes.setdefault(pretty_name, data["bech32_prefix"])
+        if "slip44" in data:
+            by_name.setdefault(pretty_name, data["slip44"])
+            by_number.setdefault(data["slip44"], pretty_name)
+    return (1, 1, websites, mainnet, testnet, by_number, by_name)
+
+
+class StubServer:
+    # aiohttp server on `ports` local ports (so the prober's per-host limit applies as for real
+    # providers) that answers every GET like an rpc /status after `latency` seconds
+
+    def __init__(self, latency, ports=32):
+        self.latency = latency
+        self.port_count = ports
+        self.ports = []
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    async def _handle(self, request):
+        from aiohttp import web
+        await asyncio.sleep(self.latency)
+        return web.json_response({"result": {"sync_info": {"latest_block_height": "1", "catching_up": False}}})
+
+    async def _start(self):
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        for _ in range(self.port_count):
+            site = web.TCPSite(self._runner, "127.0.0.1", 0)
+            await site.start()
+            self.ports.append(site._server.sockets[0].getsockname()[1])
+
+    def __enter__(self):
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return self
+
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+def stub_tests(tests, ports):
+    # the same endpoint tests, each provider pinned to one stub port
+    from endpoint_prober import EndpointTest
+    port_of = {}
+    stubbed = []
+    for index, test in enumerate(tests):
+        port = port_of.setdefault(test.provider, ports[len(port_of) % len(ports)])
+        path = test.address[test.address.find("/", test.address.find("//") + 2):] if "//" in test.address else ""
+        stubbed.append(EndpointTest(test.chain, test.endpoint, test.provider, f"http://127.0.0.1:{port}/{index}{path}"))
+    return stubbed
+
+
+def measure(function, repeat):
+    # -> (result of the last call, [seconds per call]); like timeit, the garbage collector is off
+    # while timing, otherwise the registries already in memory make every run pay for full collections
+    times = []
+    result = None
+    for _ in range(repeat):
+        result = None
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            result = function()
+            times.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return result, times
+
+
+def result_entry(name, scale, items, times, **extra):
+    best = min(times)
+    return {
+        "name": name,
+        "scale": scale,
+        "items": items,
+        "min_seconds": round(best, 6),
+        "median_seconds": round(statistics.median(times), 6),
+        "runs": [round(t, 6) for t in times],
+        "per_item_us": round(best / items * 1e6, 3) if items else None,
+        **extra,
+    }
+
+
+def import_apis():
+    sys.path.insert(0, os.path.abspath(testsDirectory))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        import apis
+    return apis
+
+
+def benchmark_scale(source, root, scale, repeat, latency, max_probes):
+    import ibc_validator
+    import validate_data
+    from endpoint_prober import endpoint_tests, probe_endpoints
+
+    results = []
+    make_synthetic_registry(source, root, scale)
+
+    registry, times = measure(lambda: load_registry(root, use_cache=False), repeat)
+    files = registry.files_loaded
+    results.append(result_entry("load_registry_cold", scale, files, times, chains=len(registry.chains),
+                                assets=sum(len(v) for v in registry.assets_by_base.values()), ibc_files=len(registry.ibc)))
+    cache_path = os.path.join(root, ".cache", "benchmark_registry.pickle")
+    load_registry(root, cache_path=cache_path)
+    _, times = measure(lambda: load_registry(root, cache_path=cache_path), repeat)
+    results.append(result_entry("load_registry_warm", scale, files, times))
+
+    apis = import_apis()
+
+    def generate():
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return apis.generate_endpoint_tests(registry)
+    cases, times = measure(generate, repeat)
+    results.append(result_entry("generate_endpoint_tests", scale, len(cases), times))
+
+    # the stub tables stand in for validate_data's own only while it is measured
+    saved = tuple(dict(value) if isinstance(value, dict) else value for value in validate_data.slipState())
+    validate_data.initWorker(stub_slip_state(registry))
+    try:
+        report, times = measure(lambda: validate_data.checkChains(registry), repeat)
+    finally:
+        validate_data.initWorker(saved)
+    results.append(result_entry("check_chains", scale, report["chains_checked"], times, jobs=report["jobs"]))
+
+    checked, times = measure(lambda: ibc_validator.validate(root), repeat)
+    results.append(result_entry("ibc_validate", scale, len(checked), times))
+
+    tests = [test for chain in registry.iter_chains("mainnet", "cosmos") if chain.chain
+             for test in endpoint_tests(chain.chain)]
+    capped = len(tests) > max_probes
+    tests = tests[:max_probes]
+    with StubServer(latency) as server:
+        stubbed = stub_tests(tests, server.ports)
+        probed, times = measure(lambda: probe_endpoints(stubbed, timeout=max(2, latency * 10)), repeat)
+    ok = sum(1 for result in probed if result.status == 200)
+    results.append(result_entry("probe_endpoints", scale, len(stubbed), times, ok=ok, latency_ms=latency * 1000,
+                                capped=capped))
+    return results
+
+
+def git_commit(root):
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=root, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(scales=(1, 10, 100), repeat=3, latency=0.02, max_probes=10000, source_root=None, workdir=None):
+    source = load_registry(source_root, use_cache=False)
+    output = {
+        "version": BENCHMARK_VERSION,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "commit": git_commit(source.root),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": [],
+    }
+    base = workdir or tempfile.mkdtemp(prefix="registry-benchmark-")
+    try:
+        for scale in scales:
+            root = os.path.join(base, f"scale-{scale}")
+            shutil.rmtree(root, ignore_errors=True)
+            output["results"].extend(benchmark_scale(source, root, scale, repeat, latency, max_probes))
+            if workdir is None:
+                shutil.rmtree(root, ignore_errors=True)
+    finally:
+        if workdir is None:
+            shutil.rmtree(base, ignore_errors=True)
+    return output
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the registry tooling on scaled synthetic registries.")
+    parser.add_argument("--scales", default="1,10,100", help="comma separated registry multiples")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement (min and median are reported)")
+    parser.add_argument("--latency-ms", type=float, default=20, help="stub server response delay")
+    parser.add_argument("--max-probes", type=int, default=10000, help="endpoints probed per scale at most")
+    parser.add_argument("--source", default=chainRegistryRoot, help="registry to scale up")
+    parser.add_argument("--workdir", help="keep the synthetic registries here instead of a temporary directory")
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    output = run_benchmarks([int(scale) for scale in args.scales.split(",")], args.repeat, args.latency_ms / 1000,
+                            args.max_probes, args.source, args.workdir)
+    text = json.dumps(output, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    for result in output["results"]:
+        print(f"{result['name']:<24} {result['scale']:>4}x {result['items']:>8} items "
+              f"{result['min_seconds'] * 1000:10.1f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
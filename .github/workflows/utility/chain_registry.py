@@ -0,0 +1,300 @@
+# Purpose:
+#   to load the whole chain registry in a single pass and provide lookup
+#   indexes over it to the other python tools (the python counterpart of
+#   chain_registry.mjs)
+#
+# Usage:
+#   registry = chain_registry.load_registry()
+#   registry.chains["osmosis"].chain["chain_id"]
+#
+#   python chain_registry.py [root]   (prints what was loaded and how long it took)
+#
+#   Parsed files are kept in a pickle cache (.cache/chain_registry.pickle under
+#   the registry root). A file is only re-read when its size or mtime changed,
+#   and only re-parsed when its content hash changed too.
+
+import hashlib
+import json
+import os
+import pickle
+import sys
+import time
+from collections import namedtuple
+
+import instrumentation
+
+# default assumption is that the tools run from .github/workflows/utility
+chainRegistryRoot = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+
+networkTypeToDirectoryNameMap = {
+    "mainnet": "",
+    "testnet": "testnets",
+}
+
+domainToDirectoryNameMap = {
+    "cosmos": "",
+    "non-cosmos": "_non-cosmos",
+}
+
+fileToFileNameMap = {
+    "chain": "chain.json",
+    "assetlist": "assetlist.json",
+    "versions": "versions.json",
+}
+
+ibcDirectoryName = "_IBC"
+
+defaultCachePath = os.path.join(".cache", "chain_registry.pickle")
+# bump when the cached entry layout changes
+CACHE_VERSION = 1
+
+# directory: path relative to the registry root, e.g. "testnets/osmosistestnet"
+# chain/assetlist/versions: parsed file contents, or None if the file is absent
+# (most _non-cosmos folders only have an assetlist.json)
+Chain = namedtuple("Chain", ["name", "directory", "network_type", "domain", "chain", "assetlist", "versions"])
+Asset = namedtuple("Asset", ["chain_name", "base", "asset"])
+Endpoint = namedtuple("Endpoint", ["chain_name", "api_type", "provider", "address"])
+# chain_1/chain_2: chain names in file order, file: path relative to the registry root
+IbcConnection = namedtuple("IbcConnection", ["chain_1", "chain_2", "network_type", "file", "data"])
+
+
+def is_chain_directory_name(name):
+    return not name.startswith((".", "_")) and name not in networkTypeToDirectoryNameMap.values()
+
+
+def ibc_pair(chain_a, chain_b):
+    # IBC data files are keyed by the alphabetically ordered pair of chain names
+    return tuple(sorted((chain_a, chain_b), key=str.lower))
+
+
+class Registry:
+
+    def __init__(self, root):
+        self.root = root
+        self.chains = {}            # chain_name -> Chain
+        self.chains_by_id = {}      # chain_id -> [Chain]  (a few killed chains reuse an id)
+        self.assets_by_base = {}    # base denom -> [Asset]
+        self.endpoints_by_provider = {}  # provider -> [Endpoint]
+        self.ibc = {}               # (chain_a, chain_b) -> IbcConnection
+        self.errors = []            # (path, message) for files that could not be parsed
+        self.files_loaded = 0
+        self.files_parsed = 0       # files_loaded minus cache hits
+        self.load_seconds = 0.0
+        self.parse_seconds = 0.0    # part of load_seconds spent decoding JSON
+        # relative path -> (mtime_ns, size, sha256, data)
+        self._cache = {}
+        self._cache_entries = {}
+        self._cache_dirty = False
+
+    def path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def iter_chains(self, network_type=None, domain=None):
+        for chain in self.chains.values():
+            if network_type is not None and chain.network_type != network_type:
+                continue
+            if domain is not None and chain.domain != domain:
+                continue
+            yield chain
+
+    def assets(self, chain_name):
+        chain = self.chains.get(chain_name)
+        if chain is None or not chain.assetlist:
+            return []
+        return chain.assetlist.get("assets", [])
+
+    def ibc_channels(self, chain_a, chain_b):
+        connection = self.ibc.get(ibc_pair(chain_a, chain_b))
+        return connection.data.get("channels", []) if connection else []
+
+    def _read_json(self, relative_path):
+        cached = self._cache.get(relative_path)
+        try:
+            stat = os.stat(self.path(relative_path))
+            if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+                self._cache_entries[relative_path] = cached
+                self.files_loaded += 1
+                return cached[3]
+            with open(self.path(relative_path), "rb") as f:
+                content = f.read()
+            self._cache_dirty = True
+            digest = hashlib.sha256(content).hexdigest()
+            if cached and cached[2] == digest:
+                data = cached[3]
+            else:
+                parse_start = time.perf_counter()
+                data = json.loads(content.decode("utf-8"))
+                self.parse_seconds += time.perf_counter() - parse_start
+                self.files_parsed += 1
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            self.errors.append((relative_path, str(e)))
+            return None
+        self._cache_entries[relative_path] = (stat.st_mtime_ns, stat.st_size, digest, data)
+        self.files_loaded += 1
+        return data
+
+    def _read_cache(self, cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                version, entries = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+            return
+        if version == CACHE_VERSION:
+            self._cache = entries
+
+    def _write_cache(self, cache_path):
+        # only rewrite the cache when a file was read from disk or went away
+        if not self._cache_dirty and len(self._cache_entries) == len(self._cache):
+            return
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        temp_path = cache_path + ".tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump((CACHE_VERSION, self._cache_entries), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+
+    def _add_chain(self, directory, network_type, domain, names):
+        files = {}
+        for file, file_name in fileToFileNameMap.items():
+            if file_name in names:
+                files[file] = self._read_json(os.path.join(directory, file_name))
+            else:
+                files[file] = None
+        if not any(isinstance(data, dict) for data in files.values()):
+            return
+        chain_data = files["chain"] or {}
+        named = next(data for data in files.values() if isinstance(data, dict))
+        chain = Chain(
+            name=named.get("chain_name", os.path.basename(directory)),
+            directory=directory,
+            network_type=network_type,
+            domain=domain,
+            chain=files["chain"],
+            assetlist=files["assetlist"],
+            versions=files["versions"],
+        )
+        self.chains[chain.name] = chain
+        if "chain_id" in chain_data:
+            self.chains_by_id.setdefault(chain_data["chain_id"], []).append(chain)
+        for asset in (chain.assetlist or {}).get("assets", []):
+            if "base" in asset:
+                self.assets_by_base.setdefault(asset["base"], []).append(Asset(chain.name, asset["base"], asset))
+        apis = chain_data.get("apis")
+        if isinstance(apis, dict):
+            for api_type, endpoints in apis.items():
+                if not isinstance(endpoints, list):
+                    continue
+                for api in endpoints:
+                    if isinstance(api, dict) and isinstance(api.get("provider"), str) and api.get("address"):
+                        self.endpoints_by_provider.setdefault(api["provider"], []).append(
+                            Endpoint(chain.name, api_type, api["provider"], api["address"]))
+
+    def _add_ibc_directory(self, directory, network_type):
+        try:
+            entries = sorted(os.scandir(self.path(directory)), key=lambda entry: entry.name)
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if not entry.name.endswith(".json") or not entry.is_file():
+                continue
+            relative_path = os.path.join(directory, entry.name)
+            data = self._read_json(relative_path)
+            if not isinstance(data, dict):
+                continue
+            try:
+                chain_1 = data["chain_1"]["chain_name"]
+                chain_2 = data["chain_2"]["chain_name"]
+            except (KeyError, TypeError):
+                self.errors.append((relative_path, "missing chain_1/chain_2 chain_name"))
+                continue
+            self.ibc[ibc_pair(chain_1, chain_2)] = IbcConnection(chain_1, chain_2, network_type, relative_path, data)
+
+    def _scan(self, directory, network_type, domain):
+        # one directory level: chain folders, plus the nested domain / network folders
+        for entry in sorted(os.scandir(self.path(directory)), key=lambda entry: entry.name):
+            if not entry.is_dir():
+                continue
+            relative_path = os.path.join(directory, entry.name) if directory else entry.name
+            if entry.name == ibcDirectoryName:
+                self._add_ibc_directory(relative_path, network_type)
+            elif entry.name == domainToDirectoryNameMap["non-cosmos"] and domain == "cosmos":
+                self._scan(relative_path, network_type, "non-cosmos")
+            elif entry.name == networkTypeToDirectoryNameMap["testnet"] and network_type == "mainnet" and not directory:
+                self._scan(relative_path, "testnet", domain)
+            elif is_chain_directory_name(entry.name):
+                self._add_chain(relative_path, network_type, domain, set(os.listdir(entry.path)))
+
+
+def file_stats(root=None):
+    # relative path -> (mtime_ns, size) of every file load_registry reads, to spot changes without reading them
+    root = os.path.abspath(root or chainRegistryRoot)
+    stats = {}
+
+    def add(relative_path, entry):
+        stat = entry.stat()
+        stats[relative_path] = (stat.st_mtime_ns, stat.st_size)
+
+    def scan(directory, network_type, domain):
+        for entry in os.scandir(os.path.join(root, directory)):
+            if not entry.is_dir():
+                continue
+            relative_path = os.path.join(directory, entry.name) if directory else entry.name
+            if entry.name == ibcDirectoryName:
+                for file in os.scandir(entry.path):
+                    if file.name.endswith(".json") and file.is_file():
+                        add(os.path.join(relative_path, file.name), file)
+            elif entry.name == domainToDirectoryNameMap["non-cosmos"] and domain == "cosmos":
+                scan(relative_path, network_type, "non-cosmos")
+            elif entry.name == networkTypeToDirectoryNameMap["testnet"] and network_type == "mainnet" and not directory:
+                scan(relative_path, "testnet", domain)
+            elif is_chain_directory_name(entry.name):
+                for file in os.scandir(entry.path):
+                    if file.name in fileToFileNameMap.values():
+                        add(os.path.join(relative_path, file.name), file)
+
+    scan("", "mainnet", "cosmos")
+    return stats
+
+
+def load_registry(root=None, cache_path=None, use_cache=True):
+    # cache_path defaults to defaultCachePath under the registry root
+    registry = Registry(os.path.abspath(root or chainRegistryRoot))
+    cache_path = cache_path or registry.path(defaultCachePath)
+    start = time.perf_counter()
+    with instrumentation.span("load_registry", root=registry.root) as span:
+        if use_cache:
+            with instrumentation.span("read_cache"):
+                registry._read_cache(cache_path)
+        registry._scan("", "mainnet", "cosmos")
+        if use_cache:
+            with instrumentation.span("write_cache"):
+                try:
+                    registry._write_cache(cache_path)
+                except OSError as e:
+                    print(f"[!] could not write registry cache {cache_path}: {e}", file=sys.stderr)
+        registry._cache = registry._cache_entries = {}
+        registry.load_seconds = time.perf_counter() - start
+        span.set(files_loaded=registry.files_loaded, files_parsed=registry.files_parsed,
+                 parse_seconds=round(registry.parse_seconds, 4))
+    return registry
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    registry = load_registry(argv[0] if argv else None)
+    print(f"loaded {registry.files_loaded} files ({registry.files_parsed} parsed, "
+          f"{registry.files_loaded - registry.files_parsed} from cache) from {registry.root} "
+          f"in {registry.load_seconds * 1000:.0f} ms ({registry.parse_seconds * 1000:.0f} ms decoding JSON)")
+    for network_type in networkTypeToDirectoryNameMap:
+        for domain in domainToDirectoryNameMap:
+            print(f"  {network_type:<8} {domain:<11} {sum(1 for _ in registry.iter_chains(network_type, domain))} chains")
+    print(f"  {len(registry.assets_by_base)} asset bases, {len(registry.endpoints_by_provider)} providers, "
+          f"{len(registry.ibc)} IBC connections")
+    for path, message in registry.errors:
+        print(f"  [!] {path}: {message}")
+    return 1 if registry.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+# Purpose:
+#   to resolve every asset in the assetlists to the denom path it has on
+#   chain and to the chain it originally comes from, in one pass over the
+#   registry. IBC denoms are recomputed as ibc/SHA256(path) from the traces and
+#   the _IBC channel data and checked against the declared `base`. The result
+#   is a precomputed (chain, denom) -> ResolvedDenom map for dict-speed lookups.
+#
+# Usage:
+#   resolver = denom_traces.DenomResolver.from_registry(load_registry())
+#   resolver.lookup("osmosis", "ibc/27394FB0...").origin_chain
+#
+#   python denom_traces.py check
+#   python denom_traces.py resolve osmosis ibc/27394FB092D2ECCD56123C74F36E4C1F926001CEADA9CA97EA622B25F41E5EB2
+
+import argparse
+import hashlib
+import sys
+from collections import namedtuple
+
+from chain_registry import load_registry
+from ibc_graph import IbcGraph
+
+# path: full ics20 denom path on `chain` ("transfer/channel-0/uatom"; the base itself for native assets)
+# origin_chain/origin_denom: where the asset is native, following ibc hops only
+ResolvedDenom = namedtuple("ResolvedDenom", ["chain", "denom", "path", "origin_chain", "origin_denom", "asset"])
+TraceMismatch = namedtuple("TraceMismatch", ["chain", "base", "message"])
+
+# trace types that describe an ics20 transfer, i.e. that give the asset an ibc/ denom
+IBC_TRACE_TYPES = ("ibc", "ibc-cw20", "ibc-bridge")
+
+
+def ibc_denom(path):
+    # the on-chain denom of an ics20 voucher with the given full path
+    return "ibc/" + hashlib.sha256(path.encode("utf-8")).hexdigest().upper()
+
+
+class DenomResolver:
+
+    def __init__(self):
+        self.by_chain = {}      # chain -> denom -> ResolvedDenom
+        self.mismatches = []    # TraceMismatch
+
+    @classmethod
+    def from_registry(cls, registry, graph=None):
+        resolver = cls()
+        resolver._resolve_all(registry, graph or IbcGraph.from_registry(registry))
+        return resolver
+
+    def lookup(self, chain, denom):
+        denoms = self.by_chain.get(chain)
+        return denoms.get(denom) if denoms else None
+
+    def __len__(self):
+        return sum(len(denoms) for denoms in self.by_chain.values())
+
+    def _resolve_all(self, registry, graph):
+        assets = {}
+        for chain in registry.chains.values():
+            for asset in (chain.assetlist or {}).get("assets", []):
+                if isinstance(asset, dict) and "base" in asset:
+                    assets[(chain.name, asset["base"])] = asset
+        resolving = set()
+
+        def port_for(chain, trace):
+            # the port the voucher arrived on: declared, else from the _IBC channel, else ics20's default
+            side = trace.get("chain", {})
+            if side.get("port"):
+                return side["port"]
+            counterparty = trace["counterparty"]["chain_name"]
+            for channel in graph.channels_between(chain, counterparty):
+                if channel.channel_id == side.get("channel_id"):
+                    return channel.port_id
+            return "transfer"
+
+        def resolve(chain, base):
+            key = (chain, base)
+            denoms = self.by_chain.setdefault(chain, {})
+            if base in denoms:
+                return denoms[base]
+            asset = assets[key]
+            traces = asset.get("traces") or []
+            last = traces[-1] if traces else None
+            if not last or last.get("type") not in IBC_TRACE_TYPES or key in resolving:
+                if key in resolving:
+                    self.mismatches.append(TraceMismatch(chain, base, "trace loop"))
+                resolved = ResolvedDenom(chain, base, base, chain, base, asset)
+                denoms[base] = resolved
+                return resolved
+
+            resolving.add(key)
+            counterparty = last["counterparty"]
+            source = (counterparty.get("chain_name"), counterparty.get("base_denom"))
+            if source in assets:
+                upstream = resolve(*source)
+                upstream_path, origin = upstream.path, (upstream.origin_chain, upstream.origin_denom)
+            else:
+                upstream_path, origin = source[1], source
+                self.mismatches.append(TraceMismatch(chain, base, f"counterparty asset {source[0]}:{source[1]} not in the registry"))
+            resolving.discard(key)
+
+            # bridged assets that keep a native denom (cw20:, 0x...) have no ics20 path to check
+            path = base
+            if base.startswith("ibc/"):
+                channel_id = last.get("chain", {}).get("channel_id")
+                declared_path = last.get("chain", {}).get("path")
+                computed_path = f"{port_for(chain, last)}/{channel_id}/{upstream_path}" if channel_id else None
+                if computed_path and ibc_denom(computed_path) == base:
+                    path = computed_path
+                elif declared_path and ibc_denom(declared_path) == base:
+                    path = declared_path
+                    if computed_path:
+                        self.mismatches.append(TraceMismatch(
+                            chain, base, f"traces give path {computed_path}, only the declared path {declared_path} matches"))
+                else:
+                    self.mismatches.append(TraceMismatch(
+                        chain, base, f"neither the traced path {computed_path} nor the declared path {declared_path} "
+                                     f"hashes to the base"))
+
+            resolved = ResolvedDenom(chain, base, path, origin[0], origin[1], asset)
+            denoms[base] = resolved
+            return resolved
+
+        for chain, base in assets:
+            resolve(chain, base)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resolve assetlist denoms to their ibc paths and origin chains.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("check", help="report traces whose computed ibc denom does not match the declared base")
+    resolve_parser = subparsers.add_parser("resolve", help="show the path and origin of one denom")
+    resolve_parser.add_argument("chain")
+    resolve_parser.add_argument("denom")
+    args = parser.parse_args(argv)
+
+    resolver = DenomResolver.from_registry(load_registry())
+    if args.command == "check":
+        for mismatch in resolver.mismatches:
+            print(f"{mismatch.chain} {mismatch.base}: {mismatch.message}")
+        print(f"{len(resolver)} denoms resolved, {len(resolver.mismatches)} problems", file=sys.stderr)
+        return 1 if resolver.mismatches else 0
+    resolved = resolver.lookup(args.chain, args.denom)
+    if resolved is None:
+        print(f"{args.chain} has no asset {args.denom}", file=sys.stderr)
+        return 1
+    print(f"{resolved.chain} {resolved.denom}\n  path   {resolved.path}\n  origin {resolved.origin_chain} {resolved.origin_denom}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+# Purpose:
+#   to precompute the endpoint test cases (one EndpointTest per rpc/rest
+#   endpoint of a mainnet cosmos chain.json) once and keep them in a cache, so
+#   collecting the endpoint suite (tests/apis.py) is a cache read instead of a
+#   registry parse in every pytest process. The cache is reused until a
+#   chain.json changes. Cases can be narrowed to some chains or providers, and
+#   split into shards by chain or provider.
+#
+# Usage:
+#   cases, problems = endpoint_cases.load_cases()
+#   cases = endpoint_cases.select(cases, chains=["osmosis"])
+#   cases = endpoint_cases.shard(cases, 1, 4, by="provider")   (the first of 4 shards)
+#
+#   python endpoint_cases.py [--cases FILE] [--chains osmosis,cosmoshub] [--shard 1/4]
+#   (prints the selected cases)
+
+import argparse
+import os
+import pickle
+import sys
+import zlib
+
+from chain_registry import chainRegistryRoot, fileToFileNameMap, is_chain_directory_name, load_registry
+from endpoint_prober import PROBE_PATHS, EndpointTest
+
+defaultCasesPath = os.path.join(chainRegistryRoot, ".cache", "endpoint_cases.pickle")
+CASES_VERSION = 1
+
+shardKeys = ("chain", "provider")
+
+
+def cases_fingerprint(root=None):
+    # cheap summary of the mainnet cosmos chain.json files (names, sizes, mtimes) to tell whether saved cases are stale
+    root = root or chainRegistryRoot
+    fingerprint = []
+    for entry in os.scandir(root):
+        if not is_chain_directory_name(entry.name) or not entry.is_dir():
+            continue
+        try:
+            stat = os.stat(os.path.join(entry.path, fileToFileNameMap["chain"]))
+        except FileNotFoundError:
+            continue
+        fingerprint.append((entry.name, stat.st_size, stat.st_mtime_ns))
+    return sorted(fingerprint)
+
+
+def _add_chain_cases(data, filename, cases, problems):
+    chain_name = data.get('chain_name', 'unknown')
+    if 'apis' not in data:
+        problems.append(f"Missing 'apis' key in file '{filename}'.")
+        return
+    if not isinstance(data['apis'], dict):
+        problems.append(f"Invalid 'apis' format in file '{filename}'. Expected a dictionary.")
+        return
+    for api_type, path in PROBE_PATHS.items():
+        if api_type not in data['apis']:
+            problems.append(f"Missing '{api_type}' key in 'apis' of file '{filename}'.")
+            continue
+        if not isinstance(data['apis'][api_type], list):
+            problems.append(f"Invalid '{api_type}' format in 'apis' of file '{filename}'. Expected a list.")
+            continue
+        for api in data['apis'][api_type]:
+            if not isinstance(api, dict) or 'provider' not in api:
+                problems.append(f"Missing 'provider' key in '{api_type}' of file '{filename}'.")
+                continue
+            if not isinstance(api['provider'], str):
+                problems.append(f"Invalid 'provider' format in '{api_type}' of file '{filename}'. Expected a string.")
+                continue
+            if not api.get('address'):
+                problems.append(f"Missing 'address' key in '{api_type}' of file '{filename}'.")
+                continue
+            cases.append(EndpointTest(chain=chain_name, endpoint=api_type, provider=api['provider'],
+                                      address=api['address'] + path))
+
+
+def build_cases(registry):
+    # -> ([EndpointTest], [problem]) for the mainnet cosmos chains, in registry order
+    cases = []
+    problems = [f"Failed to decode JSON file '{path}': {message}" for path, message in registry.errors]
+    chains_found = [chain for chain in registry.iter_chains('mainnet', 'cosmos') if chain.chain is not None]
+    if not chains_found:
+        problems.append(f"No chain.json files found in '{registry.root}'.")
+
+    for chain in chains_found:
+        filename = os.path.join(chain.directory, 'chain.json')
+        try:
+            _add_chain_cases(chain.chain, filename, cases, problems)
+        except Exception as e:
+            problems.append(f"An error occurred while processing file '{filename}': {str(e)}")
+    return cases, problems
+
+
+def save_cases(path, cases, problems, fingerprint):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + ".tmp", "wb") as f:
+        # plain tuples, so the file doesn't depend on how endpoint_prober was imported
+        pickle.dump((CASES_VERSION, fingerprint, [tuple(case) for case in cases], problems), f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + ".tmp", path)
+
+
+def load_cases(path=None, root=None, rebuild=False):
+    # the saved cases if they are up to date, otherwise build (and save) them from the registry
+    path = path or defaultCasesPath
+    fingerprint = cases_fingerprint(root)
+    if not rebuild:
+        try:
+            with open(path, "rb") as f:
+                version, saved_fingerprint, cases, problems = pickle.load(f)
+            if version == CASES_VERSION and saved_fingerprint == fingerprint:
+                return [EndpointTest._make(case) for case in cases], problems
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+            pass
+    cases, problems = build_cases(load_registry(root))
+    try:
+        save_cases(path, cases, problems, fingerprint)
+    except OSError as e:
+        print(f"[!] could not write endpoint cases {path}: {e}", file=sys.stderr)
+    return cases, problems
+
+
+def split_names(value):
+    # "osmosis, cosmoshub" -> ["osmosis", "cosmoshub"]; None or "" -> []
+    return [name.strip() for name in (value or "").split(",") if name.strip()]
+
+
+def parse_shard(value):
+    # "2/4" -> (2, 4); shards are numbered from 1
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"invalid shard {value!r}, expected INDEX/COUNT like 1/4") from None
+    if not 1 <= index <= count:
+        raise ValueError(f"invalid shard {value!r}, INDEX must be between 1 and COUNT")
+    return index, count
+
+
+def select(cases, chains=None, providers=None):
+    # keeps the cases of the given chains and providers (empty or None = all)
+    chains, providers = set(chains or ()), set(providers or ())
+    return [case for case in cases
+            if (not chains or case.chain in chains) and (not providers or case.provider in providers)]
+
+
+def shard(cases, index, count, by="chain"):
+    # the cases of shard `index` of `count`; all cases of one chain (or provider) land in the same shard,
+    # and the split is the same in every process
+    if by not in shardKeys:
+        raise ValueError(f"cannot shard by {by!r}, expected one of {shardKeys}")
+    return [case for case in cases
+            if zlib.crc32(getattr(case, by).encode("utf-8")) % count == index - 1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List the endpoint test cases, from the saved cases when up to date.")
+    parser.add_argument("--cases", default=defaultCasesPath, help="saved cases to use")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the saved cases from the registry")
+    parser.add_argument("--chains", help="comma separated chain names")
+    parser.add_argument("--providers", help="comma separated provider names")
+    parser.add_argument("--shard", type=parse_shard, metavar="INDEX/COUNT")
+    parser.add_argument("--shard-by", choices=shardKeys, default="chain")
+    args = parser.parse_args(argv)
+
+    cases, problems = load_cases(args.cases, rebuild=args.rebuild)
+    total = len(cases)
+    cases = select(cases, split_names(args.chains), split_names(args.providers))
+    if args.shard:
+        cases = shard(cases, *args.shard, by=args.shard_by)
+    for case in cases:
+        print(f"{case.chain}\t{case.endpoint}\t{case.provider}\t{case.address}")
+    print(f"{len(cases)} of {total} cases selected, {len(problems)} problems", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+# Purpose:
+#   to keep a local history of endpoint probe results (SQLite) and answer
+#   latency, uptime and last-success questions from it
+#
+# Usage:
+#   with open_history() as history:
+#       history.record(probe_results)
+#       history.uptime(days=30)
+#
+#   python endpoint_history.py [--db FILE] [--chain osmosis] [--days 30]
+#   (prints endpoints ranked by uptime, then p50 latency)
+
+import argparse
+import math
+import os
+import sqlite3
+import sys
+import time
+from collections import namedtuple
+
+from endpoint_prober import PROBE_PATHS
+
+defaultHistoryPath = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                   "..", "..", "..", ".cache", "endpoint_history.sqlite"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS probes (
+    ts REAL NOT NULL,
+    chain TEXT NOT NULL,
+    api_type TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    address TEXT NOT NULL,
+    latency REAL,
+    status INTEGER,
+    error TEXT,
+    height INTEGER
+);
+CREATE INDEX IF NOT EXISTS probes_address_ts ON probes (address, ts);
+CREATE INDEX IF NOT EXISTS probes_chain_ts ON probes (chain, ts);
+"""
+
+EndpointStats = namedtuple("EndpointStats", ["chain", "api_type", "provider", "address", "probes",
+                                             "uptime", "p50", "p95", "last_success"])
+
+
+def endpoint_address(test):
+    # the chain.json address a probe was made against, without the probe path or trailing slash
+    address = test.address
+    path = PROBE_PATHS.get(test.endpoint)
+    if path and address.endswith(path):
+        address = address[:-len(path)]
+    return address.rstrip("/")
+
+
+def percentile(sorted_values, fraction):
+    # nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return None
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+class History:
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+    def record(self, results, ts=None):
+        ts = time.time() if ts is None else ts
+        self.connection.executemany(
+            "INSERT INTO probes (ts, chain, api_type, provider, address, latency, status, error, height) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (ts, result.test.chain, result.test.endpoint, result.test.provider, endpoint_address(result.test),
+                 result.latency, result.status, result.error, result.height)
+                for result in results
+            ])
+        self.connection.commit()
+
+    def _rows(self, columns, days=None, chain=None, api_type=None, address=None, group_by=None):
+        where = []
+        params = []
+        if days is not None:
+            where.append("ts >= ?")
+            params.append(time.time() - days * 86400)
+        for column, value in (("chain", chain), ("api_type", api_type), ("address", address)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value.rstrip("/") if column == "address" else value)
+        query = f"SELECT {columns} FROM probes"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += f" GROUP BY {group_by}" if group_by else " ORDER BY ts"
+        return self.connection.execute(query, params)
+
+    def last_success(self, address=None, chain=None, days=None):
+        # address -> unix time of the last 200 response
+        rows = self._rows("address, MAX(CASE WHEN status = 200 THEN ts END)", days, chain, None, address, "address")
+        return {address: ts for address, ts in rows if ts is not None}
+
+    def first_seen(self, address=None, chain=None):
+        # address -> unix time of its first probe, i.e. since when the history covers it
+        return dict(self._rows("address, MIN(ts)", None, chain, None, address, "address"))
+
+    def endpoints_by_chain(self, days=None):
+        # chain -> api type -> address -> unix time of the last 200 response (None if never)
+        endpoints = {}
+        for chain, api_type, address, last_success in self._rows(
+                "chain, api_type, address, MAX(CASE WHEN status = 200 THEN ts END)", days,
+                group_by="chain, api_type, address"):
+            endpoints.setdefault(chain, {}).setdefault(api_type, {})[address] = last_success
+        return endpoints
+
+    def uptime(self, days=30, chain=None, api_type=None):
+        # address -> fraction of probes in the last `days` that got a 200
+        rows = self._rows("address, SUM(status = 200), COUNT(*)", days, chain, api_type, group_by="address")
+        return {address: ok / total for address, ok, total in rows}
+
+    def latency_percentiles(self, days=30, chain=None, api_type=None):
+        # address -> (p50, p95) seconds over successful probes
+        latencies = {}
+        for address, latency, status in self._rows("address, latency, status", days, chain, api_type):
+            if status == 200 and latency is not None:
+                latencies.setdefault(address, []).append(latency)
+        result = {}
+        for address, values in latencies.items():
+            values.sort()
+            result[address] = (percentile(values, 0.50), percentile(values, 0.95))
+        return result
+
+    def stats(self, days=30, chain=None, api_type=None):
+        # one EndpointStats per endpoint, best first (uptime, then p50 latency)
+        endpoints = {}
+        for row_chain, row_type, provider, address in self._rows(
+                "chain, api_type, provider, address", days, chain, api_type, group_by="address"):
+            endpoints[address] = (row_chain, row_type, provider)
+        uptime = self.uptime(days, chain, api_type)
+        counts = dict(self._rows("address, COUNT(*)", days, chain, api_type, group_by="address"))
+        latencies = self.latency_percentiles(days, chain, api_type)
+        last_success = self.last_success(chain=chain, days=days)
+        stats = []
+        for address, (row_chain, row_type, provider) in endpoints.items():
+            p50, p95 = latencies.get(address, (None, None))
+            stats.append(EndpointStats(row_chain, row_type, provider, address, counts[address], uptime[address],
+                                       p50, p95, last_success.get(address)))
+        stats.sort(key=lambda s: (-s.uptime, s.p50 if s.p50 is not None else float("inf")))
+        return stats
+
+
+def open_history(path=None):
+    path = path or defaultHistoryPath
+    if path != ":memory:":
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return History(sqlite3.connect(path))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show endpoint health from the local probe history.")
+    parser.add_argument("--db", default=defaultHistoryPath)
+    parser.add_argument("--chain")
+    parser.add_argument("--api-type", choices=sorted(PROBE_PATHS))
+    parser.add_argument("--days", type=float, default=30)
+    args = parser.parse_args(argv)
+
+    with open_history(args.db) as history:
+        for s in history.stats(args.days, args.chain, args.api_type):
+            p50 = f"{s.p50 * 1000:.0f}ms" if s.p50 is not None else "-"
+            p95 = f"{s.p95 * 1000:.0f}ms" if s.p95 is not None else "-"
+            last = time.strftime("%Y-%m-%d %H:%M", time.gmtime(s.last_success)) if s.last_success else "never"
+            print(f"{s.chain:<16} {s.api_type:<4} {s.uptime * 100:6.1f}%  p50 {p50:>7}  p95 {p95:>7}  "
+                  f"last ok {last}  {s.provider} {s.address}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+# Purpose:
+#   to probe chain.json rpc/rest endpoints concurrently from a single process,
+#   with pooled per-host connections, a global concurrency limit and optional
+#   per-provider rate limits.
+#
+# Usage:
+#   python endpoint_prober.py [--timeout 2] [--concurrency 256] [--trace FILE] ../../../*/chain.json
+#   (prints one JSON result per endpoint)
+
+import argparse
+import asyncio
+import contextlib
+import json
+import sys
+import time
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+import aiohttp
+
+import instrumentation
+
+EndpointTest = namedtuple('EndpointTest', ['chain', 'endpoint', 'provider', 'address'])
+
+# status: HTTP status code (None if no response), latency: seconds,
+# error: exception class name (None if a response was received),
+# height: latest block height reported by an rpc /status or a rest latest block (None otherwise),
+# syncing: whether the node reports it is still catching up (None if unknown)
+ProbeResult = namedtuple('ProbeResult', ['test', 'status', 'latency', 'error', 'height', 'syncing'],
+                         defaults=(None, None))
+
+# path appended to an api address to check that it is serving
+PROBE_PATHS = {
+    'rpc': '/status',
+    'rest': '/cosmos/base/tendermint/v1beta1/syncing',
+}
+# rest /syncing has no height; this one does
+REST_LATEST_BLOCK_PATH = '/cosmos/base/tendermint/v1beta1/blocks/latest'
+
+TIMEOUT_SECONDS = 2
+CONCURRENCY = 256
+LIMIT_PER_HOST = 8
+
+
+def is_ok(result):
+    return result.status == 200
+
+
+class RateLimiter:
+    # spaces out request starts so that at most `rate` begin per second
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+class HostSlots:
+    # at most `limit` requests in flight per host (0 = unlimited). Requests wait for a
+    # slot here, before their timeout and latency clock start, instead of in the
+    # connector's queue, where the wait would count against both
+
+    def __init__(self, limit=LIMIT_PER_HOST):
+        self.limit = limit
+        self._semaphores = {}
+
+    def slot(self, address):
+        # keyed like the connector's own per-host limit
+        parts = urlsplit(address)
+        key = (parts.scheme, parts.hostname, parts.port)
+        if key not in self._semaphores:
+            self._semaphores[key] = asyncio.Semaphore(self.limit)
+        return self._semaphores[key]
+
+
+def make_session(concurrency=CONCURRENCY, limit_per_host=LIMIT_PER_HOST):
+    # connections are pooled and reused per host for the life of the session
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=limit_per_host, ttl_dns_cache=300)
+    return aiohttp.ClientSession(connector=connector, trace_configs=instrumentation.request_trace_configs())
+
+
+def parse_status(test, body):
+    # -> (height, syncing) from the probe response body, None where not available
+    # rpc /status: {"result": {"sync_info": {"latest_block_height": "123", "catching_up": false}}}
+    #   (older nodes omit "result"); rest syncing: {"syncing": false};
+    #   rest latest block: {"block": {"header": {"height": "123"}}} ("sdk_block" on newer nodes)
+    latest_block = test.endpoint == 'rest' and test.address.endswith(REST_LATEST_BLOCK_PATH)
+    path = PROBE_PATHS.get(test.endpoint)
+    if not latest_block and (not path or not test.address.endswith(path)):
+        return None, None
+    try:
+        data = json.loads(body)
+        if latest_block:
+            block = data.get('sdk_block') or data['block']
+            return int(block['header']['height']), None
+        if test.endpoint == 'rest':
+            return None, bool(data['syncing'])
+        sync_info = data.get('result', data)['sync_info']
+        return int(sync_info['latest_block_height']), bool(sync_info.get('catching_up', False))
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None, None
+
+
+async def _get(session, test, timeout):
+    start = time.perf_counter()
+    try:
+        async with session.get(test.address, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            body = await response.read()
+            latency = time.perf_counter() - start
+            height, syncing = parse_status(test, body) if response.status == 200 else (None, None)
+            return ProbeResult(test, response.status, latency, None, height, syncing)
+    except asyncio.TimeoutError:
+        return ProbeResult(test, None, time.perf_counter() - start, 'Timeout')
+    except Exception as e:
+        return ProbeResult(test, None, time.perf_counter() - start, type(e).__name__)
+
+
+async def probe_endpoint(session, test, timeout=TIMEOUT_SECONDS, semaphore=None, limiter=None, hosts=None):
+    # one request on a shared session (see make_session); never raises.
+    # hosts: a HostSlots with the session's limit_per_host, so that the timeout and
+    # latency don't include waiting for a connection to a busy host
+    if limiter:
+        await limiter.wait()
+    async with contextlib.AsyncExitStack() as stack:
+        # the host slot first, so requests to a busy host don't hold global slots while they wait
+        if hosts is not None and hosts.limit:
+            await stack.enter_async_context(hosts.slot(test.address))
+        if semaphore is not None:
+            await stack.enter_async_context(semaphore)
+        return await _get(session, test, timeout)
+
+
+async def probe_endpoints_async(tests, timeout=TIMEOUT_SECONDS, concurrency=CONCURRENCY,
+                                limit_per_host=LIMIT_PER_HOST, provider_rate=None):
+    # provider_rate: max requests started per second per provider; a number
+    # applies to every provider, a dict maps provider -> rate (missing = unlimited)
+    semaphore = asyncio.Semaphore(concurrency)
+    hosts = HostSlots(limit_per_host)
+    limiters = {}
+    for test in tests:
+        if test.provider in limiters:
+            continue
+        rate = provider_rate.get(test.provider) if isinstance(provider_rate, dict) else provider_rate
+        limiters[test.provider] = RateLimiter(rate) if rate else None
+
+    with instrumentation.span("probe", endpoints=len(tests)) as span:
+        async with make_session(concurrency, limit_per_host) as session:
+            results = await asyncio.gather(*[
+                probe_endpoint(session, test, timeout, semaphore, limiters[test.provider], hosts)
+                for test in tests
+            ])
+        span.set(ok=sum(1 for result in results if is_ok(result)))
+    return results
+
+
+def probe_endpoints(tests, **kwargs):
+    # returns one ProbeResult per EndpointTest, in the order given
+    return asyncio.run(probe_endpoints_async(list(tests), **kwargs))
+
+
+def endpoint_tests(chain_data):
+    tests = []
+    chain_name = chain_data.get('chain_name', 'unknown')
+    apis = chain_data.get('apis', {})
+    for api_type, path in PROBE_PATHS.items():
+        for api in apis.get(api_type, []):
+            if api.get('address') and isinstance(api.get('provider'), str):
+                address = api['address'].rstrip('/') + path
+                tests.append(EndpointTest(chain=chain_name, endpoint=api_type, provider=api['provider'], address=address))
+    return tests
+
+
+def result_to_dict(result):
+    return {
+        **result.test._asdict(),
+        'status': result.status,
+        'latency': round(result.latency, 4),
+        'error': result.error,
+        'height': result.height,
+        'syncing': result.syncing,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Probe the rpc/rest endpoints listed in chain.json files.")
+    parser.add_argument('files', nargs='+', help="chain.json files to probe")
+    parser.add_argument('--timeout', type=float, default=TIMEOUT_SECONDS)
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY)
+    parser.add_argument('--limit-per-host', type=int, default=LIMIT_PER_HOST)
+    parser.add_argument('--provider-rate', type=float, default=None,
+                        help="max requests per second to any one provider")
+    parser.add_argument('--history', metavar='FILE', help="also append the results to this endpoint history database")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args(argv)
+    with instrumentation.instrumented(args):
+        tests = []
+        for filename in args.files:
+            with open(filename) as f:
+                tests.extend(endpoint_tests(json.load(f)))
+
+        start = time.perf_counter()
+        results = probe_endpoints(tests, timeout=args.timeout, concurrency=args.concurrency,
+                                  limit_per_host=args.limit_per_host, provider_rate=args.provider_rate)
+        for result in results:
+            print(json.dumps(result_to_dict(result), ensure_ascii=False))
+        if args.history:
+            from endpoint_history import open_history
+            with open_history(args.history) as history:
+                history.record(results)
+        passed = sum(1 for result in results if is_ok(result))
+        print(f"{passed}/{len(results)} endpoints ok in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+        return 0 if passed == len(results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,118 @@
+# Purpose:
+#   to pick the best rpc/rest endpoints of a chain for client traffic: every
+#   candidate in chain.json is probed concurrently, endpoints that are down,
+#   still catching up or lagging behind the tallest node are dropped, and the
+#   rest are ordered by latency. rest /syncing reports no height, so healthy
+#   rest nodes are also asked for their latest block. Rankings are cached
+#   in-process for a TTL.
+#
+# Usage:
+#   endpoint_ranking.rank_endpoints("osmosis", "rpc")[0].address
+#
+#   python endpoint_ranking.py osmosis [--api-type rest] [--max-lag 10] [--json]
+
+import argparse
+import json
+import sys
+import time
+from collections import namedtuple
+
+from chain_registry import load_registry
+from endpoint_prober import PROBE_PATHS, REST_LATEST_BLOCK_PATH, TIMEOUT_SECONDS, endpoint_tests, probe_endpoints
+
+RankedEndpoint = namedtuple("RankedEndpoint", ["address", "provider", "latency", "height"])
+
+# blocks a node may trail the tallest candidate before it is dropped
+MAX_LAG = 10
+CACHE_TTL_SECONDS = 60
+
+_cache = {}  # (chain_name, api_type, registry root, max_lag, timeout) -> (expires, [RankedEndpoint])
+_registry = None
+
+
+def clear_cache():
+    _cache.clear()
+
+
+def _chain_data(chain_name, registry):
+    global _registry
+    if registry is None:
+        if _registry is None:
+            _registry = load_registry()
+        registry = _registry
+    chain = registry.chains.get(chain_name)
+    if chain is None or chain.chain is None:
+        raise KeyError(f"no chain.json for chain '{chain_name}'")
+    return chain.chain
+
+
+def _base_address(test):
+    return test.address[:-len(PROBE_PATHS[test.endpoint])]
+
+
+def with_rest_heights(results, timeout=TIMEOUT_SECONDS):
+    # fill in the heights of healthy rest results from each node's latest block;
+    # latency and syncing stay those of the /syncing probe
+    healthy = [result for result in results if result.status == 200 and not result.syncing]
+    if not healthy:
+        return results
+    blocks = probe_endpoints([result.test._replace(address=_base_address(result.test) + REST_LATEST_BLOCK_PATH)
+                              for result in healthy], timeout=timeout)
+    heights = {id(result): block.height for result, block in zip(healthy, blocks) if block.status == 200}
+    return [result._replace(height=heights.get(id(result), result.height)) for result in results]
+
+
+def select_endpoints(results, max_lag=MAX_LAG):
+    # drop failed, syncing and lagging endpoints; fastest first. An endpoint whose height
+    # couldn't be read may be just as far behind, so it ranks after every verified one
+    healthy = [result for result in results if result.status == 200 and not result.syncing]
+    heights = [result.height for result in healthy if result.height is not None]
+    if heights:
+        tallest = max(heights)
+        healthy = [result for result in healthy if result.height is None or tallest - result.height <= max_lag]
+    healthy.sort(key=lambda result: (result.height is None, result.latency))
+    return [
+        RankedEndpoint(_base_address(result.test), result.test.provider, result.latency, result.height)
+        for result in healthy
+    ]
+
+
+def rank_endpoints(chain_name, api_type="rpc", registry=None, max_lag=MAX_LAG, timeout=TIMEOUT_SECONDS,
+                   ttl=CACHE_TTL_SECONDS):
+    # the same chain name in another registry (or with another timeout) is a different ranking
+    key = (chain_name, api_type, registry.root if registry is not None else None, max_lag, timeout)
+    cached = _cache.get(key)
+    now = time.monotonic()
+    if cached and cached[0] > now:
+        return cached[1]
+
+    tests = [test for test in endpoint_tests(_chain_data(chain_name, registry)) if test.endpoint == api_type]
+    results = probe_endpoints(tests, timeout=timeout) if tests else []
+    if api_type == "rest":
+        results = with_rest_heights(results, timeout)
+    ranked = select_endpoints(results, max_lag)
+    _cache[key] = (time.monotonic() + ttl, ranked)
+    return ranked
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rank a chain's endpoints by health and latency.")
+    parser.add_argument("chain_name")
+    parser.add_argument("--api-type", choices=sorted(PROBE_PATHS), default="rpc")
+    parser.add_argument("--max-lag", type=int, default=MAX_LAG, help="blocks behind the tallest node to tolerate")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT_SECONDS)
+    parser.add_argument("--json", action="store_true", help="print the ranking as JSON")
+    args = parser.parse_args(argv)
+
+    ranked = rank_endpoints(args.chain_name, args.api_type, max_lag=args.max_lag, timeout=args.timeout)
+    if args.json:
+        print(json.dumps([endpoint._asdict() for endpoint in ranked], indent=2, ensure_ascii=False))
+    else:
+        for endpoint in ranked:
+            height = endpoint.height if endpoint.height is not None else "-"
+            print(f"{endpoint.latency * 1000:6.0f}ms  {height!s:>10}  {endpoint.address}  ({endpoint.provider})")
+    return 0 if ranked else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
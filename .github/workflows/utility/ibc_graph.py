@@ -0,0 +1,218 @@
+# Purpose:
+#   to index the _IBC data (mainnet and testnet) as a graph: chains are nodes,
+#   channels are edges. Answers "transfer channels of a chain", "channels
+#   between two chains" and multi-hop routes (e.g. for packet forwarding) with
+#   dict lookups. The built index is saved with pickle and reused until an
+#   _IBC file changes.
+#
+# Usage:
+#   graph = ibc_graph.load_graph()
+#   graph.transfer_channels("osmosis"); graph.route("juno", "stride")
+#
+#   python ibc_graph.py [--graph FILE] build
+#   python ibc_graph.py channels osmosis
+#   python ibc_graph.py pair cosmoshub osmosis
+#   python ibc_graph.py route juno stride [--max-hops 3]
+
+import argparse
+import heapq
+import os
+import pickle
+import sys
+from collections import namedtuple
+
+from chain_registry import chainRegistryRoot, ibc_pair, load_registry
+
+# one direction of a channel, as seen from `chain`
+Channel = namedtuple("Channel", [
+    "chain", "channel_id", "port_id", "client_id", "connection_id",
+    "counterparty", "counterparty_channel_id", "counterparty_port_id",
+    "version", "ordering", "status", "preferred", "file",
+])
+
+defaultGraphPath = os.path.join(chainRegistryRoot, ".cache", "ibc_graph.pickle")
+GRAPH_VERSION = 1
+ibcDirectories = [os.path.join("_IBC"), os.path.join("testnets", "_IBC")]
+
+# added per hop over a channel that isn't tagged preferred, so that among
+# routes with the same number of hops the preferred channels win
+NOT_PREFERRED_PENALTY = 0.01
+
+
+def ibc_fingerprint(root=None):
+    # cheap summary of the _IBC files (names, sizes, mtimes) to tell whether a saved graph is stale
+    fingerprint = []
+    for directory in ibcDirectories:
+        try:
+            entries = os.scandir(os.path.join(root or chainRegistryRoot, directory))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            stat = entry.stat()
+            fingerprint.append((directory, entry.name, stat.st_size, stat.st_mtime_ns))
+    return sorted(fingerprint)
+
+
+def _channels_from_file(connection):
+    data = connection.data
+    for channel in data.get("channels", []):
+        tags = channel.get("tags", {})
+        for side, other in (("chain_1", "chain_2"), ("chain_2", "chain_1")):
+            yield Channel(
+                chain=data[side]["chain_name"],
+                channel_id=channel[side].get("channel_id"),
+                port_id=channel[side].get("port_id"),
+                client_id=data[side].get("client_id"),
+                connection_id=data[side].get("connection_id"),
+                counterparty=data[other]["chain_name"],
+                counterparty_channel_id=channel[other].get("channel_id"),
+                counterparty_port_id=channel[other].get("port_id"),
+                version=channel.get("version"),
+                ordering=channel.get("ordering"),
+                status=tags.get("status"),
+                preferred=bool(tags.get("preferred", False)),
+                file=connection.file,
+            )
+
+
+class IbcGraph:
+
+    def __init__(self):
+        self.channels = {}        # chain -> [Channel] leaving that chain
+        self.pairs = {}           # ibc_pair(a, b) -> [Channel] seen from the first chain of the pair
+        self.by_channel_id = {}   # (chain, port_id, channel_id) -> Channel
+
+    @classmethod
+    def from_channels(cls, channels):
+        graph = cls()
+        for channel in channels:
+            graph.channels.setdefault(channel.chain, []).append(channel)
+            graph.by_channel_id[(channel.chain, channel.port_id, channel.channel_id)] = channel
+            pair = ibc_pair(channel.chain, channel.counterparty)
+            if channel.chain == pair[0]:
+                graph.pairs.setdefault(pair, []).append(channel)
+        return graph
+
+    @classmethod
+    def from_registry(cls, registry):
+        return cls.from_channels(
+            channel
+            for pair, connection in sorted(registry.ibc.items())
+            for channel in _channels_from_file(connection)
+        )
+
+    def chains(self):
+        return sorted(self.channels)
+
+    def transfer_channels(self, chain, status="live"):
+        # status=None returns every transfer channel regardless of its tag
+        return [
+            channel for channel in self.channels.get(chain, [])
+            if channel.port_id == "transfer" and (status is None or channel.status == status)
+        ]
+
+    def channels_between(self, chain_a, chain_b, port_id=None):
+        # channels seen from chain_a
+        channels = self.pairs.get(ibc_pair(chain_a, chain_b), [])
+        if ibc_pair(chain_a, chain_b)[0] != chain_a:
+            channels = [self.by_channel_id[(c.counterparty, c.counterparty_port_id, c.counterparty_channel_id)]
+                        for c in channels]
+        return [channel for channel in channels if port_id is None or channel.port_id == port_id]
+
+    def transfer_channel(self, chain_a, chain_b):
+        # the channel to send ics20 transfers from chain_a to chain_b over: preferred, else the only live one
+        live = [channel for channel in self.channels_between(chain_a, chain_b, "transfer") if channel.status == "live"]
+        preferred = [channel for channel in live if channel.preferred]
+        if preferred:
+            return preferred[0]
+        return live[0] if len(live) == 1 else None
+
+    def route(self, source, destination, max_hops=4):
+        # fewest hops over live transfer channels, preferring preferred channels; [] if unreachable
+        if source == destination:
+            return []
+        best = {source: 0.0}
+        queue = [(0.0, 0, source, [])]
+        while queue:
+            cost, hops, chain, path = heapq.heappop(queue)
+            if chain == destination:
+                return path
+            if cost > best.get(chain, float("inf")) or hops >= max_hops:
+                continue
+            for channel in self.transfer_channels(chain):
+                next_cost = cost + 1 + (0 if channel.preferred else NOT_PREFERRED_PENALTY)
+                if next_cost < best.get(channel.counterparty, float("inf")):
+                    best[channel.counterparty] = next_cost
+                    heapq.heappush(queue, (next_cost, hops + 1, channel.counterparty, path + [channel]))
+        return []
+
+    def save(self, path=None, fingerprint=None):
+        path = path or defaultGraphPath
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            # plain tuples, so the file doesn't depend on how this module was imported
+            channels = [tuple(channel) for chain in self.chains() for channel in self.channels[chain]]
+            pickle.dump((GRAPH_VERSION, fingerprint, channels), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+
+
+def load_graph(path=None, registry=None, rebuild=False):
+    # the saved index if it is up to date, otherwise build (and save) it from the registry
+    path = path or defaultGraphPath
+    root = registry.root if registry else None
+    fingerprint = ibc_fingerprint(root)
+    if not rebuild:
+        try:
+            with open(path, "rb") as f:
+                version, saved_fingerprint, channels = pickle.load(f)
+            if version == GRAPH_VERSION and saved_fingerprint == fingerprint:
+                return IbcGraph.from_channels(Channel._make(channel) for channel in channels)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+            pass
+    graph = IbcGraph.from_registry(registry or load_registry(root))
+    graph.save(path, fingerprint)
+    return graph
+
+
+def _describe(channel):
+    tags = channel.status or "untagged"
+    if channel.preferred:
+        tags += ", preferred"
+    return (f"{channel.chain} {channel.port_id}/{channel.channel_id} -> "
+            f"{channel.counterparty} {channel.counterparty_port_id}/{channel.counterparty_channel_id} "
+            f"({channel.version}, {channel.ordering}, {tags})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the IBC channel graph.")
+    parser.add_argument("--graph", default=defaultGraphPath, help="saved index to use")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("build", help="rebuild the saved index from the _IBC files")
+    channels_parser = subparsers.add_parser("channels", help="live transfer channels of a chain")
+    channels_parser.add_argument("chain")
+    pair_parser = subparsers.add_parser("pair", help="every channel between two chains")
+    pair_parser.add_argument("chain_a")
+    pair_parser.add_argument("chain_b")
+    route_parser = subparsers.add_parser("route", help="transfer route between two chains")
+    route_parser.add_argument("source")
+    route_parser.add_argument("destination")
+    route_parser.add_argument("--max-hops", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    graph = load_graph(args.graph, rebuild=args.command == "build")
+    if args.command == "build":
+        print(f"{len(graph.chains())} chains, {len(graph.by_channel_id)} channel ends saved to {args.graph}")
+        return 0
+    if args.command == "channels":
+        channels = graph.transfer_channels(args.chain)
+    elif args.command == "pair":
+        channels = graph.channels_between(args.chain_a, args.chain_b)
+    else:
+        channels = graph.route(args.source, args.destination, args.max_hops)
+    for channel in channels:
+        print(_describe(channel))
+    return 0 if channels else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
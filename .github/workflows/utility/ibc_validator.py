@@ -0,0 +1,162 @@
+# Purpose:
+#   to validate every _IBC file (mainnet and testnet) in a single pass: each
+#   file is read and parsed once and checked against a set of the chain
+#   directories that exist, and channels are checked for both ends, duplicates
+#   and ordering/version consistency. All problems are returned together.
+#
+# Usage:
+#   problems = ibc_validator.validate()   # file -> [message]
+#
+#   python ibc_validator.py [registry root]
+
+import json
+import os
+import re
+import sys
+
+import instrumentation
+from chain_registry import (chainRegistryRoot, domainToDirectoryNameMap, ibcDirectoryName, is_chain_directory_name,
+                            networkTypeToDirectoryNameMap)
+
+fileNamePattern = re.compile(r"^(.*)-(.*)\.json$")
+wildcardChannelId = "*"
+
+# version prefix -> the channel ordering that application requires
+versionOrdering = {
+    "ics20-": "unordered",
+    "ics27-": "ordered",
+    "ics721-": "unordered",
+}
+
+
+# (relative _IBC directory, network type)
+ibcDirectories = [
+    (ibcDirectoryName, "mainnet"),
+    (os.path.join(networkTypeToDirectoryNameMap["testnet"], ibcDirectoryName), "testnet"),
+]
+
+
+def known_chains(root):
+    # network type -> lower-cased names of the chain directories, cosmos and non-cosmos
+    chains = {}
+    for network_type, network_directory in networkTypeToDirectoryNameMap.items():
+        names = set()
+        for domain_directory in domainToDirectoryNameMap.values():
+            try:
+                entries = os.scandir(os.path.join(root, network_directory, domain_directory))
+            except FileNotFoundError:
+                continue
+            names.update(entry.name.lower() for entry in entries
+                         if entry.is_dir() and is_chain_directory_name(entry.name))
+        chains[network_type] = names
+    return chains
+
+
+def check_channels(data, seen, relative_path):
+    # seen: (chain, port_id, channel_id) -> file, shared across files to find channels listed twice
+    problems = []
+    for index, channel in enumerate(data.get("channels", [])):
+        where = f"channels[{index}]"
+        ends = {}
+        for side in ("chain_1", "chain_2"):
+            end = channel.get(side) or {}
+            if not end.get("channel_id") or not end.get("port_id"):
+                problems.append(f"{where}: {side} needs both a channel_id and a port_id")
+                continue
+            ends[side] = end
+            if end["channel_id"] == wildcardChannelId:
+                continue
+            key = (data[side]["chain_name"], end["port_id"], end["channel_id"])
+            if key in seen:
+                other = "this file" if seen[key] == relative_path else seen[key]
+                problems.append(f"{where}: {key[0]} {key[1]}/{key[2]} is also listed in {other}")
+            else:
+                seen[key] = relative_path
+
+        ordering = channel.get("ordering")
+        version = channel.get("version") or ""
+        if ordering not in ("ordered", "unordered"):
+            problems.append(f"{where}: ordering must be 'ordered' or 'unordered', not {ordering!r}")
+        for prefix, expected in versionOrdering.items():
+            if version.startswith(prefix) and ordering != expected:
+                problems.append(f"{where}: {version} channels are {expected}, not {ordering}")
+        if len(ends) == 2 and ends["chain_1"]["port_id"] == ends["chain_2"]["port_id"] == "transfer" \
+                and not version.startswith("ics20-"):
+            problems.append(f"{where}: transfer channels use an ics20 version, not {version!r}")
+    return problems
+
+
+def check_file(relative_path, data, chains, seen):
+    file_name = os.path.basename(relative_path)
+    match = fileNamePattern.match(file_name)
+    if not match:
+        return ["file name must look like <chain_1>-<chain_2>.json"]
+    problems = []
+    name_1, name_2 = match.group(1).lower(), match.group(2).lower()
+    if [name_1, name_2] != sorted([name_1, name_2]):
+        problems.append("chains in the file name are not in alphabetical order")
+    for name in (name_1, name_2):
+        if name not in chains:
+            problems.append(f"no chain directory named {name}")
+
+    try:
+        chain_1 = str(data["chain_1"]["chain_name"]).lower()
+        chain_2 = str(data["chain_2"]["chain_name"]).lower()
+    except (KeyError, TypeError):
+        problems.append("chain_1 and chain_2 need a chain_name")
+        return problems
+    if (chain_1, chain_2) != (name_1, name_2):
+        problems.append(f"chain_1/chain_2 are {chain_1}/{chain_2} but the file name says {name_1}/{name_2}")
+    return problems + check_channels(data, seen, relative_path)
+
+
+def validate(root=None):
+    # relative file path -> [problem]; every _IBC file has an entry, empty if it is valid
+    root = root or chainRegistryRoot
+    with instrumentation.span("validate_ibc") as span:
+        results = _validate(root)
+        span.set(files=len(results), failed=sum(1 for problems in results.values() if problems))
+    return results
+
+
+def _validate(root):
+    chains = known_chains(root)
+    results = {}
+    for directory, network_type in ibcDirectories:
+        seen = {}
+        try:
+            entries = sorted(os.scandir(os.path.join(root, directory)), key=lambda entry: entry.name)
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            relative_path = os.path.join(directory, entry.name)
+            try:
+                with open(entry.path, encoding="utf-8") as f:
+                    data = json.load(f)
+            except ValueError as e:
+                results[relative_path] = [f"invalid JSON: {e}"]
+                continue
+            if not isinstance(data, dict):
+                results[relative_path] = ["top level must be an object"]
+                continue
+            results[relative_path] = check_file(relative_path, data, chains[network_type], seen)
+    return results
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    results = validate(argv[0] if argv else None)
+    failed = 0
+    for relative_path, problems in results.items():
+        if problems:
+            failed += 1
+        for problem in problems:
+            print(f"{relative_path}: {problem}")
+    print(f"{len(results)} IBC files checked, {failed} with problems", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
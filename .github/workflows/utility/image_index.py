@@ -0,0 +1,223 @@
+# Purpose:
+#   to index the registry's image files by content: every image is hashed once
+#   (hashes are cached by size and mtime in .cache/image_hashes.json), and each
+#   sha256 is mapped to the files with that content and to every chain.json /
+#   assetlist.json entry that links to one of them. From that it reports
+#   duplicate artwork stored under several paths, images nothing links to, and
+#   links to images that don't exist. Jobs that handle images (colors, link
+#   checks, syncing) can work per unique image instead of per reference.
+#
+# Usage:
+#   index = image_index.build_index()
+#   index.duplicates()      sha256 -> [paths], for content stored more than once
+#   index.references_to(digest)
+#
+#   python image_index.py [--output FILE]
+#   (prints duplicates, orphaned images and dangling links; --output writes the index as JSON)
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from collections import namedtuple
+
+from chain_registry import chainRegistryRoot, load_registry
+from link_checker import extract_links, local_path
+
+# path: relative to the registry root
+ImageReference = namedtuple("ImageReference", ["path", "url", "file", "pointer"])
+
+defaultCachePath = os.path.join(chainRegistryRoot, ".cache", "image_hashes.json")
+CACHE_VERSION = 1
+
+imageExtensions = (".png", ".svg", ".jpg", ".jpeg", ".gif", ".webp")
+
+
+def is_image(path):
+    return path.lower().endswith(imageExtensions)
+
+
+def find_images(root=None):
+    # relative path -> (mtime_ns, size) of every image file in the tree
+    root = os.path.abspath(root or chainRegistryRoot)
+    images = {}
+    for directory, directories, files in os.walk(root):
+        directories[:] = sorted(name for name in directories if not name.startswith(".") and name != "node_modules")
+        for name in files:
+            if is_image(name):
+                stat = os.stat(os.path.join(directory, name))
+                images[os.path.relpath(os.path.join(directory, name), root)] = (stat.st_mtime_ns, stat.st_size)
+    return images
+
+
+def read_cache(path):
+    # relative path -> (mtime_ns, size, sha256)
+    try:
+        with open(path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cache.get("version") != CACHE_VERSION:
+        return {}
+    return {file: tuple(entry) for file, entry in cache.get("files", {}).items()}
+
+
+def write_cache(path, entries):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump({"version": CACHE_VERSION, "files": entries}, f, indent=0, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def hash_files(stats, root=None, cache_path=None):
+    # stats: relative path -> (mtime_ns, size), as from find_images; -> (relative path -> sha256, files hashed)
+    # only files whose size or mtime changed since the last run are read
+    root = root or chainRegistryRoot
+    cache_path = cache_path or defaultCachePath
+    cache = read_cache(cache_path)
+    digests, entries, hashed = {}, {}, 0
+    for path, (mtime_ns, size) in stats.items():
+        cached = cache.get(path)
+        if cached and cached[0] == mtime_ns and cached[1] == size:
+            digest = cached[2]
+        else:
+            try:
+                with open(os.path.join(root, path), "rb") as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()
+            except OSError:
+                continue
+            hashed += 1
+        digests[path] = digest
+        entries[path] = (mtime_ns, size, digest)
+    # images that weren't asked for this time stay cached
+    if hashed or any(path not in cache for path in entries):
+        try:
+            write_cache(cache_path, {**cache, **entries})
+        except OSError as e:
+            print(f"[!] could not write image hash cache {cache_path}: {e}", file=sys.stderr)
+    return digests, hashed
+
+
+def file_digests(paths, root=None, cache_path=None):
+    # path (relative to root) -> sha256 for the given files that exist, from the hash cache where up to date
+    root = root or chainRegistryRoot
+    stats = {}
+    for path in paths:
+        try:
+            stat = os.stat(os.path.join(root, path))
+        except OSError:
+            continue
+        stats[os.path.normpath(path)] = (stat.st_mtime_ns, stat.st_size)
+    digests, _ = hash_files(stats, root, cache_path)
+    return {path: digests[os.path.normpath(path)] for path in paths if os.path.normpath(path) in digests}
+
+
+class ImageIndex:
+
+    def __init__(self):
+        self.digests = {}       # image path -> sha256
+        self.sizes = {}         # image path -> bytes
+        self.files = {}         # sha256 -> [image path], sorted
+        self.references = {}    # image path -> [ImageReference]
+        self.dangling = []      # ImageReference to image paths that don't exist
+        self.hashed = 0         # files read this time (the rest came from the hash cache)
+
+    def add_file(self, path, digest, size):
+        self.digests[path] = digest
+        self.sizes[path] = size
+        self.files.setdefault(digest, []).append(path)
+
+    def add_reference(self, reference):
+        if reference.path in self.digests:
+            self.references.setdefault(reference.path, []).append(reference)
+        else:
+            self.dangling.append(reference)
+
+    def duplicates(self):
+        # sha256 -> [image path], for content stored under more than one path
+        return {digest: paths for digest, paths in sorted(self.files.items()) if len(paths) > 1}
+
+    def duplicate_bytes(self):
+        # bytes that storing each duplicated image once would save
+        return sum(self.sizes[paths[0]] * (len(paths) - 1) for paths in self.duplicates().values())
+
+    def orphans(self):
+        # image files no chain.json or assetlist.json links to
+        return sorted(path for path in self.digests if path not in self.references)
+
+    def references_to(self, digest):
+        # every reference to any file with this content
+        return [reference for path in self.files.get(digest, []) for reference in self.references.get(path, [])]
+
+    def unique_images(self):
+        # sha256 -> one path with that content (the first in sorted order), for jobs that run once per image
+        return {digest: paths[0] for digest, paths in sorted(self.files.items())}
+
+    def to_json(self):
+        return {
+            "images": {
+                digest: {
+                    "size": self.sizes[paths[0]],
+                    "files": paths,
+                    "references": [{"file": reference.file, "pointer": reference.pointer, "path": reference.path}
+                                   for reference in self.references_to(digest)],
+                }
+                for digest, paths in sorted(self.files.items())
+            },
+            "orphans": self.orphans(),
+            "dangling": [reference._asdict() for reference in self.dangling],
+        }
+
+
+def build_index(root=None, registry=None, cache_path=None):
+    root = os.path.abspath(root or (registry.root if registry else chainRegistryRoot))
+    stats = find_images(root)
+    digests, hashed = hash_files(stats, root, cache_path)
+    index = ImageIndex()
+    index.hashed = hashed
+    for path in sorted(digests):
+        index.add_file(path, digests[path], stats[path][1])
+    links = extract_links(registry or load_registry(root))
+    for url, locations in sorted(links.items()):
+        path = local_path(url, root)
+        if path is None or not is_image(path):
+            continue
+        path = os.path.relpath(path, root)
+        for location in locations:
+            index.add_reference(ImageReference(path, url, location.file, location.pointer))
+    return index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index the registry's images by content hash.")
+    parser.add_argument("--cache", default=defaultCachePath, help="image hash cache")
+    parser.add_argument("--output", metavar="FILE", help="write the index (sha256 -> files and references) as JSON")
+    parser.add_argument("--root", help="registry root (default: this repository)")
+    args = parser.parse_args(argv)
+
+    index = build_index(args.root, cache_path=args.cache)
+    duplicates = index.duplicates()
+    for digest, paths in duplicates.items():
+        print(f"duplicate {digest[:12]} ({index.sizes[paths[0]]} bytes, {len(index.references_to(digest))} references)")
+        for path in paths:
+            print(f"    {path}")
+    orphans = index.orphans()
+    for path in orphans:
+        print(f"orphan {path}")
+    for reference in index.dangling:
+        print(f"dangling {reference.path}")
+        print(f"    {reference.file} {reference.pointer}")
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(index.to_json(), f, indent=2)
+    print(f"{len(index.digests)} images ({index.hashed} hashed), {len(index.files)} unique, "
+          f"{sum(len(references) for references in index.references.values())} references; "
+          f"{len(duplicates)} duplicated ({index.duplicate_bytes() / 1e6:.1f} MB), {len(orphans)} orphaned, "
+          f"{len(index.dangling)} dangling references", file=sys.stderr)
+    return 1 if index.dangling else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
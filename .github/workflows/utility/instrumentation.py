@@ -0,0 +1,284 @@
+# Purpose:
+#   to show where the time of a script run goes: spans around its phases
+#   (load, parse, validate, probe), a per-host breakdown of every HTTP request
+#   made through endpoint_prober (connection queue, DNS, connect + TLS, wait for
+#   the response), and optionally a cProfile dump and the top tracemalloc
+#   allocations. Everything is written as one Chrome trace file, which opens
+#   in chrome://tracing or https://ui.perfetto.dev.
+#
+# Usage:
+#   with instrumentation.span("validate", files=len(files)) as span:
+#       ...
+#       span.set(errors=len(errors))
+#
+#   scripts opt in with
+#       instrumentation.add_arguments(parser)      # --trace FILE --profile FILE --trace-memory
+#       with instrumentation.instrumented(args):
+#           ...
+#   or, without a command line (e.g. under pytest), with the REGISTRY_TRACE,
+#   REGISTRY_PROFILE and REGISTRY_TRACE_MEMORY environment variables and
+#       instrumentation.from_environment()
+#
+# Spans are only recorded while tracing is on; otherwise span() costs one
+# attribute check. Work done in process pool workers shows up as the span
+# around the pool, not per task.
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+TRACE_ENV = "REGISTRY_TRACE"
+PROFILE_ENV = "REGISTRY_PROFILE"
+MEMORY_ENV = "REGISTRY_TRACE_MEMORY"
+
+# allocation sites kept from the tracemalloc snapshot
+MEMORY_TOP = 25
+
+# request phases timed per host; aiohttp creates the TCP connection and does
+# the TLS handshake in one step, so "connect" covers both
+requestPhases = ("queued", "dns", "connect", "wait")
+
+
+class Span:
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def set(self, **args):
+        self.args.update(args)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.complete(self.name, self.category, self.start, time.perf_counter(), self.args)
+        return False
+
+
+class _NullSpan:
+
+    def set(self, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_nullSpan = _NullSpan()
+
+
+class Tracer:
+
+    def __init__(self):
+        self.enabled = False
+        self.events = []
+        self.hosts = {}     # host -> {"requests", "errors", "reused", "seconds", <phase>: seconds}
+        self.other = {}     # extra top level data for the trace file
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._request_ids = 0
+
+    def _ts(self, seconds):
+        return round((seconds - self._origin) * 1e6, 3)
+
+    def span(self, name, category="phase", **args):
+        if not self.enabled:
+            return _nullSpan
+        return Span(self, name, category, args)
+
+    def complete(self, name, category, start, end, args=None):
+        with self._lock:
+            self.events.append({
+                "name": name, "cat": category, "ph": "X", "ts": self._ts(start), "dur": round((end - start) * 1e6, 3),
+                "pid": os.getpid(), "tid": threading.get_ident(), "args": args or {},
+            })
+
+    def request(self, host, start, end, phases, status=None, error=None, reused=False):
+        # one HTTP request: an async event on the host's track plus the per-host totals
+        with self._lock:
+            self._request_ids += 1
+            args = {phase: round(seconds * 1000, 3) for phase, seconds in phases.items()}
+            args.update(status=status, error=error, reused=reused)
+            common = {"name": host, "cat": "http", "id": self._request_ids, "pid": os.getpid(),
+                      "tid": threading.get_ident()}
+            self.events.append(dict(common, ph="b", ts=self._ts(start), args=args))
+            self.events.append(dict(common, ph="e", ts=self._ts(end)))
+            totals = self.hosts.setdefault(host, dict({"requests": 0, "errors": 0, "reused": 0, "seconds": 0.0},
+                                                      **{phase: 0.0 for phase in requestPhases}))
+            totals["requests"] += 1
+            totals["errors"] += 1 if error else 0
+            totals["reused"] += 1 if reused else 0
+            totals["seconds"] += end - start
+            for phase, seconds in phases.items():
+                totals[phase] += seconds
+
+    def host_summary(self):
+        # hosts by total request time, slowest first
+        summary = []
+        for host, totals in self.hosts.items():
+            requests = totals["requests"]
+            entry = {"host": host, "requests": requests, "errors": totals["errors"], "reused": totals["reused"],
+                     "seconds": round(totals["seconds"], 4)}
+            for phase in requestPhases:
+                entry[f"{phase}_ms_avg"] = round(totals[phase] / requests * 1000, 3)
+            summary.append(entry)
+        return sorted(summary, key=lambda entry: -entry["seconds"])
+
+    def trace(self):
+        return {
+            "traceEvents": [
+                {"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": os.path.basename(sys.argv[0])}},
+            ] + self.events,
+            "displayTimeUnit": "ms",
+            "otherData": dict(self.other, argv=sys.argv, hosts=self.host_summary()),
+        }
+
+    def write(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.trace(), f)
+        os.replace(path + ".tmp", path)
+
+
+tracer = Tracer()
+_active = {}
+
+
+def span(name, category="phase", **args):
+    return tracer.span(name, category, **args)
+
+
+def request_trace_configs():
+    # -> [aiohttp.TraceConfig] feeding tracer.request() for sessions made while tracing, else []
+    if not tracer.enabled:
+        return []
+    import aiohttp
+
+    def mark(name):
+        async def callback(session, context, params):
+            context.marks[name] = time.perf_counter()
+        return callback
+
+    async def on_request_start(session, context, params):
+        context.marks = {"start": time.perf_counter()}
+        context.host = urlsplit(str(params.url)).netloc
+        context.reused = False
+
+    async def on_reuse(session, context, params):
+        context.reused = True
+
+    def finish(context, status=None, error=None):
+        marks = context.marks
+        end = time.perf_counter()
+        phases = {}
+        for phase in ("queued", "dns", "connect"):
+            if f"{phase}_start" in marks and f"{phase}_end" in marks:
+                phases[phase] = marks[f"{phase}_end"] - marks[f"{phase}_start"]
+        phases["wait"] = max(0.0, end - marks["start"] - sum(phases.values()))
+        tracer.request(context.host, marks["start"], end, phases, status, error, context.reused)
+
+    async def on_request_end(session, context, params):
+        finish(context, status=params.response.status)
+
+    async def on_request_exception(session, context, params):
+        finish(context, error=type(params.exception).__name__)
+
+    config = aiohttp.TraceConfig()
+    config.on_request_start.append(on_request_start)
+    config.on_connection_queued_start.append(mark("queued_start"))
+    config.on_connection_queued_end.append(mark("queued_end"))
+    config.on_dns_resolvehost_start.append(mark("dns_start"))
+    config.on_dns_resolvehost_end.append(mark("dns_end"))
+    config.on_connection_create_start.append(mark("connect_start"))
+    config.on_connection_create_end.append(mark("connect_end"))
+    config.on_connection_reuseconn.append(on_reuse)
+    config.on_request_end.append(on_request_end)
+    config.on_request_exception.append(on_request_exception)
+    return [config]
+
+
+def start(trace=None, profile=None, memory=False):
+    # trace: Chrome trace file to write; profile: cProfile stats file; memory: record top allocations
+    if _active:
+        return
+    _active.update(trace=trace, profile=profile, memory=memory)
+    if trace:
+        tracer.enabled = True
+    if memory:
+        import tracemalloc
+        tracemalloc.start()
+    if profile:
+        import cProfile
+        _active["profiler"] = cProfile.Profile()
+        _active["profiler"].enable()
+
+
+def finish():
+    # stops whatever start() started and writes the files; safe to call more than once
+    if not _active:
+        return
+    options = dict(_active)
+    _active.clear()
+    if options.get("profiler"):
+        options["profiler"].disable()
+        options["profiler"].dump_stats(options["profile"])
+        print(f"[i] profile written to {options['profile']}", file=sys.stderr)
+    if options["memory"]:
+        import tracemalloc
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        tracer.other["memory"] = {
+            "current_bytes": current,
+            "peak_bytes": peak,
+            "top": [{"where": str(stat.traceback), "bytes": stat.size, "count": stat.count}
+                    for stat in snapshot.statistics("lineno")[:MEMORY_TOP]],
+        }
+        if not options["trace"]:
+            print(f"[i] peak traced memory {peak / 1e6:.1f} MB", file=sys.stderr)
+    if options["trace"]:
+        tracer.enabled = False
+        tracer.write(options["trace"])
+        print(f"[i] trace written to {options['trace']}", file=sys.stderr)
+
+
+def add_arguments(parser):
+    group = parser.add_argument_group("instrumentation")
+    group.add_argument("--trace", metavar="FILE", default=os.environ.get(TRACE_ENV),
+                       help=f"write a Chrome trace of phases and HTTP requests (or set {TRACE_ENV})")
+    group.add_argument("--profile", metavar="FILE", default=os.environ.get(PROFILE_ENV),
+                       help=f"write cProfile stats (or set {PROFILE_ENV})")
+    group.add_argument("--trace-memory", action="store_true", default=bool(os.environ.get(MEMORY_ENV)),
+                       help=f"record the top memory allocations into the trace (or set {MEMORY_ENV})")
+
+
+@contextmanager
+def instrumented(args):
+    # args: parsed arguments from a parser given to add_arguments()
+    start(args.trace, args.profile, args.trace_memory)
+    try:
+        yield tracer
+    finally:
+        finish()
+
+
+def from_environment():
+    # starts instrumentation from the environment variables; the files are written at exit
+    trace, profile, memory = os.environ.get(TRACE_ENV), os.environ.get(PROFILE_ENV), bool(os.environ.get(MEMORY_ENV))
+    if trace or profile or memory:
+        start(trace, profile, memory)
+        atexit.register(finish)
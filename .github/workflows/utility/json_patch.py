@@ -0,0 +1,300 @@
+# Purpose:
+#   to apply batches of JSON-pointer patches (add / replace / remove, as in
+#   RFC 6902) to JSON files as small text edits, so everything outside the
+#   patched values keeps its formatting, key order and escapes. Only the path
+#   to each patched value is scanned, not the whole document, and only files
+#   whose text actually changed are written (atomically).
+#
+# Usage:
+#   json_patch.patch_file("osmosis/chain.json", [
+#       Patch("replace", "/apis/rpc/0/provider", "Node Co"),
+#       Patch("remove", "/apis/rest/3"),
+#       Patch("add", "/images/0/theme", {"primary_color_hex": "#5c09a0"}),
+#   ])
+#
+# All pointers in a batch refer to the document as given, so array indexes
+# don't shift between patches (unlike RFC 6902, which applies them one by one).
+
+import json
+import os
+import re
+from collections import namedtuple
+
+Patch = namedtuple("Patch", ["op", "path", "value"], defaults=(None,))
+
+whitespacePattern = re.compile(r"[ \t\n\r]*")
+stringPattern = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+scalarPattern = re.compile(r"[^\s,\]}]+")
+structurePattern = re.compile(r'"(?:[^"\\]|\\.)*"|[\[\]{}]', re.DOTALL)
+indentPattern = re.compile(r"\n([ \t]+)\S")
+
+# (key or array index, start of the member (its key, for objects), start of the value, end of the value)
+Member = namedtuple("Member", ["key", "start", "value_start", "value_end"])
+
+
+def parse_pointer(pointer):
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise ValueError(f"JSON pointer must start with '/': {pointer!r}")
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+
+def _skip(text, i):
+    return whitespacePattern.match(text, i).end()
+
+
+def _value_end(text, i):
+    if text[i] == '"':
+        return stringPattern.match(text, i).end()
+    if text[i] in "{[":
+        depth = 0
+        for match in structurePattern.finditer(text, i):
+            token = match.group()
+            if token in ("{", "["):
+                depth += 1
+            elif token in ("}", "]"):
+                depth -= 1
+                if depth == 0:
+                    return match.end()
+        raise ValueError(f"unterminated container at offset {i}")
+    match = scalarPattern.match(text, i)
+    if not match:
+        raise ValueError(f"expected a value at offset {i}")
+    return match.end()
+
+
+def _members(text, start):
+    # -> ([Member], offset of the closing bracket) for the object or array starting at `start`
+    is_object = text[start] == "{"
+    members = []
+    i = _skip(text, start + 1)
+    if text[i] in "}]":
+        return members, i
+    while True:
+        member_start = i
+        if is_object:
+            key_end = stringPattern.match(text, i).end()
+            key = json.loads(text[i:key_end])
+            i = _skip(text, key_end)
+            if text[i] != ":":
+                raise ValueError(f"expected ':' at offset {i}")
+            i = _skip(text, i + 1)
+        else:
+            key = len(members)
+        value_end = _value_end(text, i)
+        members.append(Member(key, member_start, i, value_end))
+        i = _skip(text, value_end)
+        if text[i] == ",":
+            i = _skip(text, i + 1)
+        elif text[i] in "}]":
+            return members, i
+        else:
+            raise ValueError(f"expected ',' or a closing bracket at offset {i}")
+
+
+def _find(members, token, is_object, pointer):
+    if is_object:
+        for member in members:
+            if member.key == token:
+                return member
+        return None
+    if not token.isdigit():
+        raise ValueError(f"{pointer}: {token!r} is not an array index")
+    index = int(token)
+    return members[index] if index < len(members) else None
+
+
+class _Document:
+    # the original text plus the containers scanned so far, so a batch scans each container once
+
+    def __init__(self, text):
+        self.text = text
+        match = indentPattern.search(text)
+        self.unit = match.group(1) if match else None
+        self._containers = {}
+
+    def container(self, start):
+        # -> (is_object, [Member], offset of the closing bracket)
+        if start not in self._containers:
+            self._containers[start] = (self.text[start] == "{",) + _members(self.text, start)
+        return self._containers[start]
+
+    def resolve(self, tokens, pointer):
+        # -> offset of the value at tokens
+        start = _skip(self.text, 0)
+        for token in tokens:
+            if self.text[start] not in "{[":
+                raise ValueError(f"{pointer}: cannot descend into a scalar")
+            is_object, members, _ = self.container(start)
+            member = _find(members, token, is_object, pointer)
+            if member is None:
+                raise ValueError(f"{pointer}: no such member {token!r}")
+            start = member.value_start
+        return start
+
+    def layout(self, start):
+        # -> (indent of the members, unit for new values, separator between members) of a container
+        text = self.text
+        _, members, _ = self.container(start)
+        # containers written on one line get new values on one line too
+        if self.unit is None or (members and "\n" not in text[start:members[0].start]):
+            return "", None, ", "
+        indent = _line_indent(text, members[0].start) if members else _line_indent(text, start) + self.unit
+        return indent, self.unit, ",\n" + indent
+
+
+def _line_indent(text, i):
+    line_start = text.rfind("\n", 0, i) + 1
+    return whitespacePattern.match(text, line_start).group().lstrip("\r\n")
+
+
+def _dumps(value, indent, unit):
+    if unit is None:
+        return json.dumps(value, ensure_ascii=False, separators=(", ", ": "))
+    return json.dumps(value, indent=unit, ensure_ascii=False).replace("\n", "\n" + indent)
+
+
+def _member_text(key, value, indent, unit, is_object):
+    text = _dumps(value, indent, unit)
+    return f"{json.dumps(key, ensure_ascii=False)}: {text}" if is_object else text
+
+
+def _container_edits(document, start, removed, inserted, appended):
+    # -> [(start, end, replacement)] for the membership changes of one container
+    text = document.text
+    _, members, close = document.container(start)
+    indent, unit, separator = document.layout(start)
+    new_members = [
+        _member_text(key, value, indent, unit, text[start] == "{")
+        for key, value in appended
+    ]
+    if len(removed) == len(members):
+        # nothing of the old contents is left: rewrite the inside of the brackets
+        pieces = [
+            _member_text(key, value, indent, unit, False)
+            for index in sorted(inserted) for key, value in inserted[index]
+        ] + new_members
+        if not pieces:
+            return [(start + 1, close, "")]
+        inside = separator.join(pieces)
+        if unit is not None:
+            inside = f"\n{indent}{inside}\n{_line_indent(text, start)}"
+        return [(start + 1, close, inside)]
+
+    edits = []
+    run_start = None
+    for index in range(len(members) + 1):
+        if index in removed:
+            run_start = index if run_start is None else run_start
+            continue
+        if run_start is not None:
+            if index < len(members):
+                # a run followed by a kept member: drop the run and the separator after it
+                edits.append((members[run_start].start, members[index].start, ""))
+            else:
+                # a run at the end: drop the separator before it
+                edits.append((members[run_start - 1].value_end, members[-1].value_end, ""))
+            run_start = None
+    for index, values in inserted.items():
+        new = "".join(_member_text(key, value, indent, unit, False) + separator for key, value in values)
+        edits.append((members[index].start, members[index].start, new))
+    if new_members:
+        end = members[-1].value_end
+        edits.append((end, end, "".join(separator + new for new in new_members)))
+    return edits
+
+
+def apply_patches(text, patches):
+    # -> the patched text; raises ValueError if a patch doesn't fit the document.
+    # Every pointer refers to the document as it was before the batch (array
+    # indexes don't shift between patches), and patches must not overlap.
+    document = _Document(text)
+    edits = []
+    # container offset -> ({removed index}, {index: [(key, value)] inserted before it}, [(key, value)] appended)
+    changes = {}
+    for patch in patches:
+        tokens = parse_pointer(patch.path)
+        if patch.op not in ("add", "replace", "remove"):
+            raise ValueError(f"unsupported patch op {patch.op!r}")
+        if not tokens:
+            if patch.op == "remove":
+                raise ValueError("cannot remove the document root")
+            start = _skip(text, 0)
+            edits.append((start, _value_end(text, start), _dumps(patch.value, "", document.unit)))
+            continue
+
+        start = document.resolve(tokens[:-1], patch.path)
+        if text[start] not in "{[":
+            raise ValueError(f"{patch.path}: parent is not an object or array")
+        is_object, members, _ = document.container(start)
+        token = tokens[-1]
+        member = None if (not is_object and token == "-") else _find(members, token, is_object, patch.path)
+        removed, inserted, appended = changes.setdefault(start, (set(), {}, []))
+
+        if patch.op == "replace" or (patch.op == "add" and is_object and member is not None):
+            if member is None:
+                raise ValueError(f"{patch.path}: no such member to replace")
+            _, unit, _ = document.layout(start)
+            value = _dumps(patch.value, _line_indent(text, member.start), unit)
+            edits.append((member.value_start, member.value_end, value))
+        elif patch.op == "remove":
+            if member is None:
+                raise ValueError(f"{patch.path}: no such member to remove")
+            index = members.index(member)
+            if index in removed:
+                raise ValueError(f"{patch.path}: removed twice")
+            removed.add(index)
+        elif member is not None:
+            # array insert before an existing element
+            inserted.setdefault(member.key, []).append((None, patch.value))
+        else:
+            if not is_object and token != "-" and int(token) != len(members):
+                raise ValueError(f"{patch.path}: index is past the end of the array")
+            if is_object and any(key == token for key, _ in appended):
+                raise ValueError(f"{patch.path}: added twice")
+            appended.append((token, patch.value))
+
+    for start, (removed, inserted, appended) in changes.items():
+        edits.extend(_container_edits(document, start, removed, inserted, appended))
+
+    # splice from the end of the text backwards, so earlier offsets stay valid
+    edits.sort(key=lambda edit: (edit[0], edit[1]), reverse=True)
+    pieces = []
+    position = len(text)
+    for start, end, replacement in edits:
+        if end > position:
+            raise ValueError("patches overlap")
+        pieces.append(text[end:position])
+        pieces.append(replacement)
+        position = start
+    pieces.append(text[:position])
+    return "".join(reversed(pieces))
+
+
+def patch_file(path, patches):
+    # -> True if the file changed (and was rewritten)
+    with open(path, encoding="utf-8", newline="") as f:
+        text = f.read()
+    patched = apply_patches(text, patches)
+    if patched == text:
+        return False
+    json.loads(patched)
+    temp_path = path + ".tmp"
+    try:
+        with open(temp_path, "w", encoding="utf-8", newline="") as f:
+            f.write(patched)
+        os.replace(temp_path, path)
+    except BaseException:
+        # the original is untouched; don't leave a half written copy next to it
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    return True
+
+
+def patch_files(patches_by_path):
+    # -> the paths that changed
+    return [path for path, patches in patches_by_path.items() if patches and patch_file(path, patches)]
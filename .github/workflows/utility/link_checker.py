@@ -0,0 +1,218 @@
+# Purpose:
+#   to check the links in the registry's JSON files. Links to files in this
+#   repo (raw.githubusercontent.com/cosmos/chain-registry/master/...) are
+#   checked on disk, without the network. The rest get an async HEAD request
+#   (GET where HEAD isn't supported) over pooled per-host connections. Results
+#   are kept in a cache, so a run only re-checks links that are new, expired,
+#   or failed last time.
+#
+# Usage:
+#   python link_checker.py [--cache FILE] [--ttl-days 7] [--markdown FILE] [--no-network]
+#   (prints the broken links with the files and JSON pointers they appear at)
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+from urllib.parse import unquote, urlsplit
+
+from chain_registry import chainRegistryRoot, fileToFileNameMap, load_registry
+
+LinkLocation = namedtuple("LinkLocation", ["file", "pointer"])
+# status: HTTP status (404 for a repo file that doesn't exist), error: exception name, checked: unix time
+LinkResult = namedtuple("LinkResult", ["url", "status", "error", "checked", "local"])
+
+repoRawPrefix = "https://raw.githubusercontent.com/cosmos/chain-registry/master/"
+defaultCachePath = os.path.join(chainRegistryRoot, ".cache", "link_check.json")
+CACHE_VERSION = 1
+
+TIMEOUT_SECONDS = 20
+CONCURRENCY = 64
+LIMIT_PER_HOST = 4
+TTL_DAYS = 7
+USER_AGENT = "chain-registry-link-checker"
+# retried with GET: servers that don't do HEAD
+headFallbackStatuses = (403, 404, 405, 501)
+# not broken: 501 as lychee was run with --accept 501; 429 says nothing about the link (not cached either)
+acceptedStatuses = (429, 501)
+
+
+def is_ok(result):
+    return result.status is not None and (200 <= result.status < 400 or result.status in acceptedStatuses)
+
+
+def is_template(url):
+    # explorer page templates like https://www.mintscan.io/osmosis/tx/${txHash}
+    return "{" in url or "%7B" in url.upper()
+
+
+def _walk(value, pointer):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _walk(item, f"{pointer}/{str(key).replace('~', '~0').replace('/', '~1')}")
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            yield from _walk(item, f"{pointer}/{index}")
+    elif isinstance(value, str) and value.startswith(("http://", "https://")):
+        yield value, pointer
+
+
+def extract_links(registry):
+    # url -> [LinkLocation] for every http(s) string in the chain files and _IBC files
+    links = {}
+    documents = [
+        (os.path.join(chain.directory, file_name), getattr(chain, file))
+        for chain in registry.chains.values()
+        for file, file_name in fileToFileNameMap.items()
+    ] + [(connection.file, connection.data) for connection in registry.ibc.values()]
+    for file, data in documents:
+        for url, pointer in _walk(data, ""):
+            if not is_template(url):
+                links.setdefault(url, []).append(LinkLocation(file, pointer))
+    return links
+
+
+def local_path(url, root=None):
+    # the repo file a raw.githubusercontent.com link of this repo points to, else None
+    if not url.startswith(repoRawPrefix):
+        return None
+    relative_path = unquote(urlsplit(url).path[len(urlsplit(repoRawPrefix).path):])
+    return os.path.join(root or chainRegistryRoot, *relative_path.split("/"))
+
+
+def check_local(url, path):
+    exists = os.path.isfile(path)
+    return LinkResult(url, 200 if exists else 404, None if exists else "NotInRepo", time.time(), True)
+
+
+async def _request(session, url, timeout):
+    import aiohttp
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    try:
+        async with session.head(url, allow_redirects=True, timeout=client_timeout) as response:
+            status = response.status
+        if status in headFallbackStatuses:
+            async with session.get(url, allow_redirects=True, timeout=client_timeout) as response:
+                status = response.status
+        return LinkResult(url, status, None, time.time(), False)
+    except asyncio.TimeoutError:
+        return LinkResult(url, None, "Timeout", time.time(), False)
+    except Exception as e:
+        return LinkResult(url, None, type(e).__name__, time.time(), False)
+
+
+async def check_url(session, url, timeout=TIMEOUT_SECONDS, semaphore=None):
+    # one link on a shared session (see endpoint_prober.make_session); never raises
+    if semaphore is None:
+        return await _request(session, url, timeout)
+    async with semaphore:
+        return await _request(session, url, timeout)
+
+
+async def check_urls_async(urls, timeout=TIMEOUT_SECONDS, concurrency=CONCURRENCY, limit_per_host=LIMIT_PER_HOST):
+    from endpoint_prober import make_session
+    semaphore = asyncio.Semaphore(concurrency)
+    async with make_session(concurrency, limit_per_host) as session:
+        session.headers["User-Agent"] = USER_AGENT
+        return await asyncio.gather(*[check_url(session, url, timeout, semaphore) for url in urls])
+
+
+def read_cache(path):
+    # url -> LinkResult from earlier runs
+    try:
+        with open(path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cache.get("version") != CACHE_VERSION:
+        return {}
+    return {url: LinkResult(url, entry["status"], entry["error"], entry["checked"], entry["local"])
+            for url, entry in cache.get("results", {}).items()}
+
+
+def write_cache(path, results):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    cached = {url: {"status": r.status, "error": r.error, "checked": r.checked, "local": r.local}
+              for url, r in results.items() if not r.local and r.status != 429}
+    with open(path + ".tmp", "w") as f:
+        json.dump({"version": CACHE_VERSION, "results": cached}, f, indent=0, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def check_links(urls, root=None, cache=None, ttl=TTL_DAYS * 86400, network=True, now=None, **kwargs):
+    # -> (url -> LinkResult, counts); cache: url -> LinkResult from earlier runs, only passing results
+    # younger than ttl are reused. kwargs go to check_urls_async.
+    now = time.time() if now is None else now
+    cache = cache or {}
+    results = {}
+    remote = []
+    counts = {"local": 0, "cached": 0, "checked": 0, "skipped": 0}
+    for url in urls:
+        path = local_path(url, root)
+        if path is not None:
+            results[url] = check_local(url, path)
+            counts["local"] += 1
+            continue
+        cached = cache.get(url)
+        if cached is not None and is_ok(cached) and now - cached.checked < ttl:
+            results[url] = cached
+            counts["cached"] += 1
+        elif network:
+            remote.append(url)
+        else:
+            counts["skipped"] += 1
+    if remote:
+        for result in asyncio.run(check_urls_async(remote, **kwargs)):
+            results[result.url] = result
+        counts["checked"] = len(remote)
+    return results, counts
+
+
+def markdown_report(broken, links):
+    lines = ["# Broken links", ""]
+    for result in broken:
+        lines.append(f"* [{result.status or result.error}] <{result.url}>")
+        lines.extend(f"  * `{location.file}` `{location.pointer}`" for location in links[result.url])
+    return "\n".join(lines) + "\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the links in the registry's JSON files.")
+    parser.add_argument("--cache", default=defaultCachePath, help="results of earlier runs")
+    parser.add_argument("--ttl-days", type=float, default=TTL_DAYS, help="re-check passing links older than this")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT_SECONDS)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--limit-per-host", type=int, default=LIMIT_PER_HOST)
+    parser.add_argument("--no-network", action="store_true", help="only check links to files in this repo")
+    parser.add_argument("--markdown", metavar="FILE", help="also write the broken links as a markdown report")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    links = extract_links(load_registry())
+    cache = read_cache(args.cache)
+    results, counts = check_links(links, cache=cache, ttl=args.ttl_days * 86400, network=not args.no_network,
+                                  timeout=args.timeout, concurrency=args.concurrency,
+                                  limit_per_host=args.limit_per_host)
+    if not args.no_network:
+        write_cache(args.cache, results)
+
+    broken = sorted((result for result in results.values() if not is_ok(result)), key=lambda result: result.url)
+    for result in broken:
+        print(f"[{result.status or result.error}] {result.url}")
+        for location in links[result.url]:
+            print(f"    {location.file} {location.pointer}")
+    if args.markdown:
+        os.makedirs(os.path.dirname(os.path.abspath(args.markdown)), exist_ok=True)
+        with open(args.markdown, "w") as f:
+            f.write(markdown_report(broken, links))
+    print(f"{len(links)} links: {counts['local']} in this repo, {counts['cached']} from cache, "
+          f"{counts['checked']} checked, {counts['skipped']} skipped; {len(broken)} broken "
+          f"in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return 1 if broken else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
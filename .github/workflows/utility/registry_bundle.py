@@ -0,0 +1,230 @@
+# Purpose:
+#   to pack the whole registry (chain.json, assetlist.json, versions.json and
+#   the _IBC files) into one SQLite file, so a consumer that needs a few chains
+#   opens one file and decodes only those, instead of walking the tree and
+#   parsing everything. Chain files are stored zlib compressed, and every
+#   asset is stored on its own as well, so one asset can be read without
+#   its (possibly huge) assetlist. The reader memory-maps the file and is
+#   read-only.
+#
+# Usage:
+#   python registry_bundle.py [--bundle FILE] export [--root DIR]
+#   python registry_bundle.py get osmosis [--file assetlist]
+#   python registry_bundle.py asset osmosis uosmo
+#
+#   with registry_bundle.open_bundle(path) as bundle:
+#       bundle.chain("osmosis")["chain_id"]
+#       bundle.asset("osmosis", "uosmo")["symbol"]
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+import zlib
+
+from chain_registry import chainRegistryRoot, fileToFileNameMap, load_registry
+
+defaultBundlePath = os.path.join(chainRegistryRoot, ".cache", "registry_bundle.sqlite")
+BUNDLE_VERSION = 1
+COMPRESSION_LEVEL = 9
+# mapped at most; SQLite maps only what the file has
+MMAP_BYTES = 1 << 30
+
+SCHEMA = """
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE chains (
+    name TEXT PRIMARY KEY,
+    network_type TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    directory TEXT NOT NULL,
+    chain_id TEXT,
+    chain BLOB,
+    assetlist BLOB,
+    versions BLOB
+);
+CREATE INDEX chains_chain_id ON chains (chain_id);
+CREATE TABLE assets (
+    chain TEXT NOT NULL,
+    base TEXT NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (chain, base)
+);
+CREATE INDEX assets_base ON assets (base);
+CREATE TABLE ibc (
+    chain_1 TEXT NOT NULL,
+    chain_2 TEXT NOT NULL,
+    network_type TEXT NOT NULL,
+    file TEXT NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (chain_1, chain_2)
+);
+CREATE INDEX ibc_chain_2 ON ibc (chain_2);
+"""
+
+
+def _pack(data):
+    return zlib.compress(json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), COMPRESSION_LEVEL)
+
+
+def _unpack(blob):
+    return None if blob is None else json.loads(zlib.decompress(blob))
+
+
+def export(path=None, registry=None):
+    # writes the bundle (atomically) and returns the number of chains in it
+    path = path or defaultBundlePath
+    if registry is None:
+        registry = load_registry()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = path + ".tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    connection = sqlite3.connect(temp_path)
+    try:
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.executescript(SCHEMA)
+        connection.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", [
+            ("version", str(BUNDLE_VERSION)),
+            ("created", time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())),
+            ("files", str(registry.files_loaded)),
+        ])
+        chains = sorted(registry.chains.values(), key=lambda chain: chain.name)
+        connection.executemany(
+            "INSERT INTO chains (name, network_type, domain, directory, chain_id, chain, assetlist, versions) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (chain.name, chain.network_type, chain.domain, chain.directory, (chain.chain or {}).get("chain_id"))
+                + tuple(None if getattr(chain, file) is None else _pack(getattr(chain, file)) for file in fileToFileNameMap)
+                for chain in chains
+            ])
+        connection.executemany(
+            "INSERT OR REPLACE INTO assets (chain, base, data) VALUES (?, ?, ?)",
+            [
+                (chain.name, asset["base"], _pack(asset))
+                for chain in chains
+                for asset in (chain.assetlist or {}).get("assets", [])
+                if isinstance(asset, dict) and isinstance(asset.get("base"), str)
+            ])
+        connection.executemany(
+            "INSERT INTO ibc (chain_1, chain_2, network_type, file, data) VALUES (?, ?, ?, ?, ?)",
+            [
+                (pair[0], pair[1], ibc_connection.network_type, ibc_connection.file, _pack(ibc_connection.data))
+                for pair, ibc_connection in sorted(registry.ibc.items())
+            ])
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(temp_path, path)
+    return len(chains)
+
+
+class Bundle:
+
+    def __init__(self, connection):
+        self.connection = connection
+        rows = dict(connection.execute("SELECT key, value FROM meta"))
+        if rows.get("version") != str(BUNDLE_VERSION):
+            raise ValueError(f"unsupported bundle version {rows.get('version')!r}, expected {BUNDLE_VERSION}")
+        self.meta = rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def chain_file(self, name, file):
+        # file: a key of fileToFileNameMap ("chain", "assetlist" or "versions")
+        if file not in fileToFileNameMap:
+            raise ValueError(f"unknown chain file {file!r}")
+        row = self.connection.execute(f"SELECT {file} FROM chains WHERE name = ?", (name,)).fetchone()
+        return _unpack(row[0]) if row else None
+
+    def chain(self, name):
+        return self.chain_file(name, "chain")
+
+    def assetlist(self, name):
+        return self.chain_file(name, "assetlist")
+
+    def versions(self, name):
+        return self.chain_file(name, "versions")
+
+    def chain_names(self, network_type=None, domain=None):
+        query = "SELECT name FROM chains WHERE (? IS NULL OR network_type = ?) AND (? IS NULL OR domain = ?) ORDER BY name"
+        return [name for name, in self.connection.execute(query, (network_type, network_type, domain, domain))]
+
+    def chains_by_id(self, chain_id):
+        return [name for name, in self.connection.execute("SELECT name FROM chains WHERE chain_id = ?", (chain_id,))]
+
+    def asset(self, chain, base):
+        row = self.connection.execute("SELECT data FROM assets WHERE chain = ? AND base = ?", (chain, base)).fetchone()
+        return _unpack(row[0]) if row else None
+
+    def assets_by_base(self, base):
+        # chain -> asset, for every chain listing an asset with this base denom
+        return {chain: _unpack(data)
+                for chain, data in self.connection.execute("SELECT chain, data FROM assets WHERE base = ?", (base,))}
+
+    def ibc(self, chain_a, chain_b):
+        row = self.connection.execute(
+            "SELECT data FROM ibc WHERE (chain_1 = ? AND chain_2 = ?) OR (chain_1 = ? AND chain_2 = ?)",
+            (chain_a, chain_b, chain_b, chain_a)).fetchone()
+        return _unpack(row[0]) if row else None
+
+    def ibc_counterparties(self, chain):
+        return sorted(other for other, in self.connection.execute(
+            "SELECT chain_2 FROM ibc WHERE chain_1 = ? UNION SELECT chain_1 FROM ibc WHERE chain_2 = ?", (chain, chain)))
+
+
+def open_bundle(path=None):
+    path = path or defaultBundlePath
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    connection.execute(f"PRAGMA mmap_size = {MMAP_BYTES}")
+    try:
+        return Bundle(connection)
+    except Exception:
+        connection.close()
+        raise
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the registry to a single file, or read from one.")
+    parser.add_argument("--bundle", default=defaultBundlePath, help="bundle file")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="write the bundle from the registry")
+    export_parser.add_argument("--root", help="registry root (default: this repository)")
+    get_parser = subparsers.add_parser("get", help="print one file of a chain")
+    get_parser.add_argument("chain")
+    get_parser.add_argument("--file", choices=list(fileToFileNameMap), default="chain")
+    asset_parser = subparsers.add_parser("asset", help="print one asset of a chain")
+    asset_parser.add_argument("chain")
+    asset_parser.add_argument("base")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        start = time.perf_counter()
+        chains = export(args.bundle, load_registry(args.root))
+        print(f"{chains} chains exported to {args.bundle} ({os.path.getsize(args.bundle) / 1e6:.1f} MB) "
+              f"in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+        return 0
+    with open_bundle(args.bundle) as bundle:
+        data = bundle.chain_file(args.chain, args.file) if args.command == "get" else bundle.asset(args.chain, args.base)
+    if data is None:
+        print("not found", file=sys.stderr)
+        return 1
+    print(json.dumps(data, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
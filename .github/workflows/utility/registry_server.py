@@ -0,0 +1,199 @@
+# Purpose:
+#   to serve the registry over HTTP from one process that loads it once, so
+#   other services don't each ship the tree and parse it themselves. Every
+#   response is computed up front: compact JSON, its gzip encoding and a
+#   strong ETag, so a request is a dict lookup, and a client revalidating with
+#   If-None-Match gets a 304. The files are polled for changes; a reload only
+#   re-reads and re-encodes the responses whose files changed.
+#
+# Usage:
+#   python registry_server.py [--host 127.0.0.1] [--port 8080] [--poll 2]
+#
+#   GET /chains                           chain names, network types and domains
+#   GET /chains/osmosis                   chain.json
+#   GET /chains/osmosis/assetlist         assetlist.json
+#   GET /chains/osmosis/versions          versions.json
+#   GET /ibc/osmosis/cosmoshub            the _IBC file of a pair (either order)
+#   GET /denoms/osmosis/ibc/27394FB0...   the resolved denom (see denom_traces.py)
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import sys
+from collections import namedtuple
+
+from aiohttp import web
+
+import instrumentation
+from chain_registry import fileToFileNameMap, file_stats, ibc_pair, load_registry
+from denom_traces import DenomResolver
+
+# body: compact JSON, gzipped: the same body gzip encoded, etag: strong ETag of the body
+# (the gzip representation gets its own, as RFC 7232 asks of strong validators)
+Response = namedtuple("Response", ["body", "gzipped", "etag", "gzip_etag"])
+
+POLL_SECONDS = 2
+GZIP_LEVEL = 6
+# bodies smaller than this are always sent as they are
+GZIP_MIN_BYTES = 256
+
+chainFileRoutes = {"chain": "", "assetlist": "/assetlist", "versions": "/versions"}
+
+
+def encode(data, previous=None):
+    # -> Response; `previous` is reused if the body didn't change, which saves compressing it again
+    body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if previous is not None and previous.body == body:
+        return previous
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    return Response(body, gzip.compress(body, GZIP_LEVEL, mtime=0), f'"{digest}"', f'"{digest}-gz"')
+
+
+def accepts_gzip(header):
+    for coding in header.split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "").lower() not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def etag_matches(header, response):
+    # If-None-Match uses the weak comparison, and either representation means the client has this body
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") in (response.etag, response.gzip_etag) for tag in tags)
+
+
+def resource_path(path):
+    # the key a request path is stored under; IBC pairs are stored in ibc_pair order only
+    parts = path.rstrip("/").split("/")
+    if len(parts) == 4 and parts[1] == "ibc":
+        return "/ibc/" + "/".join(ibc_pair(parts[2], parts[3]))
+    return path.rstrip("/") or "/"
+
+
+class RegistryServer:
+
+    def __init__(self, root=None, cache_path=None):
+        self.root = root
+        self.cache_path = cache_path
+        self.responses = {}     # resource path -> Response
+        self.sources = {}       # resource path -> the file it was made from (derived resources have none)
+        self.stats = {}         # file_stats() at the last load
+        self.reloads = 0
+
+    def load(self):
+        # (re)builds the responses; -> number of resources added, changed or removed
+        stats = file_stats(self.root)
+        if self.responses and stats == self.stats:
+            return 0
+        with instrumentation.span("server_load", reload=bool(self.responses)) as span:
+            registry = load_registry(self.root, self.cache_path)
+            changed = {path for path in stats.keys() | self.stats.keys() if stats.get(path) != self.stats.get(path)}
+            failed = {path for path, _ in registry.errors}
+            previous = self.responses
+            responses, sources = {}, {}
+
+            def add(path, data, source=None):
+                if source is not None:
+                    sources[path] = source
+                    if source not in changed and path in previous:
+                        responses[path] = previous[path]
+                        return
+                responses[path] = encode(data, previous.get(path))
+
+            chains = []
+            for chain in sorted(registry.chains.values(), key=lambda chain: chain.name):
+                chains.append({"chain_name": chain.name, "network_type": chain.network_type, "domain": chain.domain})
+                for file, route in chainFileRoutes.items():
+                    data = getattr(chain, file)
+                    if data is not None:
+                        add(f"/chains/{chain.name}{route}", data, os.path.join(chain.directory, fileToFileNameMap[file]))
+            add("/chains", chains)
+            for pair, connection in sorted(registry.ibc.items()):
+                add(f"/ibc/{pair[0]}/{pair[1]}", connection.data, connection.file)
+            resolver = DenomResolver.from_registry(registry)
+            for chain, denoms in sorted(resolver.by_chain.items()):
+                for denom, resolved in denoms.items():
+                    add(f"/denoms/{chain}/{denom}", resolved._asdict())
+            # a file that doesn't parse (e.g. half written) keeps its last good response
+            for path, source in self.sources.items():
+                if path not in responses and source in failed:
+                    responses[path], sources[path] = previous[path], source
+
+            updated = sum(1 for path, response in responses.items() if previous.get(path) is not response)
+            updated += sum(1 for path in previous if path not in responses)
+            self.responses, self.sources, self.stats = responses, sources, stats
+            self.reloads += 1
+            span.set(resources=len(responses), updated=updated, files_changed=len(changed))
+        for path, message in registry.errors:
+            print(f"[!] {path}: {message}", file=sys.stderr)
+        return updated
+
+    async def handle(self, request):
+        response = self.responses.get(resource_path(request.path))
+        if response is None:
+            raise web.HTTPNotFound(text=json.dumps({"error": f"no such resource: {request.path}"}),
+                                   content_type="application/json")
+        use_gzip = len(response.body) >= GZIP_MIN_BYTES and accepts_gzip(request.headers.get("Accept-Encoding", ""))
+        headers = {
+            "ETag": response.gzip_etag if use_gzip else response.etag,
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if etag_matches(request.headers.get("If-None-Match", ""), response):
+            return web.Response(status=304, headers=headers)
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+        return web.Response(body=response.gzipped if use_gzip else response.body, headers=headers,
+                            content_type="application/json", charset="utf-8")
+
+    async def watch(self, interval=POLL_SECONDS):
+        # polls the files and reloads in a worker thread, so requests keep being answered meanwhile
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                updated = await loop.run_in_executor(None, self.load)
+            except Exception as e:
+                print(f"[!] reload failed: {type(e).__name__} {e}", file=sys.stderr)
+                continue
+            if updated:
+                print(f"[i] reloaded, {updated} resources updated", file=sys.stderr)
+
+    def app(self, poll=POLL_SECONDS):
+        # poll: seconds between checks for changed files (None = never reload)
+        app = web.Application()
+        app.router.add_get("/{path:.*}", self.handle)
+
+        async def watcher(app):
+            task = asyncio.ensure_future(self.watch(poll)) if poll else None
+            yield
+            if task:
+                task.cancel()
+
+        app.cleanup_ctx.append(watcher)
+        return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve registry data over HTTP with ETags and gzip.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--poll", type=float, default=POLL_SECONDS, help="seconds between checks for changed files (0 = never)")
+    parser.add_argument("--root", help="registry root (default: this repository)")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    with instrumentation.instrumented(args):
+        server = RegistryServer(args.root)
+        server.load()
+        print(f"[i] {len(server.responses)} resources loaded, serving on http://{args.host}:{args.port}", file=sys.stderr)
+        web.run_app(server.app(args.poll or None), host=args.host, port=args.port, print=None)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
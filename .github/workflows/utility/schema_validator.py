@@ -0,0 +1,160 @@
+# Purpose:
+#   to validate the registry's JSON files against the repo's own schemas
+#   (chain, assetlist, versions, ibc_data, memo_keys). Each schema is compiled
+#   once per process into a validator, the files are validated in a process
+#   pool, and the report lists every error with its JSON path, plus time spent
+#   per schema and the slowest files.
+#
+# Usage:
+#   report = schema_validator.validate_files()
+#
+#   python schema_validator.py [--jobs N] [--schema chain ...] [--report FILE] [--slowest 5]
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import jsonschema
+
+import instrumentation
+from chain_registry import chainRegistryRoot, fileToFileNameMap, load_registry
+
+# schema name -> schema file at the registry root
+schemaFileNameMap = {
+    "chain": "chain.schema.json",
+    "assetlist": "assetlist.schema.json",
+    "versions": "versions.schema.json",
+    "ibc_data": "ibc_data.schema.json",
+    "memo_keys": "memo_keys.schema.json",
+}
+memoKeysDirectoryName = "_memo_keys"
+
+_validators = {}
+
+
+def validator_class(schema):
+    # the schemas declare https://json-schema.org/draft-07/schema, jsonschema knows http://...draft-07/schema#
+    uri = schema.get("$schema", "").replace("https://", "http://").rstrip("#") + "#"
+    return jsonschema.validators.validator_for({"$schema": uri}, default=jsonschema.Draft7Validator)
+
+
+def compile_validators(root=None, schemas=None):
+    # schema name -> validator; raises jsonschema.SchemaError for a broken schema
+    validators = {}
+    for name in schemas or schemaFileNameMap:
+        with open(os.path.join(root or chainRegistryRoot, schemaFileNameMap[name]), encoding="utf-8") as f:
+            schema = json.load(f)
+        cls = validator_class(schema)
+        cls.check_schema(schema)
+        validators[name] = cls(schema)
+    return validators
+
+
+def init_worker(root, schemas):
+    _validators.update(compile_validators(root, schemas))
+
+
+def json_path(error):
+    return "/" + "/".join(str(part) for part in error.absolute_path)
+
+
+def validate_task(task):
+    # task: (schema name, relative path, data) -> (schema name, relative path, [(path, message)], seconds)
+    name, relative_path, data = task
+    start = time.perf_counter()
+    errors = sorted((json_path(error), error.message) for error in _validators[name].iter_errors(data))
+    return name, relative_path, errors, time.perf_counter() - start
+
+
+def registry_tasks(registry, schemas=None):
+    tasks = []
+    for chain in registry.chains.values():
+        for name, file_name in fileToFileNameMap.items():
+            data = getattr(chain, name)
+            if data is not None:
+                tasks.append((name, os.path.join(chain.directory, file_name), data))
+    for connection in registry.ibc.values():
+        tasks.append(("ibc_data", connection.file, connection.data))
+    memo_keys = registry.path(memoKeysDirectoryName)
+    if os.path.isdir(memo_keys):
+        for file_name in sorted(os.listdir(memo_keys)):
+            if file_name.endswith(".json"):
+                with open(os.path.join(memo_keys, file_name), encoding="utf-8") as f:
+                    tasks.append(("memo_keys", os.path.join(memoKeysDirectoryName, file_name), json.load(f)))
+    return [task for task in tasks if schemas is None or task[0] in schemas]
+
+
+def validate_files(registry=None, schemas=None, jobs=None, slowest=5):
+    # schemas: only these schema names (None = all); jobs: worker processes (None = one per core)
+    # returns a report with every error found; the caller decides whether to fail
+    if registry is None:
+        registry = load_registry()
+    start = time.perf_counter()
+    schemas = list(schemas or schemaFileNameMap)
+    tasks = registry_tasks(registry, schemas)
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    with instrumentation.span("validate_schemas", files=len(tasks), jobs=jobs):
+        if jobs > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(registry.root, schemas)) as pool:
+                results = list(pool.map(validate_task, tasks, chunksize=max(1, len(tasks) // (jobs * 4))))
+        else:
+            init_worker(registry.root, schemas)
+            results = [validate_task(task) for task in tasks]
+
+    report = {"files_checked": len(results), "jobs": jobs, "errors": [], "schemas": {}}
+    for relative_path, message in registry.errors:
+        report["errors"].append({"file": relative_path, "schema": None, "path": "", "message": message})
+    for name in schemas:
+        report["schemas"][name] = {"files": 0, "seconds": 0.0, "slowest": []}
+    for name, relative_path, errors, seconds in results:
+        for path, message in errors:
+            report["errors"].append({"file": relative_path, "schema": name, "path": path, "message": message})
+        timing = report["schemas"][name]
+        timing["files"] += 1
+        timing["seconds"] += seconds
+        timing["slowest"].append((seconds, relative_path))
+    for timing in report["schemas"].values():
+        timing["seconds"] = round(timing["seconds"], 4)
+        timing["slowest"] = [{"file": relative_path, "seconds": round(seconds, 4)}
+                             for seconds, relative_path in sorted(timing["slowest"], reverse=True)[:slowest]]
+    report["seconds"] = round(time.perf_counter() - start, 3)
+    return report
+
+
+def print_report(report):
+    for error in report["errors"]:
+        print(f"[ERROR] {error['file']} {error['path']}: {error['message']}")
+    for name, timing in sorted(report["schemas"].items(), key=lambda item: -item[1]["seconds"]):
+        print(f"{name:<10} {timing['files']:>5} files {timing['seconds'] * 1000:8.1f} ms")
+        for slow in timing["slowest"]:
+            print(f"           {slow['seconds'] * 1000:8.1f} ms  {slow['file']}")
+    failed = len(set(error["file"] for error in report["errors"]))
+    print(f"{report['files_checked']} files checked in {report['seconds']}s with {report['jobs']} jobs: "
+          f"{len(report['errors'])} errors in {failed} files")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate registry files against the repo's JSON schemas.")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--schema", action="append", choices=sorted(schemaFileNameMap),
+                        help="only validate files of this schema (repeatable)")
+    parser.add_argument("--slowest", type=int, default=5, help="slowest files to list per schema")
+    parser.add_argument("--report", metavar="FILE", help="also write the report as JSON")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    with instrumentation.instrumented(args):
+        report = validate_files(schemas=args.schema, jobs=args.jobs, slowest=args.slowest)
+    print_report(report)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+# Purpose:
+#   to provide the SLIP-0044 (coin types) and SLIP-0173 (bech32 prefixes)
+#   registries offline, from a vendored snapshot (slip_tables.json) that is
+#   rebuilt explicitly from local copies of the upstream markdown files.
+#
+# Usage:
+#   tables = slip_tables.load_tables()
+#   tables.coin_type("Osmosis"), tables.chain_for_prefix("osmo")
+#
+#   python slip_tables.py refresh --slip44 slip-0044.md --slip173 slip-0173.md
+#   python slip_tables.py refresh --download
+#   (the markdown lives at https://github.com/satoshilabs/slips)
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import urllib.request
+
+SNAPSHOT_VERSION = 1
+snapshotPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "slip_tables.json")
+
+slip44URL = "https://raw.githubusercontent.com/satoshilabs/slips/master/slip-0044.md"
+slip173URL = "https://raw.githubusercontent.com/satoshilabs/slips/master/slip-0173.md"
+
+linkPattern = re.compile(r"\[([^\]]*)\]\(([^)]*)\)")
+codePattern = re.compile(r"`([^`]*)`")
+
+
+def _cells(line):
+    line = line.strip()
+    if line.startswith("|"):
+        line = line[1:]
+    if line.endswith("|"):
+        line = line[:-1]
+    return [cell.strip() for cell in line.split("|")]
+
+
+def parse_slip44(lines):
+    # rows look like: | 118 | 0x80000076 | ATOM | [Atom](https://cosmos.network) |
+    # unassigned and reserved rows have an empty coin name
+    coins = {}
+    for line in lines:
+        cells = _cells(line)
+        if len(cells) < 4 or not cells[0].isdigit():
+            continue
+        link = linkPattern.search(cells[3])
+        coins[int(cells[0])] = {
+            "symbol": cells[2],
+            "name": link.group(1) if link else cells[3],
+            "website": link.group(2) if link else "",
+        }
+    if not coins:
+        raise ValueError("no SLIP-0044 entries recorded")
+    return coins
+
+
+def parse_slip173(lines):
+    # rows look like: | [Osmosis](https://osmosis.zone) | `osmo` | `osmotest` |
+    chains = {}
+    for line in lines:
+        cells = _cells(line)
+        if len(cells) < 2:
+            continue
+        link = linkPattern.match(cells[0])
+        if not link:
+            continue
+        entry = {"website": link.group(2)}
+        for network, cell in zip(("mainnet", "testnet"), cells[1:3]):
+            prefix = codePattern.search(cell)
+            if prefix:
+                entry[network] = prefix.group(1)
+        chains[link.group(1)] = entry
+    if not chains:
+        raise ValueError("no SLIP-0173 entries recorded")
+    return chains
+
+
+class SlipTables:
+
+    def __init__(self, snapshot):
+        self.sources = snapshot.get("sources", {})
+        self.coins = {int(number): coin for number, coin in snapshot["slip44"].items()}
+        self.bech32 = snapshot["slip173"]
+        self.coin_types_by_name = {}
+        for number, coin in sorted(self.coins.items()):
+            if coin["name"]:
+                self.coin_types_by_name[coin["name"]] = number
+        self.chains_by_prefix = {}
+        for pretty, entry in self.bech32.items():
+            for network in ("mainnet", "testnet"):
+                if network in entry:
+                    self.chains_by_prefix.setdefault(entry[network], (pretty, network))
+
+    def coin(self, number):
+        return self.coins.get(number)
+
+    def coin_type(self, pretty_name):
+        return self.coin_types_by_name.get(pretty_name)
+
+    def prefixes(self, pretty_name):
+        return self.bech32.get(pretty_name)
+
+    def chain_for_prefix(self, prefix):
+        # -> (pretty name, "mainnet" | "testnet") or None
+        return self.chains_by_prefix.get(prefix)
+
+
+def build_snapshot(slip44_text, slip173_text):
+    return {
+        "version": SNAPSHOT_VERSION,
+        "sources": {
+            "slip-0044": {"url": slip44URL, "sha256": hashlib.sha256(slip44_text.encode("utf-8")).hexdigest()},
+            "slip-0173": {"url": slip173URL, "sha256": hashlib.sha256(slip173_text.encode("utf-8")).hexdigest()},
+        },
+        "slip44": {str(number): coin for number, coin in sorted(parse_slip44(slip44_text.splitlines()).items())},
+        "slip173": parse_slip173(slip173_text.splitlines()),
+    }
+
+
+def load_tables(path=None):
+    try:
+        with open(path or snapshotPath, encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"no SLIP snapshot at {path or snapshotPath}; "
+                                f"run slip_tables.py refresh --download and commit it") from None
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"{path or snapshotPath} is snapshot version {snapshot.get('version')}, "
+                         f"expected {SNAPSHOT_VERSION}; run slip_tables.py refresh")
+    return SlipTables(snapshot)
+
+
+def _read_source(path_or_url):
+    if path_or_url.startswith(("http://", "https://")):
+        with urllib.request.urlopen(path_or_url) as response:
+            return response.read().decode("utf-8")
+    with open(path_or_url, encoding="utf-8") as f:
+        return f.read()
+
+
+def refresh(slip44_path, slip173_path, path=None):
+    # slip44_path / slip173_path: local markdown files, or the upstream urls
+    slip44_text = _read_source(slip44_path)
+    slip173_text = _read_source(slip173_path)
+    snapshot = build_snapshot(slip44_text, slip173_text)
+    path = path or snapshotPath
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    os.replace(path + ".tmp", path)
+    return snapshot
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the vendored SLIP-0044/SLIP-0173 snapshot.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    refresh_parser = subparsers.add_parser("refresh", help="rebuild the snapshot from local markdown files")
+    refresh_parser.add_argument("--slip44", help="path to slip-0044.md")
+    refresh_parser.add_argument("--slip173", help="path to slip-0173.md")
+    refresh_parser.add_argument("--download", action="store_true", help="read both from github.com/satoshilabs/slips")
+    refresh_parser.add_argument("--output", default=snapshotPath)
+    args = parser.parse_args(argv)
+    if args.download:
+        args.slip44, args.slip173 = args.slip44 or slip44URL, args.slip173 or slip173URL
+    elif not (args.slip44 and args.slip173):
+        parser.error("refresh needs --slip44 and --slip173, or --download")
+
+    snapshot = refresh(args.slip44, args.slip173, args.output)
+    print(f"wrote {len(snapshot['slip44'])} SLIP-0044 and {len(snapshot['slip173'])} SLIP-0173 entries to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
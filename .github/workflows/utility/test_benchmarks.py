@@ -0,0 +1,63 @@
+import json
+import os
+
+import pytest
+
+import benchmarks
+import ibc_validator
+import validate_data
+from chain_registry import load_registry
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def make_source(root):
+    for name in ("a", "ab"):
+        write_json(os.path.join(root, name, "chain.json"), {
+            "chain_name": name, "chain_id": f"{name}-1", "pretty_name": name.upper(), "bech32_prefix": name,
+            "slip44": 118, "apis": {"rpc": [{"address": f"https://rpc.{name}", "provider": "P"}]}})
+        write_json(os.path.join(root, name, "assetlist.json"), {"chain_name": name, "assets": []})
+    write_json(os.path.join(root, "_IBC", "a-ab.json"), {
+        "chain_1": {"chain_name": "a", "client_id": "c1", "connection_id": "n1"},
+        "chain_2": {"chain_name": "ab", "client_id": "c2", "connection_id": "n2"},
+        "channels": [{"chain_1": {"channel_id": "channel-1", "port_id": "transfer"},
+                      "chain_2": {"channel_id": "channel-2", "port_id": "transfer"},
+                      "ordering": "unordered", "version": "ics20-1"}]})
+
+
+def test_synthetic_registry_keeps_ibc_pairs_in_order(tmp_path):
+    make_source(str(tmp_path / "source"))
+    root = str(tmp_path / "scaled")
+    benchmarks.make_synthetic_registry(load_registry(str(tmp_path / "source"), use_cache=False), root, 3)
+
+    registry = load_registry(root, use_cache=False)
+    assert sorted(registry.chains) == ["a", "ab", "abx1", "abx2", "ax1", "ax2"]
+    assert registry.chains["ax1"].chain["chain_id"] == "a-1x1"
+    # "abx1" sorts before "ax1", so the copy swaps sides
+    copy = registry.ibc[("abx1", "ax1")].data
+    assert copy["chain_1"]["client_id"] == "c2"
+    assert copy["channels"][0]["chain_1"]["channel_id"] == "channel-2"
+    assert not any(ibc_validator.validate(root).values())
+
+
+def test_run_benchmarks(tmp_path):
+    pytest.importorskip("aiohttp")
+    make_source(str(tmp_path / "source"))
+    slip_state = tuple(dict(value) if isinstance(value, dict) else value for value in validate_data.slipState())
+    output = benchmarks.run_benchmarks([1, 2], repeat=1, latency=0, max_probes=3, source_root=str(tmp_path / "source"))
+
+    assert [(result["name"], result["scale"]) for result in output["results"]] == [
+        (name, scale) for scale in (1, 2) for name in (
+            "load_registry_cold", "load_registry_warm", "generate_endpoint_tests", "check_chains", "ibc_validate",
+            "probe_endpoints")]
+    by_name = {(result["name"], result["scale"]): result for result in output["results"]}
+    assert by_name[("load_registry_cold", 2)]["chains"] == 4
+    assert by_name[("probe_endpoints", 2)]["items"] == 3
+    assert by_name[("probe_endpoints", 2)]["ok"] == 3 and by_name[("probe_endpoints", 2)]["capped"]
+    json.dumps(output)
+    # validate_data's SLIP tables are left as they were
+    assert validate_data.slipState() == slip_state
@@ -0,0 +1,87 @@
+import json
+import os
+
+from chain_registry import Endpoint, ibc_pair, load_registry
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def make_registry(root):
+    write_json(os.path.join(root, "alpha", "chain.json"), {
+        "chain_name": "alpha",
+        "chain_id": "alpha-1",
+        "apis": {"rpc": [{"address": "https://rpc.alpha", "provider": "Node Co"}]},
+    })
+    write_json(os.path.join(root, "alpha", "assetlist.json"), {
+        "chain_name": "alpha",
+        "assets": [{"base": "ualpha"}],
+    })
+    write_json(os.path.join(root, "_non-cosmos", "ethereum", "assetlist.json"), {
+        "chain_name": "ethereum",
+        "assets": [{"base": "wei"}],
+    })
+    write_json(os.path.join(root, "testnets", "alphatestnet", "chain.json"), {
+        "chain_name": "alphatestnet",
+        "chain_id": "alpha-test-1",
+        "apis": {"rest": [{"address": "https://rest.alphatest", "provider": "Node Co"}]},
+    })
+    write_json(os.path.join(root, "_IBC", "alpha-beta.json"), {
+        "chain_1": {"chain_name": "alpha"},
+        "chain_2": {"chain_name": "beta"},
+        "channels": [{"chain_1": {"channel_id": "channel-0"}, "chain_2": {"channel_id": "channel-7"}}],
+    })
+    write_json(os.path.join(root, "_template", "chain.json"), {"chain_name": "template"})
+    os.makedirs(os.path.join(root, "beta"))
+    with open(os.path.join(root, "beta", "chain.json"), "w") as f:
+        f.write("{not json")
+
+
+def test_single_pass_indexes(tmp_path):
+    make_registry(str(tmp_path))
+    registry = load_registry(str(tmp_path))
+
+    assert set(registry.chains) == {"alpha", "ethereum", "alphatestnet"}
+    assert registry.chains["ethereum"].domain == "non-cosmos"
+    assert registry.chains["ethereum"].chain is None
+    assert registry.chains["alphatestnet"].network_type == "testnet"
+    assert registry.chains["alphatestnet"].directory == os.path.join("testnets", "alphatestnet")
+    assert [chain.name for chain in registry.chains_by_id["alpha-1"]] == ["alpha"]
+    assert registry.assets_by_base["wei"][0].chain_name == "ethereum"
+    assert registry.endpoints_by_provider["Node Co"] == [
+        Endpoint("alpha", "rpc", "Node Co", "https://rpc.alpha"),
+        Endpoint("alphatestnet", "rest", "Node Co", "https://rest.alphatest"),
+    ]
+    assert registry.ibc_channels("beta", "alpha")[0]["chain_2"]["channel_id"] == "channel-7"
+    assert [path for path, _ in registry.errors] == [os.path.join("beta", "chain.json")]
+
+
+def test_ibc_pair_is_order_independent():
+    assert ibc_pair("osmosis", "Agoric") == ibc_pair("Agoric", "osmosis") == ("Agoric", "osmosis")
+
+
+def test_cache_only_reparses_changed_files(tmp_path):
+    make_registry(str(tmp_path))
+    cache_path = str(tmp_path / "cache.pickle")
+
+    first = load_registry(str(tmp_path), cache_path=cache_path)
+    assert first.files_parsed == first.files_loaded == 5
+
+    second = load_registry(str(tmp_path), cache_path=cache_path)
+    assert second.files_parsed == 0
+    assert second.chains["alpha"].chain == first.chains["alpha"].chain
+
+    write_json(str(tmp_path / "alpha" / "chain.json"), {"chain_name": "alpha", "chain_id": "alpha-2"})
+    os.utime(str(tmp_path / "alpha" / "chain.json"), ns=(1, 1))
+    third = load_registry(str(tmp_path), cache_path=cache_path)
+    assert third.files_parsed == 1
+    assert list(third.chains_by_id) == ["alpha-2", "alpha-test-1"]
+
+
+def test_cache_can_be_disabled(tmp_path):
+    make_registry(str(tmp_path))
+    load_registry(str(tmp_path), use_cache=False)
+    assert not os.path.exists(str(tmp_path / ".cache"))
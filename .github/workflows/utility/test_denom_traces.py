@@ -0,0 +1,90 @@
+import json
+import os
+
+from chain_registry import load_registry
+from denom_traces import DenomResolver, ibc_denom
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def ibc_trace(counterparty, base_denom, channel_id, counterparty_channel_id, path=None):
+    trace = {
+        "type": "ibc",
+        "counterparty": {"chain_name": counterparty, "base_denom": base_denom, "channel_id": counterparty_channel_id},
+        "chain": {"channel_id": channel_id},
+    }
+    if path:
+        trace["chain"]["path"] = path
+    return trace
+
+
+def make_resolver(root):
+    # uatom goes hub -> osmo -> juno; a juno cw20 goes over juno's wasm port to osmo
+    write_json(os.path.join(root, "_IBC", "hub-osmo.json"), {
+        "chain_1": {"chain_name": "hub"},
+        "chain_2": {"chain_name": "osmo"},
+        "channels": [{"chain_1": {"channel_id": "channel-141", "port_id": "transfer"},
+                      "chain_2": {"channel_id": "channel-0", "port_id": "transfer"}}],
+    })
+    write_json(os.path.join(root, "_IBC", "juno-osmo.json"), {
+        "chain_1": {"chain_name": "juno"},
+        "chain_2": {"chain_name": "osmo"},
+        "channels": [{"chain_1": {"channel_id": "channel-0", "port_id": "transfer"},
+                      "chain_2": {"channel_id": "channel-42", "port_id": "transfer"}},
+                     {"chain_1": {"channel_id": "channel-47", "port_id": "wasm.juno1bridge"},
+                      "chain_2": {"channel_id": "channel-169", "port_id": "transfer"}}],
+    })
+    osmo_atom = ibc_denom("transfer/channel-0/uatom")
+    juno_atom = ibc_denom("transfer/channel-0/transfer/channel-0/uatom")
+    write_json(os.path.join(root, "hub", "assetlist.json"), {"chain_name": "hub", "assets": [{"base": "uatom"}]})
+    write_json(os.path.join(root, "osmo", "assetlist.json"), {"chain_name": "osmo", "assets": [
+        {"base": osmo_atom, "traces": [ibc_trace("hub", "uatom", "channel-0", "channel-141")]},
+        {"base": ibc_denom("transfer/channel-169/cw20:juno1token"), "traces": [{
+            "type": "ibc-cw20",
+            "counterparty": {"chain_name": "juno", "base_denom": "cw20:juno1token", "channel_id": "channel-47"},
+            "chain": {"channel_id": "channel-169"},
+        }]},
+        {"base": "ibc/0000", "traces": [ibc_trace("juno", "ujuno", "channel-42", "channel-0")]},
+    ]})
+    write_json(os.path.join(root, "juno", "assetlist.json"), {"chain_name": "juno", "assets": [
+        {"base": "ujuno"},
+        {"base": "cw20:juno1token"},
+        {"base": juno_atom, "traces": [
+            ibc_trace("hub", "uatom", "channel-0", "channel-141"),
+            ibc_trace("osmo", osmo_atom, "channel-0", "channel-42"),
+        ]},
+    ]})
+    return DenomResolver.from_registry(load_registry(root, use_cache=False)), osmo_atom, juno_atom
+
+
+def test_ibc_denom():
+    assert ibc_denom("transfer/channel-0/uatom") == \
+        "ibc/27394FB092D2ECCD56123C74F36E4C1F926001CEADA9CA97EA622B25F41E5EB2"
+
+
+def test_resolves_multi_hop_paths_and_origins(tmp_path):
+    resolver, osmo_atom, juno_atom = make_resolver(str(tmp_path))
+    assert len(resolver) == 7
+
+    native = resolver.lookup("hub", "uatom")
+    assert (native.path, native.origin_chain, native.origin_denom) == ("uatom", "hub", "uatom")
+
+    atom = resolver.lookup("juno", juno_atom)
+    assert atom.path == "transfer/channel-0/transfer/channel-0/uatom"
+    assert (atom.origin_chain, atom.origin_denom) == ("hub", "uatom")
+    assert atom.asset["base"] == juno_atom
+
+    token = resolver.lookup("osmo", ibc_denom("transfer/channel-169/cw20:juno1token"))
+    assert (token.origin_chain, token.origin_denom) == ("juno", "cw20:juno1token")
+    assert resolver.lookup("osmo", "uatom") is None
+    assert resolver.lookup("nowhere", "uatom") is None
+
+
+def test_reports_bases_that_do_not_match_the_traces(tmp_path):
+    resolver, _, _ = make_resolver(str(tmp_path))
+    assert [(m.chain, m.base) for m in resolver.mismatches] == [("osmo", "ibc/0000")]
+    assert resolver.lookup("osmo", "ibc/0000").origin_chain == "juno"
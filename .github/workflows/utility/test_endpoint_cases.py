@@ -0,0 +1,72 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from endpoint_cases import load_cases, parse_shard, select, shard, split_names  # noqa: E402
+from endpoint_prober import EndpointTest  # noqa: E402
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def make_registry(root):
+    write_json(os.path.join(root, "alpha", "chain.json"), {"chain_name": "alpha", "apis": {
+        "rpc": [{"address": "https://rpc.a", "provider": "P"}, {"address": "https://rpc2.a", "provider": "Q"}],
+        "rest": [{"address": "https://rest.a", "provider": "P"}, {"provider": "P"}]}})
+    write_json(os.path.join(root, "beta", "chain.json"), {"chain_name": "beta", "apis": {
+        "rpc": [{"address": "https://rpc.b", "provider": "Q"}]}})
+    write_json(os.path.join(root, "testnets", "betatestnet", "chain.json"), {"chain_name": "betatestnet", "apis": {
+        "rpc": [{"address": "https://rpc.bt", "provider": "Q"}]}})
+
+
+def test_load_cases(tmp_path):
+    root, path = str(tmp_path / "registry"), str(tmp_path / "cases.pickle")
+    make_registry(root)
+    cases, problems = load_cases(path, root)
+    assert cases == [
+        EndpointTest("alpha", "rpc", "P", "https://rpc.a/status"),
+        EndpointTest("alpha", "rpc", "Q", "https://rpc2.a/status"),
+        EndpointTest("alpha", "rest", "P", "https://rest.a/cosmos/base/tendermint/v1beta1/syncing"),
+        EndpointTest("beta", "rpc", "Q", "https://rpc.b/status"),
+    ]
+    assert problems == [f"Missing 'address' key in 'rest' of file '{os.path.join('alpha', 'chain.json')}'.",
+                        f"Missing 'rest' key in 'apis' of file '{os.path.join('beta', 'chain.json')}'."]
+
+    # saved cases are used until a chain.json changes
+    with open(path, "rb") as f:
+        saved = f.read()
+    assert load_cases(path, root) == (cases, problems)
+    with open(path, "rb") as f:
+        assert f.read() == saved
+    write_json(os.path.join(root, "beta", "chain.json"), {"chain_name": "beta", "apis": {"rpc": [], "rest": []}})
+    cases, problems = load_cases(path, root)
+    assert [case.chain for case in cases] == ["alpha"] * 3 and len(problems) == 1
+
+
+def test_select_and_shard():
+    cases = [EndpointTest(chain, "rpc", provider, f"https://{chain}.{provider}")
+             for chain in ("alpha", "beta", "gamma", "delta") for provider in ("P", "Q", "R")]
+    assert select(cases) == cases
+    assert select(cases, chains=["beta"], providers=["Q", "R"]) == cases[4:6]
+    assert split_names(" alpha,beta ,, ") == ["alpha", "beta"] and split_names(None) == []
+
+    for by in ("chain", "provider"):
+        shards = [shard(cases, index, 3, by=by) for index in (1, 2, 3)]
+        assert sorted(case for cases_ in shards for case in cases_) == sorted(cases)
+        for cases_ in shards:
+            # a chain (or provider) is never split across shards
+            keys = {getattr(case, by) for case in cases_}
+            assert all(getattr(case, by) not in keys for other in shards if other is not cases_ for case in other)
+    with pytest.raises(ValueError):
+        shard(cases, 1, 2, by="address")
+
+    assert parse_shard("2/4") == (2, 4)
+    for value in ("0/4", "5/4", "4", "a/b"):
+        with pytest.raises(ValueError):
+            parse_shard(value)
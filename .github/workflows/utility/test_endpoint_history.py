@@ -0,0 +1,61 @@
+import time
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from endpoint_history import open_history, percentile
+from endpoint_prober import EndpointTest, ProbeResult
+
+
+def result(address, status, latency, provider="Node Co", endpoint="rpc", height=None):
+    test = EndpointTest("alpha", endpoint, provider, address)
+    return ProbeResult(test, status, latency, None if status else "Timeout", height)
+
+
+@pytest.fixture
+def history():
+    with open_history(":memory:") as history:
+        now = time.time()
+        history.record([
+            result("https://rpc.good//status", 200, 0.1, height=100),
+            result("https://rpc.flaky/status", 200, 0.3, provider="Flaky"),
+        ], ts=now - 2 * 86400)
+        history.record([
+            result("https://rpc.good//status", 200, 0.2, height=105),
+            result("https://rpc.flaky/status", None, 2.0, provider="Flaky"),
+        ], ts=now - 3600)
+        history.record([result("https://rpc.good/status", 200, 0.9)], ts=now - 60 * 86400)
+        yield history
+
+
+def test_uptime_and_latency(history):
+    assert history.uptime(days=30) == {"https://rpc.good": 1.0, "https://rpc.flaky": 0.5}
+    assert history.uptime(days=None)["https://rpc.good"] == 1.0
+    assert history.latency_percentiles(days=30) == {"https://rpc.good": (0.1, 0.2), "https://rpc.flaky": (0.3, 0.3)}
+
+
+def test_last_success_and_endpoints_by_chain(history):
+    last_success = history.last_success()
+    assert last_success["https://rpc.good"] > last_success["https://rpc.flaky"]
+    assert set(history.endpoints_by_chain()["alpha"]["rpc"]) == {"https://rpc.good", "https://rpc.flaky"}
+    first_seen = history.first_seen()
+    assert time.time() - first_seen["https://rpc.good"] > 59 * 86400 > time.time() - first_seen["https://rpc.flaky"]
+
+
+def test_stats_rank_best_first(history):
+    stats = history.stats(days=30)
+    assert [s.provider for s in stats] == ["Node Co", "Flaky"]
+    assert stats[0].probes == 2 and stats[0].p95 == 0.2
+
+
+def test_heights_are_stored(history):
+    heights = history.connection.execute("SELECT height FROM probes WHERE height IS NOT NULL ORDER BY ts").fetchall()
+    assert heights == [(100,), (105,)]
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 21))
+    assert percentile(values, 0.5) == 10
+    assert percentile(values, 0.95) == 19
+    assert percentile([], 0.5) is None
@@ -0,0 +1,105 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from endpoint_prober import EndpointTest, endpoint_tests, probe_endpoints
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path.startswith("/slow"):
+            time.sleep(0.3)
+        status = 500 if self.path.startswith("/broken") else 200
+        body = b'{"result": {"sync_info": {"latest_block_height": "42"}}}'
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def make_test(address, provider="stub"):
+    return EndpointTest(chain="stubchain", endpoint="rpc", provider=provider, address=address)
+
+
+def test_results_follow_input_order(stub_server):
+    tests = [
+        make_test(f"{stub_server}/status"),
+        make_test(f"{stub_server}/broken/status"),
+        make_test("http://127.0.0.1:1/status"),
+    ]
+    results = probe_endpoints(tests, timeout=2)
+    assert [result.test for result in results] == tests
+    assert results[0].status == 200 and results[0].error is None
+    assert results[0].height == 42
+    assert results[1].status == 500 and results[1].error is None
+    assert results[2].status is None and results[2].error == "ClientConnectorError"
+    assert all(result.latency >= 0 for result in results)
+
+
+def test_timeout_is_reported(stub_server):
+    result, = probe_endpoints([make_test(f"{stub_server}/slow/status")], timeout=0.05)
+    assert result.status is None
+    assert result.error == "Timeout"
+
+
+def test_probes_run_concurrently(stub_server):
+    tests = [make_test(f"{stub_server}/slow/{i}") for i in range(20)]
+    start = time.perf_counter()
+    results = probe_endpoints(tests, timeout=5, concurrency=20, limit_per_host=20)
+    assert all(result.status == 200 for result in results)
+    assert time.perf_counter() - start < 0.3 * 20 / 2
+
+
+def test_provider_rate_limit(stub_server):
+    tests = [make_test(f"{stub_server}/status", provider="limited") for _ in range(5)]
+    tests.append(make_test(f"{stub_server}/status", provider="free"))
+    start = time.perf_counter()
+    results = probe_endpoints(tests, timeout=2, provider_rate={"limited": 20})
+    assert all(result.status == 200 for result in results)
+    # five starts at 20/s need at least four 50ms gaps
+    assert time.perf_counter() - start >= 0.2
+
+
+def test_endpoint_tests_from_chain_json():
+    chain = {
+        "chain_name": "stubchain",
+        "apis": {
+            "rpc": [{"address": "https://rpc.example.com/", "provider": "Example"}],
+            "rest": [{"address": "https://rest.example.com", "provider": "Example"}],
+            "grpc": [{"address": "grpc.example.com:443", "provider": "Example"}],
+        },
+    }
+    assert endpoint_tests(chain) == [
+        EndpointTest("stubchain", "rpc", "Example", "https://rpc.example.com/status"),
+        EndpointTest("stubchain", "rest", "Example", "https://rest.example.com/cosmos/base/tendermint/v1beta1/syncing"),
+    ]
+
+
+def test_waiting_for_a_busy_host_is_not_timed(stub_server):
+    # six rounds of two requests on one host take longer than the timeout, but no single request does
+    tests = [make_test(f"{stub_server}/slow/{i}") for i in range(12)]
+    start = time.perf_counter()
+    results = probe_endpoints(tests, timeout=1, limit_per_host=2)
+    assert time.perf_counter() - start > 1
+    assert [result.error for result in results] == [None] * len(tests)
+    assert max(result.latency for result in results) < 1
@@ -0,0 +1,118 @@
+import json
+import os
+import shutil
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+import endpoint_ranking
+from chain_registry import load_registry
+from endpoint_prober import EndpointTest, ProbeResult
+
+# node -> (http status, height, catching_up)
+NODES = {
+    "fast": (200, 100, False),
+    "behind": (200, 95, False),
+    "lagging": (200, 50, False),
+    "catchingup": (200, 100, True),
+    "broken": (500, 0, False),
+}
+
+
+class StubNode(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        node = self.path.split("/")[1]
+        status, height, catching_up = NODES[node]
+        if self.path.endswith("/syncing"):
+            body = json.dumps({"syncing": catching_up}).encode()
+        elif self.path.endswith("/blocks/latest"):
+            # newer nodes answer with "sdk_block", older ones only with "block"
+            block = "sdk_block" if node == "fast" else "block"
+            body = json.dumps({block: {"header": {"height": str(height)}}}).encode()
+        else:
+            body = json.dumps({"result": {"sync_info": {"latest_block_height": str(height), "catching_up": catching_up}}}).encode()
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def registry(tmp_path_factory):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubNode)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    root = tmp_path_factory.mktemp("registry")
+    os.makedirs(root / "alpha")
+    (root / "alpha" / "chain.json").write_text(json.dumps({
+        "chain_name": "alpha",
+        "apis": {
+            "rpc": [{"address": f"{base}/{node}", "provider": node} for node in NODES],
+            "rest": [{"address": f"{base}/{node}/", "provider": node} for node in NODES],
+        },
+    }))
+    yield load_registry(str(root), use_cache=False)
+    server.shutdown()
+
+
+def test_rpc_ranking_drops_unhealthy_and_lagging(registry):
+    endpoint_ranking.clear_cache()
+    ranked = endpoint_ranking.rank_endpoints("alpha", "rpc", registry=registry, max_lag=10)
+    assert sorted(endpoint.provider for endpoint in ranked) == ["behind", "fast"]
+    assert all(endpoint.address.endswith(endpoint.provider) for endpoint in ranked)
+    assert ranked == sorted(ranked, key=lambda endpoint: endpoint.latency)
+
+
+def test_rest_ranking_drops_syncing_and_lagging(registry):
+    endpoint_ranking.clear_cache()
+    ranked = endpoint_ranking.rank_endpoints("alpha", "rest", registry=registry, max_lag=10)
+    assert sorted(endpoint.provider for endpoint in ranked) == ["behind", "fast"]
+    assert {endpoint.provider: endpoint.height for endpoint in ranked} == {"behind": 95, "fast": 100}
+    assert all(endpoint.address.endswith(endpoint.provider) for endpoint in ranked)
+
+
+def test_unknown_heights_rank_after_known_ones():
+    def result(provider, latency, height):
+        test = EndpointTest("alpha", "rest", provider, f"https://{provider}/cosmos/base/tendermint/v1beta1/syncing")
+        return ProbeResult(test, 200, latency, None, height, False)
+
+    # the fastest node's height couldn't be read, so it might be lagging
+    ranked = endpoint_ranking.select_endpoints([
+        result("unknown", 0.01, None), result("slow", 0.3, 100), result("fast", 0.1, 98), result("lagging", 0.05, 50),
+    ], max_lag=10)
+    assert [endpoint.provider for endpoint in ranked] == ["fast", "slow", "unknown"]
+    assert [endpoint.address for endpoint in ranked] == ["https://fast", "https://slow", "https://unknown"]
+
+    # with no heights at all, latency alone decides
+    ranked = endpoint_ranking.select_endpoints([result("b", 0.2, None), result("a", 0.1, None)])
+    assert [endpoint.provider for endpoint in ranked] == ["a", "b"]
+
+
+def test_rankings_are_cached(registry, tmp_path):
+    endpoint_ranking.clear_cache()
+    first = endpoint_ranking.rank_endpoints("alpha", "rpc", registry=registry, ttl=60)
+    assert endpoint_ranking.rank_endpoints("alpha", "rpc", registry=registry) is first
+    expired = endpoint_ranking.rank_endpoints("alpha", "rpc", registry=registry, max_lag=0, ttl=0)
+    assert [endpoint.provider for endpoint in expired] == ["fast"]
+    assert endpoint_ranking.rank_endpoints("alpha", "rpc", registry=registry, max_lag=0) is not expired
+
+    # another timeout or another registry with the same chain name is ranked afresh
+    assert endpoint_ranking.rank_endpoints("alpha", "rpc", registry=registry, timeout=1) is not first
+    shutil.copytree(registry.root, tmp_path / "copy")
+    other = load_registry(str(tmp_path / "copy"), use_cache=False)
+    assert endpoint_ranking.rank_endpoints("alpha", "rpc", registry=other) is not first
+
+
+def test_unknown_chain(registry):
+    with pytest.raises(KeyError):
+        endpoint_ranking.rank_endpoints("nope", registry=registry)
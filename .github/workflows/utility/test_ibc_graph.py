@@ -0,0 +1,75 @@
+import json
+import os
+
+import ibc_graph
+from chain_registry import load_registry
+
+
+def write_ibc(root, chain_1, chain_2, channels):
+    os.makedirs(os.path.join(root, "_IBC"), exist_ok=True)
+    data = {
+        "chain_1": {"chain_name": chain_1, "client_id": "07-tendermint-1", "connection_id": "connection-1"},
+        "chain_2": {"chain_name": chain_2, "client_id": "07-tendermint-2", "connection_id": "connection-2"},
+        "channels": [
+            {
+                "chain_1": {"channel_id": id_1, "port_id": port},
+                "chain_2": {"channel_id": id_2, "port_id": port},
+                "ordering": "unordered",
+                "version": "ics20-1",
+                "tags": tags,
+            }
+            for id_1, id_2, port, tags in channels
+        ],
+    }
+    with open(os.path.join(root, "_IBC", f"{chain_1}-{chain_2}.json"), "w") as f:
+        json.dump(data, f)
+
+
+def make_graph(root):
+    live_preferred = {"status": "live", "preferred": True}
+    write_ibc(root, "alpha", "beta", [("channel-0", "channel-10", "transfer", live_preferred)])
+    write_ibc(root, "alpha", "delta", [("channel-1", "channel-11", "transfer", {"status": "live"})])
+    write_ibc(root, "alpha", "gamma", [
+        ("channel-2", "channel-12", "transfer", {"status": "killed"}),
+        ("channel-3", "channel-13", "wasm.gamma1", {"status": "live"}),
+    ])
+    write_ibc(root, "beta", "gamma", [("channel-4", "channel-14", "transfer", live_preferred)])
+    write_ibc(root, "delta", "gamma", [("channel-5", "channel-15", "transfer", live_preferred)])
+    return ibc_graph.IbcGraph.from_registry(load_registry(root, use_cache=False))
+
+
+def test_channel_queries(tmp_path):
+    graph = make_graph(str(tmp_path))
+    assert [c.channel_id for c in graph.transfer_channels("alpha")] == ["channel-0", "channel-1"]
+    assert [c.channel_id for c in graph.transfer_channels("alpha", status=None)] == ["channel-0", "channel-1", "channel-2"]
+
+    from_gamma = graph.channels_between("gamma", "alpha")
+    assert [(c.chain, c.channel_id, c.counterparty_channel_id) for c in from_gamma] == [
+        ("gamma", "channel-12", "channel-2"),
+        ("gamma", "channel-13", "channel-3"),
+    ]
+    assert graph.transfer_channel("beta", "alpha").channel_id == "channel-10"
+    assert graph.transfer_channel("alpha", "gamma") is None
+
+
+def test_route_prefers_preferred_channels(tmp_path):
+    graph = make_graph(str(tmp_path))
+    route = graph.route("alpha", "gamma")
+    assert [(c.chain, c.channel_id) for c in route] == [("alpha", "channel-0"), ("beta", "channel-4")]
+    assert graph.route("alpha", "gamma", max_hops=1) == []
+    assert graph.route("alpha", "alpha") == []
+
+
+def test_saved_graph_is_reused_until_ibc_files_change(tmp_path):
+    root = str(tmp_path / "registry")
+    make_graph(root)
+    path = str(tmp_path / "graph.pickle")
+    registry = load_registry(root, use_cache=False)
+
+    built = ibc_graph.load_graph(path, registry)
+    loaded = ibc_graph.load_graph(path, registry)
+    assert loaded.channels == built.channels
+
+    write_ibc(root, "beta", "delta", [("channel-6", "channel-16", "transfer", {"status": "live"})])
+    rebuilt = ibc_graph.load_graph(path, load_registry(root, use_cache=False))
+    assert [c.counterparty for c in rebuilt.transfer_channels("beta")] == ["alpha", "delta", "gamma"]
@@ -0,0 +1,75 @@
+import json
+import os
+
+from ibc_validator import validate
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def channel(id_1, id_2, port="transfer", ordering="unordered", version="ics20-1"):
+    return {
+        "chain_1": {"channel_id": id_1, "port_id": port},
+        "chain_2": {"channel_id": id_2, "port_id": port},
+        "ordering": ordering,
+        "version": version,
+    }
+
+
+def write_ibc(root, file_name, chain_1, chain_2, channels):
+    write_json(os.path.join(root, file_name), {
+        "chain_1": {"chain_name": chain_1},
+        "chain_2": {"chain_name": chain_2},
+        "channels": channels,
+    })
+
+
+def test_validate(tmp_path):
+    root = str(tmp_path)
+    for directory in ("alpha", "beta", os.path.join("_non-cosmos", "gamma"), os.path.join("testnets", "betatestnet")):
+        os.makedirs(os.path.join(root, directory))
+    write_ibc(root, "_IBC/alpha-beta.json", "alpha", "beta", [
+        channel("channel-0", "channel-1"),
+        channel("channel-0", "*"),
+        channel("channel-2", "channel-3", "icahost", "ordered", "ics27-1"),
+        channel("channel-10", "channel-11", version=None),
+        channel("channel-12", "channel-13", version="ics20-2"),
+    ])
+    write_ibc(root, "_IBC/alpha-gamma.json", "alpha", "gamma", [
+        channel("channel-5", "channel-6", version="ics-20"),
+        channel("channel-7", "channel-8", "icahost", "unordered", "ics27-1"),
+        {"chain_1": {"channel_id": "channel-9"}, "chain_2": {"channel_id": "channel-9", "port_id": "transfer"},
+         "ordering": "sorted", "version": "x"},
+    ])
+    write_ibc(root, "_IBC/beta-alpha.json", "beta", "alpha", [])
+    write_ibc(root, "_IBC/alpha-delta.json", "alpha", "gamma", [])
+    write_ibc(root, "testnets/_IBC/alpha-betatestnet.json", "alpha", "betatestnet", [channel("channel-0", "channel-1")])
+    write_ibc(root, "_IBC/alpha.json", "alpha", "beta", [])
+    write_json(os.path.join(root, "_IBC", "alpha-zeta.json"), [])
+    with open(os.path.join(root, "_IBC", "bad-json.json"), "w") as f:
+        f.write("{")
+
+    results = validate(root)
+    assert results["_IBC/alpha-beta.json"] == [
+        "channels[1]: alpha transfer/channel-0 is also listed in this file",
+        "channels[3]: transfer channels use an ics20 version, not ''",
+    ]
+    assert results["_IBC/alpha-gamma.json"] == [
+        "channels[0]: transfer channels use an ics20 version, not 'ics-20'",
+        "channels[1]: ics27-1 channels are ordered, not unordered",
+        "channels[2]: chain_1 needs both a channel_id and a port_id",
+        "channels[2]: ordering must be 'ordered' or 'unordered', not 'sorted'",
+    ]
+    assert results["_IBC/beta-alpha.json"] == ["chains in the file name are not in alphabetical order"]
+    assert results["_IBC/alpha-delta.json"] == [
+        "no chain directory named delta",
+        "chain_1/chain_2 are alpha/gamma but the file name says alpha/delta",
+    ]
+    # mainnet chains don't count for testnet files
+    assert results["testnets/_IBC/alpha-betatestnet.json"] == ["no chain directory named alpha"]
+    assert results["_IBC/alpha.json"] == ["file name must look like <chain_1>-<chain_2>.json"]
+    assert results["_IBC/alpha-zeta.json"] == ["top level must be an object"]
+    assert results["_IBC/bad-json.json"][0].startswith("invalid JSON")
@@ -1,67 +1,24 @@
-import re
-import json
-from os import getcwd, listdir
-from os.path import isfile, isdir, join
+from os import getcwd
 
 import pytest
 
-mypathMainnets = join(getcwd(),"_IBC")
-mypathTestnets = join(getcwd(),"testnets","_IBC")
-ibcData_files_mainnet = [f for f in listdir(mypathMainnets) if isfile(join(mypathMainnets, f))]
-ibcData_files_testnet = [f for f in listdir(mypathTestnets) if isfile(join(mypathTestnets, f))]
-ibcData_files = ibcData_files_mainnet + ibcData_files_testnet
+from ibc_validator import validate
 
-@pytest.mark.parametrize("input", ibcData_files)
-def test_fileName(input):
-    # validates that the json file name has two "strings" separated by a hyphen (-) and ends with ".json"
-    pattern = re.compile(r'.*-.*.json$')
-    result = re.match(pattern, input)
-    assert result
+# every _IBC file is parsed and checked once; the tests only look up the results
+results = validate(getcwd())
 
-@pytest.mark.parametrize("input", ibcData_files)
-def test_alphabeticalOrder(input):
-    # validates that chain_1 and chain_2 in file name are in alphabetical order
-    pattern = re.compile(r'(.*)-(.*).json$')
-    m = pattern.match(input)
-    toSort = [(m.group(1)), (m.group(2))]
-    toSort.sort(key=str.lower)
-    assert (m.group(1) == toSort[0]) and (m.group(2) == toSort[1])
+# problems already in the data; strict, so the entry has to go once the file is fixed
+knownProblems = {
+    # "ics-20" is not an ics20 version string; to be corrected against what the chains report
+    "_IBC/axelar-composable.json": "transfer channel version is 'ics-20'",
+    "_IBC/axelar-sommelier.json": "transfer channel version is 'ics-20'",
+    "testnets/_IBC/babylontestnet-cosmoshubicstestnet.json": "there is no cosmoshubicstestnet chain directory",
+}
 
-@pytest.mark.parametrize("input", ibcData_files_mainnet)
-def test_chainNameMatchFileNameMainnets(input):
-    # validates for mainnet connections that the chain-name for chain-1 and chain-2 inside the json file match the order used in the file name.
-    pattern = re.compile(r'(.*)-(.*).json$')
-    m = pattern.match(input)
-    fileName_chain1 = m.group(1).lower()
-    fileName_chain2 = m.group(2).lower()
-    with open(join(mypathMainnets,input), "r") as read_file:
-        json_file = json.load(read_file)
-        chain_1 = str(json_file["chain_1"]["chain_name"]).lower()
-        chain_2 = str(json_file["chain_2"]["chain_name"]).lower()
-    assert fileName_chain1 == chain_1 and fileName_chain2 == chain_2
-
-@pytest.mark.parametrize("input", ibcData_files_testnet)
-def test_chainNameMatchFileNameTestnets(input):
-    # validates for testnet connections that the chain-name for chain-1 and chain-2 inside the json file match the order used in the file name.
-    pattern = re.compile(r'(.*)-(.*).json$')
-    m = pattern.match(input)
-    fileName_chain1 = m.group(1).lower()
-    fileName_chain2 = m.group(2).lower()
-    with open(join(mypathTestnets,input), "r") as read_file:
-        json_file = json.load(read_file)
-        chain_1 = str(json_file["chain_1"]["chain_name"]).lower()
-        chain_2 = str(json_file["chain_2"]["chain_name"]).lower()
-    assert fileName_chain1 == chain_1 and fileName_chain2 == chain_2
-
-@pytest.mark.parametrize("input", ibcData_files)
-    # validates that the chain-name's used exist as root folders on the chain-registry
-def test_existstsOnChainReg(input):
-    pattern = re.compile(r'(.*)-(.*).json$')
-    m = pattern.match(input)
-    chain1 = m.group(1).lower()
-    chain2 = m.group(2).lower()
-    non_cosmos = join('_non-cosmos')
-    testnets = join('testnets')
-    nc_testnets = join('testnets','_non-cosmos')
-    assert ((isdir(join(getcwd(),chain1)) or isdir(join(getcwd(),non_cosmos,chain1)) or isdir(join(getcwd(),testnets,chain1)) or isdir(join(getcwd(),nc_testnets,chain1))) and
-        (isdir(join(getcwd(),chain2)) or isdir(join(getcwd(),non_cosmos,chain2)) or isdir(join(getcwd(),testnets,chain1)) or isdir(join(getcwd(),nc_testnets,chain2))))
+@pytest.mark.parametrize("input", [
+    pytest.param(f, marks=pytest.mark.xfail(strict=True, reason=knownProblems[f])) if f in knownProblems else f
+    for f in results
+])
+def test_ibcData(input):
+    # validates the file name, the chain names against the file name and the chain directories, and the channels
+    assert results[input] == []
@@ -0,0 +1,70 @@
+import hashlib
+import json
+import os
+
+from chain_registry import load_registry
+from image_index import build_index, file_digests
+from link_checker import repoRawPrefix
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def write_bytes(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+def make_registry(root):
+    write_bytes(os.path.join(root, "alpha", "images", "a.png"), b"artwork")
+    write_bytes(os.path.join(root, "beta", "images", "a.png"), b"artwork")
+    write_bytes(os.path.join(root, "beta", "images", "b.svg"), b"<svg/>")
+    write_json(os.path.join(root, "alpha", "chain.json"), {
+        "chain_name": "alpha",
+        "logo_URIs": {"png": repoRawPrefix + "alpha/images/a.png"},
+        "images": [{"png": repoRawPrefix + "alpha/images/a.png", "svg": repoRawPrefix + "alpha/images/missing.svg"}],
+        "codebase": {"genesis": {"genesis_url": repoRawPrefix + "alpha/genesis.json"}},
+    })
+    write_json(os.path.join(root, "beta", "assetlist.json"), {"chain_name": "beta", "assets": [
+        {"base": "ub", "images": [{"png": repoRawPrefix + "beta/images/a.png"}]}]})
+
+
+def test_index(tmp_path):
+    root, cache_path = str(tmp_path / "registry"), str(tmp_path / "hashes.json")
+    make_registry(root)
+    registry = load_registry(root, use_cache=False)
+    index = build_index(registry=registry, cache_path=cache_path)
+    artwork = hashlib.sha256(b"artwork").hexdigest()
+    a_png, b_png = os.path.join("alpha", "images", "a.png"), os.path.join("beta", "images", "a.png")
+
+    assert index.hashed == 3 and len(index.files) == 2
+    assert index.duplicates() == {artwork: [a_png, b_png]}
+    assert index.duplicate_bytes() == len(b"artwork")
+    assert [(reference.file, reference.pointer) for reference in index.references_to(artwork)] == [
+        (os.path.join("alpha", "chain.json"), "/logo_URIs/png"),
+        (os.path.join("alpha", "chain.json"), "/images/0/png"),
+        (os.path.join("beta", "assetlist.json"), "/assets/0/images/0/png"),
+    ]
+    assert index.orphans() == [os.path.join("beta", "images", "b.svg")]
+    assert [(reference.path, reference.pointer) for reference in index.dangling] == [
+        (os.path.join("alpha", "images", "missing.svg"), "/images/0/svg")]
+    assert index.unique_images()[artwork] == a_png
+    data = index.to_json()
+    assert data["images"][artwork]["files"] == [a_png, b_png] and len(data["images"][artwork]["references"]) == 3
+
+    # hashes are reused until a file's size or mtime changes
+    assert build_index(registry=registry, cache_path=cache_path).hashed == 0
+    write_bytes(os.path.join(root, "beta", "images", "a.png"), b"new artwork")
+    index = build_index(registry=registry, cache_path=cache_path)
+    assert index.hashed == 1 and index.duplicates() == {}
+
+
+def test_file_digests(tmp_path):
+    root = str(tmp_path / "registry")
+    make_registry(root)
+    digests = file_digests(["./alpha/images/a.png", "alpha/images/missing.png"], root, str(tmp_path / "hashes.json"))
+    assert digests == {"./alpha/images/a.png": hashlib.sha256(b"artwork").hexdigest()}
@@ -0,0 +1,95 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import instrumentation
+from chain_registry import load_registry
+
+
+@pytest.fixture
+def tracing(tmp_path, monkeypatch):
+    path = str(tmp_path / "trace.json")
+    monkeypatch.setattr(instrumentation, "tracer", instrumentation.Tracer())
+    instrumentation.start(trace=path, memory=True)
+    yield path
+    instrumentation.finish()
+
+
+def read_trace(path):
+    instrumentation.finish()
+    with open(path) as f:
+        return json.load(f)
+
+
+def test_spans_only_while_tracing(tracing):
+    with instrumentation.span("outer", files=2) as span:
+        with instrumentation.span("inner"):
+            pass
+        span.set(errors=1)
+    with pytest.raises(KeyError):
+        with instrumentation.span("failing"):
+            raise KeyError("x")
+    trace = read_trace(tracing)
+
+    with instrumentation.span("after") as span:
+        span.set(ignored=True)
+    spans = {event["name"]: event for event in trace["traceEvents"] if event["ph"] == "X"}
+    assert set(spans) == {"outer", "inner", "failing"}
+    assert spans["outer"]["args"] == {"files": 2, "errors": 1}
+    assert spans["failing"]["args"] == {"error": "KeyError"}
+    assert spans["outer"]["ts"] <= spans["inner"]["ts"]
+    assert spans["inner"]["ts"] + spans["inner"]["dur"] <= spans["outer"]["ts"] + spans["outer"]["dur"]
+    assert trace["otherData"]["memory"]["peak_bytes"] > 0
+    assert "after" not in [event["name"] for event in instrumentation.tracer.events]
+
+
+def test_load_registry_reports_json_decode_time(tracing, tmp_path):
+    (tmp_path / "alpha").mkdir()
+    (tmp_path / "alpha" / "chain.json").write_text('{"chain_name": "alpha"}')
+    registry = load_registry(str(tmp_path), use_cache=False)
+    assert registry.files_parsed == 1 and 0 < registry.parse_seconds <= registry.load_seconds
+    load, = [event for event in read_trace(tracing)["traceEvents"] if event["name"] == "load_registry"]
+    assert load["args"]["files_parsed"] == 1
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"{}"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_requests_are_timed_per_host(tracing):
+    pytest.importorskip("aiohttp")
+    from endpoint_prober import EndpointTest, probe_endpoints
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host = f"127.0.0.1:{server.server_address[1]}"
+    try:
+        tests = [EndpointTest("stub", "rpc", "stub", f"http://{host}/{i}/status") for i in range(3)]
+        tests.append(EndpointTest("stub", "rpc", "down", "http://127.0.0.1:1/status"))
+        probe_endpoints(tests, timeout=2, limit_per_host=1)
+    finally:
+        server.shutdown()
+    trace = read_trace(tracing)
+
+    hosts = {entry["host"]: entry for entry in trace["otherData"]["hosts"]}
+    assert hosts[host]["requests"] == 3 and hosts[host]["errors"] == 0
+    assert hosts[host]["reused"] == 2
+    assert hosts["127.0.0.1:1"]["errors"] == 1
+    assert set(hosts[host]) >= {f"{phase}_ms_avg" for phase in instrumentation.requestPhases}
+    requests = [event for event in trace["traceEvents"] if event.get("cat") == "http"]
+    assert sorted(event["ph"] for event in requests) == ["b"] * 4 + ["e"] * 4
+    probe, = [event for event in trace["traceEvents"] if event["name"] == "probe"]
+    assert probe["args"] == {"endpoints": 4, "ok": 3}
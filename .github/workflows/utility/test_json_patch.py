@@ -0,0 +1,127 @@
+import json
+import os
+
+import pytest
+
+from json_patch import Patch, apply_patches, parse_pointer, patch_file, patch_files
+
+DOCUMENT = """{
+  "chain_name": "alpha",
+  "apis": {
+    "rpc": [
+      {
+        "address": "https://rpc.one",
+        "provider": "One"
+      },
+      {
+        "address": "https://rpc.two",
+        "provider": "Tw\\u00f6"
+      },
+      {
+        "address": "https://rpc.three",
+        "provider": "Three"
+      }
+    ],
+    "rest": []
+  },
+  "images": [{"png": "a.png"}],
+  "a/b": {"~c": 1}
+}
+"""
+
+
+def test_parse_pointer():
+    assert parse_pointer("") == []
+    assert parse_pointer("/a~1b/~0c/0") == ["a/b", "~c", "0"]
+    with pytest.raises(ValueError):
+        parse_pointer("a")
+
+
+def test_remove_keeps_the_rest_of_the_text():
+    patched = apply_patches(DOCUMENT, [Patch("remove", "/apis/rpc/2"), Patch("remove", "/apis/rpc/0")])
+    assert json.loads(patched)["apis"]["rpc"] == [{"address": "https://rpc.two", "provider": "Twö"}]
+    # the escape in the untouched entry is kept as written
+    assert patched == DOCUMENT.replace("""      {
+        "address": "https://rpc.one",
+        "provider": "One"
+      },
+""", "").replace(""",
+      {
+        "address": "https://rpc.three",
+        "provider": "Three"
+      }""", "")
+
+    only = apply_patches(patched, [Patch("remove", "/apis/rpc/0")])
+    assert '"rpc": []' in only
+    assert json.loads(only)["apis"]["rpc"] == []
+
+
+def test_pointers_refer_to_the_original_document():
+    def rpc_providers(patches):
+        return [api["provider"] for api in json.loads(apply_patches(DOCUMENT, patches))["apis"]["rpc"]]
+
+    assert rpc_providers([Patch("remove", "/apis/rpc/1"), Patch("remove", "/apis/rpc/2")]) == ["One"]
+    assert rpc_providers([Patch("remove", "/apis/rpc/0"), Patch("remove", "/apis/rpc/1")]) == ["Three"]
+    assert rpc_providers([Patch("remove", "/apis/rpc/0"), Patch("replace", "/apis/rpc/2/provider", "3"),
+                          Patch("add", "/apis/rpc/1", {"provider": "1.5"})]) == ["1.5", "Twö", "3"]
+    everything = [Patch("remove", f"/apis/rpc/{i}") for i in range(3)]
+    assert rpc_providers(everything + [Patch("add", "/apis/rpc/-", {"provider": "New"})]) == ["New"]
+    assert '"rpc": [],' in apply_patches(DOCUMENT, everything)
+
+
+def test_add_and_replace():
+    patched = apply_patches(DOCUMENT, [
+        Patch("add", "/apis/rest/-", {"address": "https://rest.one", "provider": "One"}),
+        Patch("add", "/apis/rpc/0", {"address": "https://rpc.zero", "provider": "Zero"}),
+        Patch("add", "/images/0/theme", {"primary_color_hex": "#5c09a0"}),
+        Patch("replace", "/chain_name", "alpha2"),
+        Patch("add", "/a~1b/~0c", 2),
+        Patch("add", "/pretty_name", "Alpha"),
+    ])
+    data = json.loads(patched)
+    assert data["apis"]["rest"] == [{"address": "https://rest.one", "provider": "One"}]
+    assert [api["provider"] for api in data["apis"]["rpc"]] == ["Zero", "One", "Twö", "Three"]
+    assert data["images"] == [{"png": "a.png", "theme": {"primary_color_hex": "#5c09a0"}}]
+    assert data["chain_name"] == "alpha2"
+    assert data["a/b"] == {"~c": 2}
+    assert list(data)[-1] == "pretty_name"
+    assert """    "rest": [
+      {
+        "address": "https://rest.one",
+        "provider": "One"
+      }
+    ]""" in patched
+    assert '  "images": [{"png": "a.png", "theme": {"primary_color_hex": "#5c09a0"}}],' in patched
+    assert patched.endswith('  "pretty_name": "Alpha"\n}\n')
+
+
+def test_compact_documents():
+    assert apply_patches('{"a":[1,2]}', [Patch("add", "/a/-", 3), Patch("add", "/b", {"c": 1})]) == \
+        '{"a":[1,2, 3], "b": {"c": 1}}'
+
+
+def test_bad_patches():
+    for patch in (Patch("remove", "/apis/rpc/9"), Patch("replace", "/nope", 1), Patch("add", "/apis/rpc/7", 1),
+                  Patch("move", "/chain_name"), Patch("add", "/chain_name/x", 1), Patch("remove", "")):
+        with pytest.raises(ValueError):
+            apply_patches(DOCUMENT, [patch])
+    for patches in ([Patch("remove", "/apis/rpc/0"), Patch("replace", "/apis/rpc/0/provider", "x")],
+                    [Patch("remove", "/apis/rpc/0"), Patch("remove", "/apis/rpc/0")],
+                    [Patch("add", "/x", 1), Patch("add", "/x", 2)]):
+        with pytest.raises(ValueError):
+            apply_patches(DOCUMENT, patches)
+
+
+def test_patch_file_only_writes_changes(tmp_path):
+    path = str(tmp_path / "chain.json")
+    with open(path, "w") as f:
+        f.write(DOCUMENT)
+    os.utime(path, ns=(0, 0))
+
+    assert patch_files({path: [Patch("replace", "/chain_name", "alpha")]}) == []
+    assert os.stat(path).st_mtime_ns == 0
+
+    assert patch_file(path, [Patch("replace", "/chain_name", "beta")])
+    with open(path) as f:
+        assert f.read() == DOCUMENT.replace('"alpha"', '"beta"')
+    assert not os.path.exists(path + ".tmp")
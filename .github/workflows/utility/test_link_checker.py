@@ -0,0 +1,123 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from chain_registry import load_registry
+from link_checker import (LinkLocation, LinkResult, check_links, extract_links, local_path, markdown_report,
+                          read_cache, repoRawPrefix, write_cache)
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def make_registry(root):
+    write_json(os.path.join(root, "alpha", "chain.json"), {
+        "chain_name": "alpha",
+        "logo_URIs": {"png": repoRawPrefix + "alpha/images/alpha.png", "svg": repoRawPrefix + "alpha/images/gone.svg"},
+        "explorers": [{"url": "https://explorer.example/alpha", "tx_page": "https://explorer.example/alpha/tx/${txHash}"}],
+    })
+    write_json(os.path.join(root, "alpha", "assetlist.json"), {"chain_name": "alpha", "assets": [
+        {"base": "ua", "logo_URIs": {"png": repoRawPrefix + "alpha/images/alpha.png"}, "coingecko_id": "alpha"}]})
+    write_json(os.path.join(root, "_IBC", "alpha-beta.json"), {
+        "chain_1": {"chain_name": "alpha"}, "chain_2": {"chain_name": "beta"},
+        "channels": [{"tags": {"source": "https://docs.example/a/b"}}]})
+    os.makedirs(os.path.join(root, "alpha", "images"))
+    open(os.path.join(root, "alpha", "images", "alpha.png"), "wb").close()
+
+
+def test_extract_links(tmp_path):
+    make_registry(str(tmp_path))
+    links = extract_links(load_registry(str(tmp_path), str(tmp_path / "cache.pickle")))
+    assert sorted(links) == sorted([
+        repoRawPrefix + "alpha/images/alpha.png", repoRawPrefix + "alpha/images/gone.svg",
+        "https://explorer.example/alpha", "https://docs.example/a/b"])
+    assert links[repoRawPrefix + "alpha/images/alpha.png"] == [
+        LinkLocation(os.path.join("alpha", "chain.json"), "/logo_URIs/png"),
+        LinkLocation(os.path.join("alpha", "assetlist.json"), "/assets/0/logo_URIs/png")]
+    assert links["https://docs.example/a/b"] == [LinkLocation(os.path.join("_IBC", "alpha-beta.json"),
+                                                              "/channels/0/tags/source")]
+
+
+def test_local_links(tmp_path):
+    make_registry(str(tmp_path))
+    assert local_path("https://example.com/x.png", str(tmp_path)) is None
+    assert local_path(repoRawPrefix + "alpha/images/a%20b.png", "/r") == os.path.join("/r", "alpha", "images", "a b.png")
+    links = [repoRawPrefix + "alpha/images/alpha.png", repoRawPrefix + "alpha/images/gone.svg"]
+    results, counts = check_links(links, str(tmp_path), network=False)
+    assert results[links[0]].status == 200 and results[links[1]].status == 404 and results[links[1]].local
+    assert counts == {"local": 2, "cached": 0, "checked": 0, "skipped": 0}
+
+
+def test_cache(tmp_path):
+    now = 1_000_000
+    cache = {
+        "https://fresh.example": LinkResult("https://fresh.example", 200, None, now - 60, False),
+        "https://stale.example": LinkResult("https://stale.example", 200, None, now - 8 * 86400, False),
+        "https://failed.example": LinkResult("https://failed.example", None, "Timeout", now - 60, False),
+    }
+    results, counts = check_links(list(cache) + ["https://new.example"], str(tmp_path), cache, network=False, now=now)
+    # only passing results younger than the ttl are reused, the rest would be checked again
+    assert list(results) == ["https://fresh.example"]
+    assert counts == {"local": 0, "cached": 1, "checked": 0, "skipped": 3}
+
+    path = str(tmp_path / "cache" / "link_check.json")
+    write_cache(path, {**cache,
+                       "https://limited.example": LinkResult("https://limited.example", 429, None, now, False),
+                       "local": LinkResult("local", 200, None, now, True)})
+    assert read_cache(path) == cache
+    with open(path, "w") as f:
+        json.dump({"version": 0, "results": {}}, f)
+    assert read_cache(path) == {} and read_cache(str(tmp_path / "missing.json")) == {}
+
+
+def test_markdown_report():
+    broken = [LinkResult("https://gone.example", 404, None, 0, False)]
+    report = markdown_report(broken, {"https://gone.example": [LinkLocation("alpha/chain.json", "/website")]})
+    assert "* [404] <https://gone.example>" in report and "`alpha/chain.json` `/website`" in report
+
+
+def test_check_urls(tmp_path):
+    pytest.importorskip("aiohttp")
+    from aiohttp import web
+
+    async def no_head(request):
+        # HEAD is answered 405 here, GET works
+        if request.method == "HEAD":
+            raise web.HTTPMethodNotAllowed("HEAD", ["GET"])
+        return web.Response(text="ok")
+
+    async def ok(request):
+        return web.Response(text="ok")
+
+    async def slow(request):
+        await asyncio.sleep(1.5)
+        return web.Response(text="late")
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/ok", ok)
+        app.router.add_route("*", "/no-head", no_head)
+        app.router.add_get("/slow", slow)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            base = f"http://127.0.0.1:{port}"
+            urls = [f"{base}/ok", f"{base}/no-head", f"{base}/missing", f"{base}/slow"]
+            loop = asyncio.get_running_loop()
+            return base, await loop.run_in_executor(None, lambda: check_links(urls, str(tmp_path), timeout=0.5))
+        finally:
+            await runner.cleanup()
+
+    base, (results, counts) = asyncio.run(main())
+    assert results[f"{base}/ok"].status == 200 and results[f"{base}/no-head"].status == 200
+    assert results[f"{base}/missing"].status == 404
+    assert results[f"{base}/slow"].status is None and results[f"{base}/slow"].error == "Timeout"
+    assert counts["checked"] == 4
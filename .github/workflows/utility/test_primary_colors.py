@@ -0,0 +1,112 @@
+import importlib.util
+import json
+import os
+
+import pytest
+
+pytest.importorskip("numpy")
+Image = pytest.importorskip("PIL.Image")
+
+import image_index  # noqa: E402
+from chain_registry import chainRegistryRoot  # noqa: E402
+from link_checker import repoRawPrefix  # noqa: E402
+
+# the script lives at the repository root, outside this directory
+spec = importlib.util.spec_from_file_location("primary_colors", os.path.join(chainRegistryRoot, "primary_colors.py"))
+primary_colors = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(primary_colors)
+
+RED, BLUE = (200, 30, 30, 255), (20, 40, 220, 255)
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def write_png(path, size, background, patch=None):
+    # a background color with an optional (color, box) patch painted over it
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    image = Image.new("RGBA", size, background)
+    if patch:
+        color, box = patch
+        image.paste(color, box)
+    image.save(path)
+
+
+def test_dominant_color(tmp_path):
+    png = str(tmp_path / "a.png")
+    write_png(png, (64, 64), RED, (BLUE, (0, 0, 64, 16)))
+    assert primary_colors.dominant_color(png) == "#c81e1e"
+
+    # white and transparent pixels don't count, however many there are
+    write_png(png, (64, 64), (255, 255, 255, 255), (BLUE, (0, 0, 8, 8)))
+    assert primary_colors.dominant_color(png) == "#1428dc"
+    write_png(png, (64, 64), (0, 0, 0, 0), (RED, (0, 0, 8, 8)))
+    assert primary_colors.dominant_color(png) == "#c81e1e"
+    write_png(png, (64, 64), (255, 255, 255, 255))
+    assert primary_colors.dominant_color(png) is None
+
+
+def test_failures_are_cached_as_none(tmp_path):
+    path = tmp_path / "broken.png"
+    path.write_bytes(b"not a png")
+    assert primary_colors.color_for_file(("digest", str(path))) == ("digest", None)
+
+
+def make_registry(root):
+    write_png(os.path.join(root, "alpha", "images", "red.png"), (32, 32), RED)
+    write_png(os.path.join(root, "beta", "images", "red.png"), (32, 32), RED)
+    write_png(os.path.join(root, "beta", "images", "blue.png"), (32, 32), BLUE)
+    with open(os.path.join(root, "beta", "images", "broken.png"), "wb") as f:
+        f.write(b"not a png")
+    write_json(os.path.join(root, "alpha", "chain.json"), {"chain_name": "alpha", "images": [
+        {"png": repoRawPrefix + "alpha/images/red.png"},
+        {"png": repoRawPrefix + "beta/images/blue.png", "theme": {"circle": True}},
+    ]})
+    write_json(os.path.join(root, "beta", "assetlist.json"), {"chain_name": "beta", "assets": [
+        {"base": "ub", "images": [{"png": repoRawPrefix + "beta/images/red.png"},
+                                  {"png": repoRawPrefix + "beta/images/broken.png"}]},
+        {"base": "uc", "images": [{"png": repoRawPrefix + "beta/images/blue.png", "theme": {"primary_color_hex": "#000000"}}]},
+    ]})
+
+
+def test_main(tmp_path, monkeypatch, capsys):
+    root, cache = tmp_path / "registry", str(tmp_path / "colors.json")
+    make_registry(str(root))
+    # main works on the current directory; keep the image hashes out of this repository's cache
+    monkeypatch.chdir(root)
+    monkeypatch.setattr(image_index, "defaultCachePath", str(tmp_path / "image_hashes.json"))
+    computed = []
+
+    def dominant_color(png):
+        computed.append(png)
+        return real_dominant_color(png)
+
+    real_dominant_color = primary_colors.dominant_color
+    monkeypatch.setattr(primary_colors, "dominant_color", dominant_color)
+
+    assert primary_colors.main(["--jobs", "1", "--cache", cache]) == 0
+    # the two identical red images are computed once
+    assert len(computed) == 3
+    assert "4 images without a primary color, 4 distinct files, 3 computed, 2 files updated" in capsys.readouterr().out
+    with open(root / "alpha" / "chain.json") as f:
+        assert [image.get("theme") for image in json.load(f)["images"]] == [
+            {"primary_color_hex": "#c81e1e"}, {"circle": True, "primary_color_hex": "#1428dc"}]
+    with open(root / "beta" / "assetlist.json") as f:
+        assets = json.load(f)["assets"]
+    assert [image.get("theme") for image in assets[0]["images"]] == [{"primary_color_hex": "#c81e1e"}, None]
+    assert assets[1]["images"][0]["theme"] == {"primary_color_hex": "#000000"}
+
+    # the broken image stays without a color, but its failure is cached with the other colors
+    with open(cache) as f:
+        colors = json.load(f)["colors"]
+    assert sorted(colors.values(), key=str) == ["#1428dc", "#c81e1e", None]
+
+    # nothing is recomputed on the next run, even for images whose files lost their colors again
+    make_registry(str(root))
+    computed.clear()
+    assert primary_colors.main(["--jobs", "1", "--cache", cache]) == 0
+    assert computed == []
+    assert "0 computed, 2 files updated" in capsys.readouterr().out
@@ -0,0 +1,69 @@
+import json
+import os
+import sqlite3
+
+import pytest
+
+import registry_bundle
+from chain_registry import load_registry
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def make_registry(root):
+    write_json(os.path.join(root, "alpha", "chain.json"), {"chain_name": "alpha", "chain_id": "alpha-1"})
+    write_json(os.path.join(root, "alpha", "assetlist.json"), {"chain_name": "alpha", "assets": [
+        {"base": "ua", "symbol": "A"}, {"base": "ushared", "symbol": "S"}]})
+    write_json(os.path.join(root, "alpha", "versions.json"), {"chain_name": "alpha", "versions": [{"name": "v1"}]})
+    write_json(os.path.join(root, "testnets", "betatestnet", "chain.json"), {"chain_name": "betatestnet"})
+    write_json(os.path.join(root, "testnets", "betatestnet", "assetlist.json"), {"chain_name": "betatestnet", "assets": [
+        {"base": "ushared", "symbol": "Ş"}]})
+    write_json(os.path.join(root, "_IBC", "alpha-gamma.json"), {
+        "chain_1": {"chain_name": "alpha"}, "chain_2": {"chain_name": "gamma"}, "channels": []})
+    return load_registry(root, use_cache=False)
+
+
+def test_round_trip(tmp_path):
+    registry = make_registry(str(tmp_path / "registry"))
+    path = str(tmp_path / "bundle.sqlite")
+    assert registry_bundle.export(path, registry) == 2
+    assert not os.path.exists(path + ".tmp")
+
+    with registry_bundle.open_bundle(path) as bundle:
+        for chain in registry.chains.values():
+            assert bundle.chain(chain.name) == chain.chain
+            assert bundle.assetlist(chain.name) == chain.assetlist
+            assert bundle.versions(chain.name) == chain.versions
+        assert bundle.chain("gamma") is None
+        assert bundle.chain_names() == ["alpha", "betatestnet"]
+        assert bundle.chain_names(network_type="testnet") == ["betatestnet"]
+        assert bundle.chains_by_id("alpha-1") == ["alpha"]
+        assert bundle.asset("alpha", "ua") == {"base": "ua", "symbol": "A"}
+        assert bundle.asset("alpha", "nope") is None
+        assert {chain: asset["symbol"] for chain, asset in bundle.assets_by_base("ushared").items()} == \
+            {"alpha": "S", "betatestnet": "Ş"}
+        assert bundle.ibc("gamma", "alpha") == registry.ibc[("alpha", "gamma")].data
+        assert bundle.ibc_counterparties("gamma") == ["alpha"]
+        with pytest.raises(ValueError):
+            bundle.chain_file("alpha", "name")
+
+
+def test_reader_is_read_only_and_checks_the_version(tmp_path):
+    path = str(tmp_path / "bundle.sqlite")
+    registry_bundle.export(path, make_registry(str(tmp_path / "registry")))
+    with registry_bundle.open_bundle(path) as bundle:
+        with pytest.raises(sqlite3.OperationalError):
+            bundle.connection.execute("DELETE FROM chains")
+
+    connection = sqlite3.connect(path)
+    connection.execute("UPDATE meta SET value = '0' WHERE key = 'version'")
+    connection.commit()
+    connection.close()
+    with pytest.raises(ValueError):
+        registry_bundle.open_bundle(path)
+    with pytest.raises(FileNotFoundError):
+        registry_bundle.open_bundle(str(tmp_path / "missing.sqlite"))
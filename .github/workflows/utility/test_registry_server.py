@@ -0,0 +1,106 @@
+import asyncio
+import gzip
+import json
+import os
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from aiohttp.test_utils import TestClient, TestServer  # noqa: E402
+
+from denom_traces import ibc_denom  # noqa: E402
+from registry_server import RegistryServer, accepts_gzip  # noqa: E402
+
+VOUCHER = ibc_denom("transfer/channel-1/ua")
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def make_registry(root):
+    write_json(os.path.join(root, "alpha", "chain.json"), {"chain_name": "alpha", "pretty_name": "A" * 300})
+    write_json(os.path.join(root, "alpha", "assetlist.json"), {"chain_name": "alpha", "assets": [{"base": "ua"}]})
+    write_json(os.path.join(root, "beta", "chain.json"), {"chain_name": "beta"})
+    write_json(os.path.join(root, "beta", "assetlist.json"), {"chain_name": "beta", "assets": [{
+        "base": VOUCHER,
+        "traces": [{"type": "ibc", "counterparty": {"chain_name": "alpha", "base_denom": "ua", "channel_id": "channel-0"},
+                    "chain": {"channel_id": "channel-1"}}]}]})
+    write_json(os.path.join(root, "_IBC", "alpha-beta.json"), {
+        "chain_1": {"chain_name": "alpha"}, "chain_2": {"chain_name": "beta"},
+        "channels": [{"chain_1": {"channel_id": "channel-0", "port_id": "transfer"},
+                      "chain_2": {"channel_id": "channel-1", "port_id": "transfer"}}]})
+
+
+def run(server, requests):
+    # requests: async function(client) run against the server's app
+    async def main():
+        async with TestClient(TestServer(server.app(poll=None))) as client:
+            return await requests(client)
+    return asyncio.run(main())
+
+
+def test_responses(tmp_path):
+    make_registry(str(tmp_path))
+    server = RegistryServer(str(tmp_path), str(tmp_path / "cache.pickle"))
+    server.load()
+
+    async def requests(client):
+        chains = await (await client.get("/chains")).json()
+        assert [chain["chain_name"] for chain in chains] == ["alpha", "beta"]
+
+        response = await client.get("/chains/alpha", headers={"Accept-Encoding": "identity"})
+        assert response.status == 200 and "Content-Encoding" not in response.headers
+        assert (await response.json())["chain_name"] == "alpha"
+        etag = response.headers["ETag"]
+
+        response = await client.get("/chains/alpha", headers={"Accept-Encoding": "gzip, deflate"}, auto_decompress=False)
+        assert response.headers["Content-Encoding"] == "gzip" and response.headers["ETag"] != etag
+        assert json.loads(gzip.decompress(await response.read()))["chain_name"] == "alpha"
+
+        for tag in (etag, f'W/{etag}', f'"other", {etag}', "*"):
+            response = await client.get("/chains/alpha", headers={"If-None-Match": tag})
+            assert response.status == 304 and await response.read() == b""
+        assert (await client.get("/chains/alpha", headers={"If-None-Match": '"other"'})).status == 200
+
+        # small bodies aren't worth compressing
+        response = await client.get("/chains/beta", headers={"Accept-Encoding": "gzip"}, auto_decompress=False)
+        assert "Content-Encoding" not in response.headers
+
+        assert (await (await client.get("/ibc/beta/alpha")).json())["chain_1"]["chain_name"] == "alpha"
+        denom = await (await client.get(f"/denoms/beta/{VOUCHER}")).json()
+        assert denom["origin_chain"] == "alpha" and denom["path"] == "transfer/channel-1/ua"
+        assert (await client.get("/chains/gamma")).status == 404
+        assert (await client.head("/chains/alpha")).status == 200
+    run(server, requests)
+
+
+def test_incremental_reload(tmp_path):
+    make_registry(str(tmp_path))
+    server = RegistryServer(str(tmp_path), str(tmp_path / "cache.pickle"))
+    server.load()
+    before = dict(server.responses)
+    assert server.load() == 0 and server.reloads == 1
+
+    write_json(os.path.join(str(tmp_path), "beta", "chain.json"), {"chain_name": "beta", "pretty_name": "Beta"})
+    assert server.load() == 1
+    assert json.loads(server.responses["/chains/beta"].body)["pretty_name"] == "Beta"
+    assert all(server.responses[path] is response for path, response in before.items() if path != "/chains/beta")
+
+    # a file that stops parsing keeps being served as it was
+    with open(os.path.join(str(tmp_path), "beta", "chain.json"), "w") as f:
+        f.write('{"chain_name": ')
+    server.load()
+    assert json.loads(server.responses["/chains/beta"].body)["pretty_name"] == "Beta"
+
+    os.remove(os.path.join(str(tmp_path), "_IBC", "alpha-beta.json"))
+    server.load()
+    assert "/ibc/alpha/beta" not in server.responses
+
+
+def test_accepts_gzip():
+    assert accepts_gzip("gzip") and accepts_gzip("br;q=1.0, gzip;q=0.5") and accepts_gzip("*")
+    assert not accepts_gzip("gzip;q=0") and not accepts_gzip("identity") and not accepts_gzip("")
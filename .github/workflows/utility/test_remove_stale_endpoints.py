@@ -0,0 +1,257 @@
+import asyncio
+import importlib.util
+import json
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from chain_registry import chainRegistryRoot  # noqa: E402
+from endpoint_history import open_history  # noqa: E402
+from endpoint_prober import EndpointTest, ProbeResult  # noqa: E402
+
+# the script's file name isn't a module name
+spec = importlib.util.spec_from_file_location(
+    "remove_stale_endpoints", os.path.join(chainRegistryRoot, "_scripts", "remove-stale-endpoints.py"))
+remove_stale_endpoints = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(remove_stale_endpoints)
+
+LONG_AGO = 1000
+RECENTLY = remove_stale_endpoints.epoch_time
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def make_registry(root, rpc, rest):
+    write_json(os.path.join(root, "alpha", "chain.json"), {"chain_name": "alpha", "apis": {
+        "rpc": [{"address": address, "provider": "P"} for address in rpc],
+        "rest": [{"address": address, "provider": "P"} for address in rest]}})
+    # testnets aren't on status.cosmos.directory, so they are never looked up
+    write_json(os.path.join(root, "testnets", "alphatestnet", "chain.json"), {"chain_name": "alphatestnet", "apis": {
+        "rpc": [{"address": rpc[0], "provider": "P"}]}})
+
+
+def read_apis(root):
+    with open(os.path.join(root, "alpha", "chain.json")) as f:
+        apis = json.load(f)["apis"]
+    return {api_type: [api["address"] for api in apis[api_type]] for api_type in apis}
+
+
+def status_of(addresses):
+    # address -> lastSuccessAt, as a status.cosmos.directory response for rpc only
+    return {"rpc": {"current": {address.rstrip("/"): {"lastSuccessAt": at} for address, at in addresses.items()}}}
+
+
+class StubServer:
+    # aiohttp on a local port, in its own thread since run() starts its own event loop:
+    # /alpha answers with `status`, /up/ with 200 and everything else with 404
+
+    def __init__(self, status):
+        self.status = status
+        self.url = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    async def _start(self):
+        from aiohttp import web
+
+        async def status(request):
+            return web.json_response(self.status)
+
+        async def up(request):
+            return web.json_response({"result": {}})
+
+        app = web.Application()
+        app.router.add_get("/alpha", status)
+        app.router.add_get("/up/", up)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    def __enter__(self):
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return self
+
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+def closed_port():
+    # nothing listens here, so a probe fails straight away
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_stale_candidates():
+    apis = {
+        "rpc": [{"address": "https://rpc.old/"}, {"address": "https://rpc.up"}, {"address": "https://rpc.unknown"}],
+        "rest": [{"address": "https://rest.old"}, {"address": "https://rest.up"}],
+    }
+    status = {
+        "rpc": {"current": {"https://rpc.old": {"lastSuccessAt": LONG_AGO}, "https://rpc.up": {"lastSuccessAt": RECENTLY}}},
+        "rest": {"current": {"https://rest.old": {"lastSuccessAt": -1}, "https://rest.up": {"lastSuccessAt": RECENTLY}}},
+    }
+    # the last rpc endpoint has no status; the rest endpoints must still be looked up in the chain's status
+    assert remove_stale_endpoints.stale_candidates("alpha", apis, status) == [
+        ("alpha", "rpc", "https://rpc.old/"), ("alpha", "rest", "https://rest.old")]
+
+    apis["rpc"].pop()
+    assert remove_stale_endpoints.stale_candidates("alpha", apis, status)[-1] == ("alpha", "rest", "https://rest.old")
+
+
+class StaticSource:
+
+    def __init__(self, statuses):
+        self.statuses = statuses
+
+    async def fetch(self, session, folder, timeout):
+        return self.statuses[folder]
+
+
+def test_one_broken_chain_does_not_stop_the_others():
+    address = f"http://127.0.0.1:{closed_port()}"
+    source = StaticSource({
+        "alpha": {"rpc": None},
+        "beta": {"rpc": {"current": {address: {"lastSuccessAt": LONG_AGO}}}},
+    })
+    to_check = [("alpha", {"rpc": [{"address": "https://rpc.alpha"}]}), ("beta", {"rpc": [{"address": address}]})]
+    decisions = asyncio.run(remove_stale_endpoints.find_stale_endpoints(to_check, source, 2, 4, {}))
+    assert decisions == [("beta", "rpc", address)]
+
+
+def test_history_must_cover_the_window(tmp_path):
+    path = str(tmp_path / "history.sqlite")
+    now = time.time()
+    with open_history(path) as history:
+        # never answered, but only watched for an hour
+        history.record([ProbeResult(EndpointTest("alpha", "rpc", "New", "https://rpc.new/status"), None, 2.0, "Timeout")],
+                       ts=now - 3600)
+        # never answered in two months
+        for days in (60, 1):
+            history.record([ProbeResult(EndpointTest("alpha", "rpc", "Old", "https://rpc.old/status"), None, 2.0, "Timeout")],
+                           ts=now - days * 86400)
+    source = remove_stale_endpoints.HistoryStatusSource(path)
+    status = asyncio.run(source.fetch(None, "alpha", 2))
+    apis = {"rpc": [{"address": "https://rpc.new"}, {"address": "https://rpc.old/"}]}
+    assert remove_stale_endpoints.stale_candidates("alpha", apis, status) == [("alpha", "rpc", "https://rpc.old/")]
+
+
+def test_run_from_snapshot(tmp_path):
+    root, snapshot = str(tmp_path / "registry"), str(tmp_path / "snapshot.json")
+    dead, fresh = f"http://127.0.0.1:{closed_port()}/", "https://rpc.fresh.example"
+    make_registry(root, rpc=[dead, fresh], rest=["https://rest.example"])
+    write_json(snapshot, {"alpha": status_of({dead: LONG_AGO, fresh: RECENTLY})})
+    before = read_apis(root)
+
+    args = remove_stale_endpoints.parse_args(["--root", root, "--status-snapshot", snapshot, "--timeout", "2", "--dry-run"])
+    assert remove_stale_endpoints.run(args) == {"alpha": [("rpc", dead)]}
+    assert read_apis(root) == before
+
+    args = remove_stale_endpoints.parse_args(["--root", root, "--status-snapshot", snapshot, "--timeout", "2"])
+    assert remove_stale_endpoints.run(args) == {"alpha": [("rpc", dead)]}
+    assert read_apis(root) == {"rpc": [fresh], "rest": ["https://rest.example"]}
+
+
+def test_run_against_stub_server(tmp_path):
+    root, snapshot = str(tmp_path / "registry"), str(tmp_path / "snapshot.json")
+    with StubServer(None) as stub:
+        down, up = f"{stub.url}/down", f"{stub.url}/up"
+        stub.status = status_of({down: LONG_AGO, up: LONG_AGO})
+        make_registry(root, rpc=[down, up], rest=[])
+        args = remove_stale_endpoints.parse_args(["--root", root, "--status-url", stub.url, "--timeout", "2",
+                                                  "--save-snapshot", snapshot, "--dry-run"])
+        # stale by its status, but a stale endpoint that answers again is kept
+        assert remove_stale_endpoints.run(args) == {"alpha": [("rpc", down)]}
+    with open(snapshot) as f:
+        assert json.load(f) == {"alpha": stub.status}
+
+
+CHAIN_JSON = """{
+  "$schema": "../chain.schema.json",
+  "chain_name": "alpha",
+  "status": "live",
+  "apis": {
+    "rpc": [
+      {
+        "address": "https://rpc.one/",
+        "provider": "One"
+      },
+      {
+        "address": "https://rpc.two",
+        "provider": "Two"
+      },
+      {
+        "address": "https://rpc.three",
+        "provider": "Three"
+      }
+    ],
+    "rest": [
+      {
+        "provider": "One",
+        "address": "https://rest.one"
+      },
+      {
+        "provider": "Two",
+        "address": "https://rest.two/"
+      }
+    ]
+  },
+  "bech32_prefix": "alpha"
+}
+"""
+
+
+def test_remove_endpoints(tmp_path):
+    root = str(tmp_path)
+    path = os.path.join(root, "alpha", "chain.json")
+    os.makedirs(os.path.dirname(path))
+    with open(path, "w") as f:
+        f.write(CHAIN_JSON)
+
+    # several removals in one write; addresses match with or without their trailing slash
+    remove_stale_endpoints.remove_endpoints("alpha", [
+        ("rpc", "https://rpc.one"), ("rpc", "https://rpc.three/"), ("rest", "https://rest.two/"),
+    ], root)
+    with open(path) as f:
+        text = f.read()
+    expected = json.loads(CHAIN_JSON)
+    del expected["apis"]["rpc"][2], expected["apis"]["rpc"][0], expected["apis"]["rest"][1]
+    assert json.loads(text) == expected
+    # everything else is as it was: key order, indentation, the trailing newline
+    assert list(json.loads(text)) == ["$schema", "chain_name", "status", "apis", "bech32_prefix"]
+    assert text == json.dumps(expected, indent=2) + "\n"
+    assert os.listdir(os.path.dirname(path)) == ["chain.json"]
+
+
+def test_remove_endpoints_failed_write(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    path = os.path.join(root, "alpha", "chain.json")
+    os.makedirs(os.path.dirname(path))
+    with open(path, "w") as f:
+        f.write(CHAIN_JSON)
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", fail)
+    with pytest.raises(OSError):
+        remove_stale_endpoints.remove_endpoints("alpha", [("rpc", "https://rpc.two")], root)
+    monkeypatch.undo()
+    with open(path) as f:
+        assert f.read() == CHAIN_JSON
+    assert os.listdir(os.path.dirname(path)) == ["chain.json"]
@@ -0,0 +1,55 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("jsonschema")
+
+import schema_validator  # noqa: E402
+from chain_registry import load_registry  # noqa: E402
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def make_registry(root):
+    for name in schema_validator.schemaFileNameMap:
+        write_json(os.path.join(root, schema_validator.schemaFileNameMap[name]), {
+            "$schema": "https://json-schema.org/draft-07/schema",
+            "type": "object",
+            "required": ["chain_name"] if name in ("chain", "assetlist") else [],
+            "properties": {"chain_name": {"type": "string"}, "assets": {"type": "array", "items": {
+                "type": "object", "required": ["base"]}}},
+        })
+    write_json(os.path.join(root, "alpha", "chain.json"), {"chain_name": "alpha"})
+    write_json(os.path.join(root, "alpha", "assetlist.json"), {"chain_name": "alpha", "assets": [{"base": "u"}, {}]})
+    write_json(os.path.join(root, "testnets", "betatestnet", "chain.json"), {"chain_name": 7})
+    write_json(os.path.join(root, "_IBC", "alpha-beta.json"), {
+        "chain_1": {"chain_name": "alpha"}, "chain_2": {"chain_name": "beta"}, "channels": []})
+    write_json(os.path.join(root, "_memo_keys", "ICS20_memo_keys.json"), {"memo_keys": []})
+    return load_registry(root, use_cache=False)
+
+
+def test_validate_files(tmp_path):
+    registry = make_registry(str(tmp_path))
+    report = schema_validator.validate_files(registry, jobs=1)
+    assert report["files_checked"] == 5
+    assert [(error["file"], error["path"], error["message"]) for error in report["errors"]] == [
+        (os.path.join("alpha", "assetlist.json"), "/assets/1", "'base' is a required property"),
+        (os.path.join("testnets", "betatestnet", "chain.json"), "/chain_name", "7 is not of type 'string'"),
+    ]
+    assert {name: timing["files"] for name, timing in report["schemas"].items()} == {
+        "chain": 2, "assetlist": 1, "versions": 0, "ibc_data": 1, "memo_keys": 1}
+    assert len(report["schemas"]["chain"]["slowest"]) == 2
+
+    only_ibc = schema_validator.validate_files(registry, schemas=["ibc_data"], jobs=1)
+    assert only_ibc["files_checked"] == 1 and only_ibc["errors"] == []
+
+
+def test_process_pool_gives_the_same_errors(tmp_path):
+    registry = make_registry(str(tmp_path))
+    assert schema_validator.validate_files(registry, jobs=2)["errors"] == \
+        schema_validator.validate_files(registry, jobs=1)["errors"]
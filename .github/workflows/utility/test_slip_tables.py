@@ -0,0 +1,56 @@
+import pytest
+
+import slip_tables
+
+SLIP44 = """# SLIP-0044 : Registered coin types for BIP-0044
+
+| Coin type  | Path component (`coinType + 2^31`) | Symbol  | Coin                              |
+| ---------- | ---------------------------------- | ------- | --------------------------------- |
+| 0          | 0x80000000                         | BTC     | [Bitcoin](https://bitcoin.org/)   |
+| 117        | 0x80000075                         |         |                                   |
+118        | 0x80000076                         | ATOM    | [Atom](https://cosmos.network)
+| 459        | 0x800001cb                         | KAVA    | Kava                              |
+"""
+
+SLIP173 = """# SLIP-0173 : Registered human-readable parts for BIP-0173
+
+| Coin                                          | Mainnet   | Testnet   | Regtest   |
+| --------------------------------------------- | --------- | --------- | --------- |
+| [Bitcoin](https://bitcoin.org/)               | `bc`      | `tb`      | `bcrt`    |
+| [Osmosis](https://osmosis.zone)               | `osmo`    |           |           |
+"""
+
+
+def test_parsers():
+    coins = slip_tables.parse_slip44(SLIP44.splitlines())
+    assert coins[0] == {"symbol": "BTC", "name": "Bitcoin", "website": "https://bitcoin.org/"}
+    assert coins[117]["name"] == ""
+    assert coins[118]["name"] == "Atom"
+    assert coins[459] == {"symbol": "KAVA", "name": "Kava", "website": ""}
+
+    chains = slip_tables.parse_slip173(SLIP173.splitlines())
+    assert chains["Bitcoin"] == {"website": "https://bitcoin.org/", "mainnet": "bc", "testnet": "tb"}
+    assert chains["Osmosis"] == {"website": "https://osmosis.zone", "mainnet": "osmo"}
+
+
+def test_refresh_and_lookups(tmp_path):
+    (tmp_path / "slip-0044.md").write_text(SLIP44)
+    (tmp_path / "slip-0173.md").write_text(SLIP173)
+    snapshot = str(tmp_path / "slip_tables.json")
+    slip_tables.main(["refresh", "--slip44", str(tmp_path / "slip-0044.md"),
+                      "--slip173", str(tmp_path / "slip-0173.md"), "--output", snapshot])
+
+    tables = slip_tables.load_tables(snapshot)
+    assert tables.coin_type("Atom") == 118
+    assert tables.coin_type("Reserved") is None
+    assert tables.coin(117)["name"] == ""
+    assert tables.prefixes("Osmosis")["mainnet"] == "osmo"
+    assert tables.chain_for_prefix("tb") == ("Bitcoin", "testnet")
+    assert len(tables.sources["slip-0044"]["sha256"]) == 64
+
+
+def test_missing_snapshot_is_an_error(tmp_path):
+    with pytest.raises(FileNotFoundError, match="slip_tables.py refresh"):
+        slip_tables.load_tables(str(tmp_path / "slip_tables.json"))
+    with pytest.raises(SystemExit):
+        slip_tables.main(["refresh", "--slip44", str(tmp_path / "slip-0044.md")])
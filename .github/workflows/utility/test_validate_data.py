@@ -0,0 +1,90 @@
+import json
+import os
+
+import validate_data
+from chain_registry import load_registry
+from validate_data import affectedChains, checkChain, checkChains
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def make_registry(root):
+    for name in ["alpha", "beta", "gamma", "delta"]:
+        write_json(os.path.join(root, name, "chain.json"), {"chain_name": name})
+    write_json(os.path.join(root, "alpha", "assetlist.json"), {
+        "chain_name": "alpha",
+        "assets": [{"base": "ibc/BETA", "traces": [{"type": "ibc", "counterparty": {"chain_name": "beta"}}]}],
+    })
+    write_json(os.path.join(root, "testnets", "alphatestnet", "chain.json"), {"chain_name": "alphatestnet"})
+    return load_registry(root, use_cache=False)
+
+
+def test_assetlist_change_pulls_in_trace_counterparties(tmp_path):
+    registry = make_registry(str(tmp_path))
+    assert affectedChains(registry, ["alpha/assetlist.json"]) == {"alpha", "beta"}
+    assert affectedChains(registry, ["gamma/images/gamma.png"]) == {"gamma"}
+    assert affectedChains(registry, [os.path.join("testnets", "alphatestnet", "chain.json")]) == {"alphatestnet"}
+
+
+def test_ibc_change_affects_both_chains(tmp_path):
+    registry = make_registry(str(tmp_path))
+    assert affectedChains(registry, [os.path.join("_IBC", "delta-gamma.json")]) == {"delta", "gamma"}
+
+
+def test_unrelated_and_full_run_changes(tmp_path):
+    registry = make_registry(str(tmp_path))
+    assert affectedChains(registry, ["README.md"]) == set()
+    assert affectedChains(registry, ["chain.schema.json", "alpha/chain.json"]) is None
+    assert affectedChains(registry, [os.path.join(".github", "workflows", "utility", "validate_data.py")]) is None
+
+
+def test_check_chain_reports_every_problem(monkeypatch):
+    chain = {"network_type": "mainnet", "pretty_name": "Alpha",
+             "fees": {"fee_tokens": [{"denom": "ualpha"}, {"denom": "umissing"}]},
+             "staking": {"staking_tokens": [{"denom": "uother"}]}}
+    assetlist = {"assets": [
+        {"base": "ualpha", "display": "alpha", "denom_units": [{"denom": "ualpha"}, {"denom": "alpha"}]},
+        {"base": "ubroken", "display": "broken", "denom_units": [{"denom": "ubroken"}]},
+    ]}
+    monkeypatch.setattr(validate_data, "checkSlip173", 0)
+    monkeypatch.setattr(validate_data, "checkSlip44", 0)
+    errors, notes = checkChain(chain, assetlist)
+    assert errors == [
+        "asset ubroken: display broken not in denom_units",
+        "fee_tokens: umissing is not in bases",
+        "staking_tokens: uother is not in bases",
+    ]
+    assert notes == []
+
+
+def test_check_chains_in_parallel_matches_serial(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    for name in ["alpha", "beta", "gamma"]:
+        write_json(os.path.join(root, name, "chain.json"), {
+            "chain_name": name, "network_type": "mainnet", "pretty_name": name,
+            "fees": {"fee_tokens": [{"denom": "u" + name}]},
+        })
+        write_json(os.path.join(root, name, "assetlist.json"), {"chain_name": name, "assets": [
+            {"base": "u" + name, "display": name if name != "beta" else "bad", "denom_units": [{"denom": "u" + name}, {"denom": name}]},
+        ]})
+    registry = load_registry(root, use_cache=False)
+    monkeypatch.setattr(validate_data, "checkSlip173", 0)
+    monkeypatch.setattr(validate_data, "checkSlip44", 0)
+
+    serial = checkChains(registry, jobs=1)
+    parallel = checkChains(registry, jobs=2)
+    assert serial["chains_checked"] == parallel["chains_checked"] == 3
+    assert serial["errors"] == parallel["errors"] == [
+        {"chain": "beta", "directory": "beta", "message": "asset ubeta: display bad not in denom_units"},
+    ]
+    assert len(serial["notes"]) == 3
+
+    # by default a full run uses every core and a run over selected chains stays in-process
+    monkeypatch.setattr(os, "cpu_count", lambda: 2)
+    full = checkChains(registry)
+    assert full["jobs"] == 2 and full["errors"] == parallel["errors"]
+    assert checkChains(registry, chainNames={"alpha", "beta"})["jobs"] == 1
@@ -0,0 +1,75 @@
+import json
+import os
+
+import versions_index
+from chain_registry import load_registry
+from versions_index import Binary, parse_binary
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def make_registry(root):
+    write_json(os.path.join(root, "alpha", "versions.json"), {"chain_name": "alpha", "versions": [
+        {"name": "v1", "height": 0, "next_version_name": "v2",
+         "binaries": {"linux/amd64": "https://x/alpha-1?checksum=sha256:ABCD"}},
+        {"name": "v2", "height": 100, "previous_version_name": "v1", "next_version_name": "v3",
+         "binaries": {"linux/amd64": "https://x/alpha-2"}},
+        {"name": "v3", "height": 250, "previous_version_name": "v2", "next_version_name": "v4"},
+    ]})
+    write_json(os.path.join(root, "testnets", "betatestnet", "versions.json"), {"chain_name": "betatestnet", "versions": [
+        {"name": "v1"},
+        {"name": "v2", "height": 50, "next_version_name": "v9"},
+        {"name": "v3", "height": 40, "previous_version_name": "v1"},
+        {"name": "v3", "height": 60},
+    ]})
+    return load_registry(root, use_cache=False)
+
+
+def test_lookup_by_height(tmp_path):
+    index = versions_index.VersionsIndex.from_registry(make_registry(str(tmp_path)))
+    assert [index.version_at("alpha", height).name for height in (0, 99, 100, 249, 250, 10**9)] == \
+        ["v1", "v1", "v2", "v2", "v3", "v3"]
+    assert index.version_at("alpha", -1) is None
+    assert index.version_at("gamma", 5) is None
+    assert index.binary_at("alpha", 7) == Binary("linux/amd64", "https://x/alpha-1?checksum=sha256:ABCD", "sha256", "abcd")
+    assert index.binary_at("alpha", 100) == Binary("linux/amd64", "https://x/alpha-2", None, None)
+    assert index.binary_at("alpha", 300) is None
+    assert index.binary_at("alpha", 7, "darwin/arm64") is None
+    # v1 has no height, so nothing is known before the first upgrade height
+    assert index.version_at("betatestnet", 45).name == "v3" and index.version_at("betatestnet", 10) is None
+    assert index.version("betatestnet", "v1").height is None
+
+
+def test_problems(tmp_path):
+    index = versions_index.VersionsIndex.from_registry(make_registry(str(tmp_path)))
+    # the last version may name an upgrade that isn't listed yet
+    assert index.problems() == {"betatestnet": [
+        "version v3 is listed twice",
+        "v3 upgrade height 40 is not above v2's 50",
+        "v2 next_version_name is 'v9', but the next version is 'v3'",
+        "v3 previous_version_name is 'v1', but the previous version is 'v2'",
+    ]}
+
+
+def test_parse_binary_guesses_the_checksum_type():
+    assert parse_binary("p", "https://x/b?checksum=" + "0" * 64).checksum_type == "sha256"
+    assert parse_binary("p", "https://x/b?checksum=md5:00").checksum_type == "md5"
+
+
+def test_saved_index_is_reused_until_a_file_changes(tmp_path):
+    registry = make_registry(str(tmp_path / "registry"))
+    path = str(tmp_path / "index.pickle")
+    versions_index.load_index(path, registry)
+    saved = os.stat(path).st_mtime_ns
+    index = versions_index.load_index(path, registry)
+    assert os.stat(path).st_mtime_ns == saved
+    assert index.version_at("alpha", 150).name == "v2"
+
+    write_json(os.path.join(registry.root, "alpha", "versions.json"),
+               {"chain_name": "alpha", "versions": [{"name": "v5", "height": 1}]})
+    index = versions_index.load_index(path, load_registry(registry.root, use_cache=False))
+    assert index.version_at("alpha", 150).name == "v5"
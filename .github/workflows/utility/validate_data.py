@@ -1,209 +1,296 @@
-import json
-import urllib.request
-import os
-from os import getcwd
-
-rootdir = getcwd()
-
-checkSlip173 = 1
-slipWebsites = {}
-slipMainnetPrefixes = {}
-slipTestnetPrefixes = {}
-
-def readSLIP173():
-    slip173URL = "https://raw.githubusercontent.com/satoshilabs/slips/master/slip-0173.md"
-    lines = []
-    for line in urllib.request.urlopen(slip173URL):
-      line = line.decode('utf-8')
-      if (len(line) > 2):
-        if (line[0] == "|" and line[2] == "["):
-          lines.append(line)
-    if lines:
-      for line in lines:
-        pretty = line[3:line.find("]")]
-        website = line[line.find("(")+1:line.find(")")]
-        slipWebsites[pretty] = website
-        secondPipe = line.find("|", 1)
-        thirdPipe = line.find("|", secondPipe + 1)
-        mainnetArea = line[secondPipe:thirdPipe]
-        firstQuote = mainnetArea.find("`")
-        if(firstQuote > 0):
-          secondQuote = mainnetArea.find("`", firstQuote + 1)
-          if(secondQuote > 0):
-            mainnetPrefix = mainnetArea[firstQuote + 1:secondQuote]
-            slipMainnetPrefixes[pretty] = mainnetPrefix
-          else:
-            print("Mainnet Bech32 Prefix undefined - missing second quote")
-        else:
-          print("Mainnet Bech32 Prefix undefined")
-        fourthPipe = line.find("|", thirdPipe + 1)
-        testnetArea = line[thirdPipe:fourthPipe]
-        firstQuote = testnetArea.find("`")
-        if(firstQuote > 0):
-          secondQuote = testnetArea.find("`", firstQuote + 1)
-          if(secondQuote > 0):
-            testnetPrefix = testnetArea[firstQuote + 1:testnetArea.find("`", firstQuote + 1)]
-            slipTestnetPrefixes[pretty] = testnetPrefix
-          else:
-            print("Mainnet Bech32 Prefix undefined - missing second quote")
-    else:
-      raise Exception("no SLIP-0173 entries recorded")
-
-checkSlip44 = 1
-slipCoinTypesByNum = {}
-slipCoinTypesByName = {}
-slip44Websites = {}
-
-def readSLIP44():
-    slip44URL = "https://raw.githubusercontent.com/satoshilabs/slips/master/slip-0044.md"
-    lines = []
-    for line in urllib.request.urlopen(slip44URL):
-      line = line.decode('utf-8')
-      if(len(line) > 6):
-        if(line[0] != "-" and line[0] != "C" and (line[5] == "|" or line[6] == "|" or line[7] == "|" or line[8] == "|" or line[9] == "|" or line[10] == "|" or line[11] == "|")):
-          lines.append(line)
-    if lines:
-      for line in lines:
-        coinNumber = int(line[0:line.find(" ")])
-        if(line.find("[") > 0):
-          pretty = line[line.find("[")+1:line.find("]")]
-          website = line[line.find("(")+1:line.find(")")]
-          slip44Websites[pretty] = website
-        else:
-          firstPipe = line.find("|")
-          secondPipe = line.find("|", firstPipe + 1)
-          thirdPipe = line.find("|", secondPipe + 1)
-          pretty = line[thirdPipe+2:len(line)-1]
-        slipCoinTypesByNum[coinNumber] = pretty
-        slipCoinTypesByName[pretty] = coinNumber
-    else:
-      raise Exception("no SLIP-0044 entries recorded")
-
-# -----FOR EACH CHAIN-----
-def checkChains():
-    for chainfolder in os.listdir(rootdir):
-        chainjson = os.path.join(chainfolder, "chain.json")
-        print(chainjson + "  - " + str(os.path.exists(chainjson)))
-        if not os.path.exists(chainjson):
-            continue
-        chainSchema = json.load(open(os.path.join(rootdir, chainjson)))
-        assetlistjson = os.path.join(chainfolder, "assetlist.json")
-        print(assetlistjson + "  - " + str(os.path.exists(assetlistjson)))
-        if not os.path.exists(assetlistjson):
-            continue
-        assetlistSchema = json.load(open(os.path.join(rootdir, assetlistjson)))
-        bases = []
-        if "assets" in assetlistSchema:
-          if assetlistSchema["assets"]:
-            for asset in assetlistSchema["assets"]:
-              assetDenoms = []
-              if "denom_units" in asset:
-                if asset["denom_units"]:
-                  for unit in asset["denom_units"]:
-                    if "denom" in unit:
-                      assetDenoms.append(unit["denom"])
-                    else:
-                      raise Exception("unit doesn't contain 'denom' string")
-                    if "aliases" in unit:
-                      for alias in unit["aliases"]:
-                        assetDenoms.append(alias)
-                else:
-                  raise Exception("'denon_units' array doesn't contain any units")
-              else:
-                raise Exception("asset doesn't contain 'denom_units' array")
-              if "base" in asset:
-                if asset["base"] in assetDenoms:
-                  bases.append(asset["base"])
-                else:
-                  raise Exception("base not in denom_units")
-              else:
-                raise Exception("asset doesn't contain 'base' string")
-              if "display" in asset:
-                if asset["display"] not in assetDenoms:
-                  raise Exception("display " + asset["display"] + " not in denom_units")
-              else:
-                raise Exception("asset doesn't contain 'display' string")
-          else:
-            raise Exception("'assets' array doesn't contain any tokens")
-        else:
-          raise Exception("assetlist schema doesn't contain 'assets' array")
-        if "fees" in chainSchema:
-          if "fee_tokens" in chainSchema["fees"]:
-            if chainSchema["fees"]["fee_tokens"]:
-              for token in chainSchema["fees"]["fee_tokens"]:
-                if "denom" in token:
-                  if token["denom"] not in bases:
-                    raise Exception(token["denom"] + " is not in bases")
-                else:
-                  raise Exception("token doesn't contain 'denom' string")
-            else:
-              raise Exception("'fee_tokens' array doesn't contain any tokens")
-          else:
-            raise Exception("'fees' object doesn't contain 'fee_tokens' array")
-        else:
-          print("[OPTIONAL - Keplr Compliance] chain schema doesn't contain 'fees' object")
-        if "staking" in chainSchema:
-          if "staking_tokens" in chainSchema["staking"]:
-            if chainSchema["staking"]["staking_tokens"]:
-              for token in chainSchema["staking"]["staking_tokens"]:
-                if "denom" in token:
-                  if token["denom"] not in bases:
-                    raise Exception(token["denom"] + " is not in bases")
-                else:
-                  raise Exception("token doesn't contain 'denom' string")
-            else:
-              raise Exception("'staking_tokens' array doesn't contain any tokens")
-          else:
-            raise Exception("'fees' object doesn't contain 'staking_tokens' array")
-        else:
-          print("[OPTIONAL - Keplr Compliance] chain schema doesn't contain 'staking' object")
-        if "network_type" in chainSchema:
-          networkType = chainSchema["network_type"]
-          if networkType == "mainnet":
-            slipPrefixes = slipMainnetPrefixes
-          elif networkType == "testnet":
-            slipPrefixes = slipTestnetPrefixes
-          else:
-            raise Exception("network type unknown (not Mainnet nor Testnet)")
-        else:
-          raise Exception("chain schema doesn't contain 'network_type'")
-        if "pretty_name" in chainSchema:
-          prettyName = chainSchema["pretty_name"]
-          if checkSlip173:
-            if "bech32_prefix" in chainSchema:
-              if prettyName == "Terra Classic" or prettyName == "Terra 2.0":
-                  prettyName = "Terra"
-              if prettyName in slipWebsites:
-                if prettyName in slipPrefixes:
-                  if chainSchema["bech32_prefix"] != slipPrefixes[prettyName]:
-                    raise Exception("chain.json bech32 prefix " + chainSchema["bech32_prefix"] + " does not match SLIP-0173 prefix " + slipPrefixes[prettyName])
-                else:
-                  raise Exception(prettyName + " SLIP-0173 registeration does not have prefix")
-              else:
-                raise Exception(prettyName + "  not registered to SLIP-0173")
-            else:
-              raise Exception(prettyName + " missing 'bech32_prefix'")
-          if checkSlip44:
-            if "slip44" in chainSchema:
-              coinType = chainSchema["slip44"]
-              if prettyName in slipCoinTypesByName:
-                if coinType != slipCoinTypesByName[prettyName]:
-                  raise Exception("Chain schema Coin Type " + str(coinType) + " does not equal slip44 registration " + str(slipCoinTypesByName[prettyName]))
-              else:
-                if coinType in slipCoinTypesByNum:
-                  if slipCoinTypesByNum[coinType] == "":
-                    raise Exception("Coin Type " + str(coinType) + " is unregistered in SLIP44")
-                else:
-                  raise Exception("Coin Type " + str(coinType) + " is unreserved in SLIP44")
-            else:
-              print("[OPTIONAL - Keplr Compliance] chain schema doesn't contain 'slip44' string")
-        else:
-          raise Exception("chainSchema does not contain 'pretty_name'")
-    print("Done")
-    
-def runAll():
-  if checkSlip173:
-    readSLIP173()
-  if checkSlip44:
-    readSLIP44()
-  checkChains()
+import argparse
+import json
+import subprocess
+import sys
+import time
+import os
+from concurrent.futures import ProcessPoolExecutor
+from os import getcwd
+
+import instrumentation
+import slip_tables
+from chain_registry import load_registry
+
+rootdir = getcwd()
+
+checkSlip173 = 1
+slipWebsites = {}
+slipMainnetPrefixes = {}
+slipTestnetPrefixes = {}
+
+def readSLIP173():
+    tables = readSlipTables()
+    for pretty, entry in tables.bech32.items():
+      slipWebsites[pretty] = entry["website"]
+      if "mainnet" in entry:
+        slipMainnetPrefixes[pretty] = entry["mainnet"]
+      if "testnet" in entry:
+        slipTestnetPrefixes[pretty] = entry["testnet"]
+
+checkSlip44 = 1
+slipCoinTypesByNum = {}
+slipCoinTypesByName = {}
+slip44Websites = {}
+
+def readSLIP44():
+    tables = readSlipTables()
+    for coinNumber, coin in tables.coins.items():
+      if coin["website"]:
+        slip44Websites[coin["name"]] = coin["website"]
+      slipCoinTypesByNum[coinNumber] = coin["name"]
+    slipCoinTypesByName.update(tables.coin_types_by_name)
+
+slipTables = None
+
+def readSlipTables():
+    # the vendored snapshot (slip_tables.json); a missing one is an error rather than a download
+    global slipTables
+    if slipTables is None:
+      slipTables = slip_tables.load_tables()
+    return slipTables
+
+# -----FOR EACH CHAIN-----
+def checkChain(chainSchema, assetlistSchema):
+    # returns (errors, notes) for one chain; every problem is recorded instead of stopping at the first
+    errors = []
+    notes = []
+    bases = []
+    if "assets" in assetlistSchema:
+      if assetlistSchema["assets"]:
+        for asset in assetlistSchema["assets"]:
+          assetLabel = "asset " + str(asset.get("base", asset.get("symbol", "?"))) + ": "
+          assetDenoms = []
+          if "denom_units" in asset:
+            if asset["denom_units"]:
+              for unit in asset["denom_units"]:
+                if "denom" in unit:
+                  assetDenoms.append(unit["denom"])
+                else:
+                  errors.append(assetLabel + "unit doesn't contain 'denom' string")
+                if "aliases" in unit:
+                  for alias in unit["aliases"]:
+                    assetDenoms.append(alias)
+            else:
+              errors.append(assetLabel + "'denon_units' array doesn't contain any units")
+          else:
+            errors.append(assetLabel + "asset doesn't contain 'denom_units' array")
+          if "base" in asset:
+            if asset["base"] in assetDenoms:
+              bases.append(asset["base"])
+            else:
+              errors.append(assetLabel + "base not in denom_units")
+          else:
+            errors.append(assetLabel + "asset doesn't contain 'base' string")
+          if "display" in asset:
+            if asset["display"] not in assetDenoms:
+              errors.append(assetLabel + "display " + asset["display"] + " not in denom_units")
+          else:
+            errors.append(assetLabel + "asset doesn't contain 'display' string")
+      else:
+        errors.append("'assets' array doesn't contain any tokens")
+    else:
+      errors.append("assetlist schema doesn't contain 'assets' array")
+    for section, tokens in (("fees", "fee_tokens"), ("staking", "staking_tokens")):
+      if section in chainSchema:
+        if tokens in chainSchema[section]:
+          if chainSchema[section][tokens]:
+            for token in chainSchema[section][tokens]:
+              if "denom" in token:
+                if token["denom"] not in bases:
+                  errors.append(tokens + ": " + token["denom"] + " is not in bases")
+              else:
+                errors.append(tokens + ": token doesn't contain 'denom' string")
+          else:
+            errors.append("'" + tokens + "' array doesn't contain any tokens")
+        else:
+          errors.append("'" + section + "' object doesn't contain '" + tokens + "' array")
+      else:
+        notes.append("[OPTIONAL - Keplr Compliance] chain schema doesn't contain '" + section + "' object")
+    slipPrefixes = None
+    if "network_type" in chainSchema:
+      networkType = chainSchema["network_type"]
+      if networkType == "mainnet":
+        slipPrefixes = slipMainnetPrefixes
+      elif networkType == "testnet":
+        slipPrefixes = slipTestnetPrefixes
+      else:
+        errors.append("network type unknown (not Mainnet nor Testnet)")
+    else:
+      errors.append("chain schema doesn't contain 'network_type'")
+    if "pretty_name" in chainSchema:
+      prettyName = chainSchema["pretty_name"]
+      if checkSlip173 and slipPrefixes is not None:
+        if "bech32_prefix" in chainSchema:
+          if prettyName == "Terra Classic" or prettyName == "Terra 2.0":
+              prettyName = "Terra"
+          if prettyName in slipWebsites:
+            if prettyName in slipPrefixes:
+              if chainSchema["bech32_prefix"] != slipPrefixes[prettyName]:
+                errors.append("chain.json bech32 prefix " + chainSchema["bech32_prefix"] + " does not match SLIP-0173 prefix " + slipPrefixes[prettyName])
+            else:
+              errors.append(prettyName + " SLIP-0173 registeration does not have prefix")
+          else:
+            errors.append(prettyName + "  not registered to SLIP-0173")
+        else:
+          errors.append(prettyName + " missing 'bech32_prefix'")
+      if checkSlip44:
+        if "slip44" in chainSchema:
+          coinType = chainSchema["slip44"]
+          if prettyName in slipCoinTypesByName:
+            if coinType != slipCoinTypesByName[prettyName]:
+              errors.append("Chain schema Coin Type " + str(coinType) + " does not equal slip44 registration " + str(slipCoinTypesByName[prettyName]))
+          else:
+            if coinType in slipCoinTypesByNum:
+              if slipCoinTypesByNum[coinType] == "":
+                errors.append("Coin Type " + str(coinType) + " is unregistered in SLIP44")
+            else:
+              errors.append("Coin Type " + str(coinType) + " is unreserved in SLIP44")
+        else:
+          notes.append("[OPTIONAL - Keplr Compliance] chain schema doesn't contain 'slip44' string")
+    else:
+      errors.append("chainSchema does not contain 'pretty_name'")
+    return errors, notes
+
+def slipState():
+    return (checkSlip173, checkSlip44, slipWebsites, slipMainnetPrefixes, slipTestnetPrefixes,
+            slipCoinTypesByNum, slipCoinTypesByName)
+
+def initWorker(state):
+    # worker processes get the SLIP tables from the parent instead of loading them again
+    global checkSlip173, checkSlip44
+    checkSlip173, checkSlip44 = state[0], state[1]
+    for table, values in zip((slipWebsites, slipMainnetPrefixes, slipTestnetPrefixes, slipCoinTypesByNum, slipCoinTypesByName), state[2:]):
+      table.clear()
+      table.update(values)
+
+def checkChainTask(task):
+    name, directory, chainSchema, assetlistSchema = task
+    errors, notes = checkChain(chainSchema, assetlistSchema)
+    return name, directory, errors, notes
+
+def checkChains(registry=None, chainNames=None, jobs=None):
+    # chainNames: only validate these chains (None = every chain)
+    # jobs: worker processes (None = one per core for a full run, 1 = validate in this process)
+    # returns a report with every error found; the caller decides whether to fail
+    if registry is None:
+        registry = load_registry(rootdir)
+    start = time.perf_counter()
+    tasks = []
+    for chain in registry.iter_chains("mainnet", "cosmos"):
+        if chainNames is not None and chain.name not in chainNames:
+            continue
+        if chain.chain is None or chain.assetlist is None:
+            continue
+        tasks.append((chain.name, chain.directory, chain.chain, chain.assetlist))
+    if jobs is None:
+        # a full run spreads over every core; the few chains an incremental run selects stay in-process
+        jobs = (os.cpu_count() or 1) if chainNames is None else 1
+    with instrumentation.span("check_chains", chains=len(tasks), jobs=jobs):
+        if jobs > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=jobs, initializer=initWorker, initargs=(slipState(),)) as pool:
+                results = list(pool.map(checkChainTask, tasks, chunksize=max(1, len(tasks) // (jobs * 4))))
+        else:
+            results = [checkChainTask(task) for task in tasks]
+    report = {"chains_checked": len(results), "jobs": jobs, "errors": [], "notes": []}
+    for name, directory, errors, notes in results:
+        for message in errors:
+            report["errors"].append({"chain": name, "directory": directory, "message": message})
+        for message in notes:
+            report["notes"].append({"chain": name, "directory": directory, "message": message})
+    report["seconds"] = round(time.perf_counter() - start, 3)
+    return report
+
+def printReport(report):
+    for note in report["notes"]:
+        print(note["directory"] + ": " + note["message"])
+    for error in report["errors"]:
+        print("[ERROR] " + error["directory"] + ": " + error["message"])
+    failedChains = len(set(error["chain"] for error in report["errors"]))
+    print(str(report["chains_checked"]) + " chains checked in " + str(report["seconds"]) + "s: " +
+          str(len(report["errors"])) + " errors in " + str(failedChains) + " chains")
+    print("Done")
+
+def runAll(registry=None, chainNames=None, jobs=None):
+  if chainNames is not None and not chainNames:
+    print("No chains affected")
+    return {"chains_checked": 0, "jobs": 0, "errors": [], "notes": [], "seconds": 0}
+  if checkSlip173:
+    with instrumentation.span("read_slip173"):
+      readSLIP173()
+  if checkSlip44:
+    with instrumentation.span("read_slip44"):
+      readSLIP44()
+  report = checkChains(registry, chainNames, jobs)
+  printReport(report)
+  return report
+
+# -----INCREMENTAL VALIDATION-----
+
+# changes to any of these mean every chain has to be validated again
+fullRunTriggers = (".schema.json", os.path.join(".github", "workflows", "utility") + os.sep)
+
+def changedFiles(ref):
+    # files changed relative to where the current branch forked from ref (incl. uncommitted)
+    base = subprocess.run(["git", "merge-base", ref, "HEAD"], cwd=rootdir, capture_output=True, text=True, check=True).stdout.strip()
+    diff = subprocess.run(["git", "diff", "--name-only", "--relative", base], cwd=rootdir, capture_output=True, text=True, check=True)
+    return [os.path.normpath(path) for path in diff.stdout.splitlines() if path]
+
+def affectedChains(registry, paths):
+    # returns the set of chain names to validate, or None when a full run is needed
+    directories = {chain.directory: chain.name for chain in registry.chains.values()}
+    direct = set()
+    for path in paths:
+        if path.endswith(fullRunTriggers[0]) or path.startswith(fullRunTriggers[1]):
+            return None
+        parts = path.split(os.sep)
+        if "_IBC" in parts:
+            connection = os.path.splitext(parts[-1])[0].split("-")
+            direct.update(name for name in connection if name in registry.chains)
+            continue
+        for depth in range(1, len(parts)):
+            directory = os.path.join(*parts[:depth])
+            if directory in directories:
+                direct.add(directories[directory])
+                break
+    affected = set(direct)
+    for chainName in direct:
+        for asset in registry.assets(chainName):
+            for trace in asset.get("traces", []):
+                counterparty = trace.get("counterparty", {}).get("chain_name")
+                if counterparty in registry.chains:
+                    affected.add(counterparty)
+    return affected
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate chain.json and assetlist.json data.")
+    parser.add_argument("--changed-since", metavar="REF",
+                        help="only validate chains affected by changes since REF (e.g. origin/master)")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: one per core for a full run, 1 with --changed-since)")
+    parser.add_argument("--report", metavar="FILE", help="also write the full report as JSON to FILE")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args(argv)
+    with instrumentation.instrumented(args):
+        registry = load_registry(rootdir)
+        chainNames = None
+        if args.changed_since:
+            try:
+                chainNames = affectedChains(registry, changedFiles(args.changed_since))
+            except (OSError, subprocess.CalledProcessError) as e:
+                print("Could not diff against " + args.changed_since + " (" + str(e) + "), validating every chain")
+            if chainNames is None:
+                print("Validating every chain")
+            else:
+                print("Validating " + str(len(chainNames)) + " affected chain(s): " + ", ".join(sorted(chainNames)))
+        try:
+            report = runAll(registry, chainNames, args.jobs)
+        except FileNotFoundError as e:
+            # no SLIP snapshot
+            print(e, file=sys.stderr)
+            return 1
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+# Purpose:
+#   to answer "which version (and binary) runs at block H on chain X" from the
+#   versions.json files: each chain's upgrades are kept sorted by height, so a
+#   lookup is a bisect. The versions are also checked: names must be unique,
+#   heights must increase down the list, and previous_version_name /
+#   next_version_name, where given, must name the neighbouring entries. The
+#   built index is saved with pickle and reused until a versions.json changes.
+#
+# Usage:
+#   index = versions_index.load_index()
+#   index.version_at("osmosis", 12_000_000).tag
+#   index.binary_at("osmosis", 12_000_000, "linux/amd64").checksum
+#
+#   python versions_index.py [--index FILE] build
+#   python versions_index.py check
+#   python versions_index.py at osmosis 12000000 [--platform linux/amd64]
+#
+# A version runs from its upgrade height up to the block before the next
+# upgrade. Versions without a height can be looked up by name but not by height.
+
+import argparse
+import bisect
+import os
+import pickle
+import sys
+from collections import namedtuple
+from urllib.parse import parse_qs, urlsplit
+
+from chain_registry import (chainRegistryRoot, domainToDirectoryNameMap, fileToFileNameMap, is_chain_directory_name,
+                            load_registry, networkTypeToDirectoryNameMap)
+
+Version = namedtuple("Version", [
+    "chain", "name", "tag", "height", "recommended_version", "binaries", "previous_version_name", "next_version_name",
+])
+
+# url as listed (go-getter style, with its ?checksum= query), checksum split out of it
+Binary = namedtuple("Binary", ["platform", "url", "checksum_type", "checksum"])
+
+defaultIndexPath = os.path.join(chainRegistryRoot, ".cache", "versions_index.pickle")
+INDEX_VERSION = 1
+
+# go-getter guesses the type of a checksum given without one from its length
+checksumTypesByLength = {32: "md5", 40: "sha1", 64: "sha256", 128: "sha512"}
+
+
+def versions_fingerprint(root=None):
+    # cheap summary of the versions.json files (paths, sizes, mtimes) to tell whether a saved index is stale
+    root = root or chainRegistryRoot
+    fingerprint = []
+    for network_directory in networkTypeToDirectoryNameMap.values():
+        for domain_directory in domainToDirectoryNameMap.values():
+            directory = os.path.join(network_directory, domain_directory)
+            try:
+                entries = os.scandir(os.path.join(root, directory))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                if not is_chain_directory_name(entry.name) or not entry.is_dir():
+                    continue
+                try:
+                    stat = os.stat(os.path.join(entry.path, fileToFileNameMap["versions"]))
+                except FileNotFoundError:
+                    continue
+                fingerprint.append((directory, entry.name, stat.st_size, stat.st_mtime_ns))
+    return sorted(fingerprint)
+
+
+def parse_binary(platform, url):
+    query = parse_qs(urlsplit(url).query)
+    checksum = query.get("checksum", [None])[0]
+    if checksum is None:
+        return Binary(platform, url, None, None)
+    if ":" in checksum:
+        checksum_type, checksum = checksum.split(":", 1)
+    else:
+        checksum_type = checksumTypesByLength.get(len(checksum))
+    return Binary(platform, url, checksum_type, checksum.lower())
+
+
+def check_versions(versions):
+    # -> [problem] for one chain's version list, in file order
+    problems = []
+    seen = set()
+    for version in versions:
+        if version.name in seen:
+            problems.append(f"version {version.name} is listed twice")
+        seen.add(version.name)
+    with_height = [version for version in versions if version.height is not None]
+    for before, after in zip(with_height, with_height[1:]):
+        if after.height <= before.height:
+            problems.append(f"{after.name} upgrade height {after.height} is not above {before.name}'s {before.height}")
+    for before, after in zip(versions, versions[1:]):
+        if before.next_version_name and before.next_version_name != after.name:
+            problems.append(f"{before.name} next_version_name is {before.next_version_name!r}, "
+                            f"but the next version is {after.name!r}")
+        if after.previous_version_name and after.previous_version_name != before.name:
+            problems.append(f"{after.name} previous_version_name is {after.previous_version_name!r}, "
+                            f"but the previous version is {before.name!r}")
+    return problems
+
+
+def _versions_from_data(chain_name, data):
+    versions = []
+    for entry in (data or {}).get("versions", []):
+        if not isinstance(entry, dict) or "name" not in entry:
+            continue
+        height = entry.get("height")
+        binaries = entry.get("binaries") or {}
+        versions.append(Version(
+            chain=chain_name,
+            name=entry["name"],
+            tag=entry.get("tag"),
+            height=int(height) if isinstance(height, (int, float)) else None,
+            recommended_version=entry.get("recommended_version"),
+            binaries=tuple(sorted((platform, url) for platform, url in binaries.items() if isinstance(url, str))),
+            previous_version_name=entry.get("previous_version_name"),
+            next_version_name=entry.get("next_version_name"),
+        ))
+    return versions
+
+
+class ChainVersions:
+
+    def __init__(self, chain, versions):
+        self.chain = chain
+        self.versions = versions                    # file order
+        self.by_name = {}                           # name -> Version (the last one listed, if repeated)
+        for version in versions:
+            self.by_name[version.name] = version
+        # sorted by height; a stable sort keeps the later entry last when two share a height
+        indexed = sorted((version for version in versions if version.height is not None), key=lambda v: v.height)
+        self.heights = [version.height for version in indexed]
+        self.indexed = indexed
+        self.problems = check_versions(versions)
+
+    def at(self, height):
+        # the version running at `height`, None before the first known upgrade
+        position = bisect.bisect_right(self.heights, height) - 1
+        return self.indexed[position] if position >= 0 else None
+
+
+class VersionsIndex:
+
+    def __init__(self):
+        self.chains = {}    # chain name -> ChainVersions
+
+    @classmethod
+    def from_versions(cls, versions):
+        index = cls()
+        by_chain = {}
+        for version in versions:
+            by_chain.setdefault(version.chain, []).append(version)
+        for chain, chain_versions in by_chain.items():
+            index.chains[chain] = ChainVersions(chain, chain_versions)
+        return index
+
+    @classmethod
+    def from_registry(cls, registry):
+        return cls.from_versions(
+            version
+            for chain in sorted(registry.chains.values(), key=lambda chain: chain.name)
+            for version in _versions_from_data(chain.name, chain.versions)
+        )
+
+    def version_at(self, chain, height):
+        chain_versions = self.chains.get(chain)
+        return chain_versions.at(height) if chain_versions else None
+
+    def version(self, chain, name):
+        chain_versions = self.chains.get(chain)
+        return chain_versions.by_name.get(name) if chain_versions else None
+
+    def binary_at(self, chain, height, platform="linux/amd64"):
+        # the Binary of the version running at `height`, None if unknown
+        version = self.version_at(chain, height)
+        if version is None:
+            return None
+        url = dict(version.binaries).get(platform)
+        return parse_binary(platform, url) if url else None
+
+    def problems(self):
+        # chain -> [problem], only chains that have some
+        return {chain: versions.problems for chain, versions in sorted(self.chains.items()) if versions.problems}
+
+    def save(self, path=None, fingerprint=None):
+        path = path or defaultIndexPath
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            # plain tuples, so the file doesn't depend on how this module was imported
+            versions = [tuple(version) for chain in sorted(self.chains) for version in self.chains[chain].versions]
+            pickle.dump((INDEX_VERSION, fingerprint, versions), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+
+
+def load_index(path=None, registry=None, rebuild=False):
+    # the saved index if it is up to date, otherwise build (and save) it from the registry
+    path = path or defaultIndexPath
+    root = registry.root if registry else None
+    fingerprint = versions_fingerprint(root)
+    if not rebuild:
+        try:
+            with open(path, "rb") as f:
+                version, saved_fingerprint, versions = pickle.load(f)
+            if version == INDEX_VERSION and saved_fingerprint == fingerprint:
+                return VersionsIndex.from_versions(Version._make(version) for version in versions)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+            pass
+    index = VersionsIndex.from_registry(registry or load_registry(root))
+    index.save(path, fingerprint)
+    return index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Look up chain versions and binaries by block height.")
+    parser.add_argument("--index", default=defaultIndexPath, help="saved index to use")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("build", help="rebuild the saved index from the versions.json files")
+    subparsers.add_parser("check", help="list version name, link and height problems")
+    at_parser = subparsers.add_parser("at", help="the version and binary running at a height")
+    at_parser.add_argument("chain")
+    at_parser.add_argument("height", type=int)
+    at_parser.add_argument("--platform", default="linux/amd64")
+    args = parser.parse_args(argv)
+
+    index = load_index(args.index, rebuild=args.command == "build")
+    if args.command == "build":
+        print(f"{sum(len(chain.versions) for chain in index.chains.values())} versions of "
+              f"{len(index.chains)} chains saved to {args.index}")
+        return 0
+    if args.command == "check":
+        problems = index.problems()
+        for chain, chain_problems in problems.items():
+            for problem in chain_problems:
+                print(f"{chain}: {problem}")
+        print(f"{len(index.chains)} chains checked, {len(problems)} with problems", file=sys.stderr)
+        return 1 if problems else 0
+    version = index.version_at(args.chain, args.height)
+    if version is None:
+        print(f"no known version of {args.chain} at height {args.height}", file=sys.stderr)
+        return 1
+    print(f"{args.chain} at {args.height}: {version.name} ({version.tag or 'no tag'}) since height {version.height}")
+    binary = index.binary_at(args.chain, args.height, args.platform)
+    if binary:
+        print(f"  {binary.platform}: {binary.url}")
+        print(f"  checksum: {binary.checksum_type}:{binary.checksum}" if binary.checksum else "  no checksum")
+    else:
+        print(f"  no {args.platform} binary listed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,30 +1,22 @@
+import argparse
+import asyncio
 import json
 import os
-import random as rand
+import sys
 import time
-from multiprocessing import Pool
+from typing import Optional
 
-import requests
+import aiohttp
 
 current_dir = os.path.dirname(os.path.realpath(__file__))
 parent_dir = os.path.dirname(current_dir)
-folders = [
-    folder
-    for folder in os.listdir(parent_dir)
-    if os.path.isdir(os.path.join(parent_dir, folder))
-]
-
-IGNORE_FOLDERS: list[str] = [
-    "_IBC",
-    "_memo_keys",
-    "_non-cosmos",
-    "_scripts",
-    "_template",
-    ".github",
-    "testnets",
-    ".git",
-    ".mypy_cache",
-]
+
+sys.path.insert(0, os.path.join(parent_dir, ".github", "workflows", "utility"))
+from chain_registry import load_registry  # noqa: E402
+from endpoint_history import open_history  # noqa: E402
+from endpoint_prober import EndpointTest, HostSlots, make_session, probe_endpoint  # noqa: E402
+import instrumentation  # noqa: E402
+from json_patch import Patch, patch_file  # noqa: E402
 
 IGNORE_CHAINS: list[str] = []
 
@@ -34,106 +26,223 @@ thirty_days_ago = epoch_time - (60 * 60 * 24 * 10 * 1_000)
 TIMEOUT_SECONDS = 10
                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                  
 
-# endpoint_type == 'rpc' or 'rest'
-def remove_endpoint(folder: str, endpoint_url, endpoint_type: str, iter_num: int = 0):
-    chain_dir = os.path.join(parent_dir, folder, f"chain.json")
-
-    if iter_num > 25:
-        print(f"ISSUE: {folder} {endpoint_type} {endpoint_url}")
-        return
+# removals: [(endpoint_type, endpoint_url), ...] where endpoint_type == 'rpc' or 'rest'
+def remove_endpoints(folder: str, removals: list[tuple[str, str]], root: str = parent_dir):
+    chain_dir = os.path.join(root, folder, "chain.json")
 
     with open(chain_dir, "r") as f:
-        try:
-            chain_data = json.load(f)
-        except Exception as e:
-            # multiprocessing 'patch'
-            time.sleep(rand.uniform(0.1, 5.0))
-            remove_endpoint(folder, endpoint_url, endpoint_type, iter_num + 1)
-            return
-
-    print(f"[-] {folder} {endpoint_type} {endpoint_url}")
-    apis: dict = chain_data.get("apis", {})
+        apis: dict = json.load(f).get("apis", {})
     if len(apis) == 0:
         return
 
-    # [{"address": "https://api.comdex.audit.one/rest","provider": "audit"},...]
-    endpoints = apis.get(endpoint_type, [])
+    indexes = set()
+    for endpoint_type, endpoint_url in sorted(removals):
+        print(f"[-] {folder} {endpoint_type} {endpoint_url}")
 
-    apis[endpoint_type] = [
-        endpoint
-        for endpoint in endpoints
-        if endpoint.get("address", "") != endpoint_url
-    ]
-    chain_data["apis"] = apis
+        # [{"address": "https://api.comdex.audit.one/rest","provider": "audit"},...]
+        for index, endpoint in enumerate(apis.get(endpoint_type, [])):
+            # the same endpoint with or without a trailing slash
+            if endpoint.get("address", "").rstrip("/") == endpoint_url.rstrip("/"):
+                indexes.add((endpoint_type, index))
 
-    with open(chain_dir, "w") as f:
-        json.dump(chain_data, f, indent=2, ensure_ascii=False)
+    # only the removed entries change in the file, which is replaced atomically
+    patch_file(chain_dir, [
+        Patch("remove", f"/apis/{endpoint_type}/{index}")
+        for endpoint_type, index in sorted(indexes)
+    ])
 
 
-def do_last_time(folder, _type, addr, last_time_endpoints):
-    # check when the last time it was on. If it is >30 days, remove from chain.json
-    last_online_time = last_time_endpoints[addr].get("lastSuccessAt", -1)
+STATUS_URL = "https://status.cosmos.directory"
+CONCURRENCY = 64
 
-    if last_online_time < thirty_days_ago:
-        try:
-            if addr.endswith("/"):
-                addr = addr[:-1]
 
-            query = requests.get(f"{addr}/", timeout=TIMEOUT_SECONDS)
-            if query.status_code not in [200, 501]:  # 501 = default REST API
-                remove_endpoint(folder, addr, _type)
+class DirectoryStatusSource:
+    # status.cosmos.directory, or anything serving the same /<chain> responses (e.g. a local stub)
 
-        except Exception:
-            remove_endpoint(folder, addr, _type)
+    def __init__(self, base_url: str = STATUS_URL):
+        self.base_url = base_url.rstrip("/")
 
+    async def fetch(self, session, folder: str, timeout: float) -> dict:
+        async with session.get(f"{self.base_url}/{folder}", timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
 
-def api_check(folder: str, apis: dict) -> list[str]:
-    tasks = []
-    res = requests.get(f"https://status.cosmos.directory/{folder}").json()
 
-    for _type in ["rpc", "rest"]:
-        last_time_endpoints = res[_type]["current"]
+class SnapshotStatusSource:
+    # a saved JSON object of {folder: status response}, see --save-snapshot
 
-        for rpc1 in apis[_type]:
-            for rpc2 in last_time_endpoints.keys():
-                addr = rpc1["address"]
-                if addr == rpc2:
-                    tasks.append([folder, _type, addr, last_time_endpoints])
+    def __init__(self, path: str):
+        with open(path) as f:
+            self.statuses = json.load(f)
 
-    return tasks
+    async def fetch(self, session, folder: str, timeout: float) -> dict:
+        if folder not in self.statuses:
+            raise KeyError(f"{folder} not in status snapshot")
+        return self.statuses[folder]
 
 
-def main():
-    to_check: list[str, dict[str, str]] = []
+class HistoryStatusSource:
+    # our own probe history (endpoint_history.py), shaped like a status.cosmos.directory response
 
-    for idx, folder in enumerate(folders):
-        if folder in IGNORE_FOLDERS + IGNORE_CHAINS:
-            continue
+    def __init__(self, path: str):
+        with open_history(path) as history:
+            self.endpoints = history.endpoints_by_chain()
+            self.first_seen = history.first_seen()
 
-        path = f"{parent_dir}/{folder}/chain.json"
-        if not os.path.exists(path):
-            continue
+    def covers_window(self, address: str) -> bool:
+        # an endpoint first probed inside the window may have been up before we started watching it
+        return self.first_seen.get(address, float("inf")) * 1000 <= thirty_days_ago
 
-        try:
-            apis: dict = json.loads(open(path).read())
-        except Exception:
-            print(f"[!] {folder} chain.json issue")
-            continue
+    async def fetch(self, session, folder: str, timeout: float) -> dict:
+        if folder not in self.endpoints:
+            raise KeyError(f"{folder} not in endpoint history")
+        return {
+            _type: {
+                "current": {
+                    address: {"lastSuccessAt": int(last_success * 1000) if last_success else -1}
+                    for address, last_success in endpoints.items()
+                    if self.covers_window(address)
+                }
+            }
+            for _type, endpoints in self.endpoints[folder].items()
+        }
 
-        apis = apis.get("apis", {})  # rpc, rest, grpc
 
-        if len(apis) == 0:
-            continue
+def is_stale(status: dict) -> bool:
+    # last time it was on was more than thirty days ago (or never)
+    return status.get("lastSuccessAt", -1) < thirty_days_ago
 
-        to_check.append([folder, apis])
 
-    with Pool(os.cpu_count() * 2) as p:
-        tasks = p.starmap(api_check, to_check)
+def stale_candidates(folder: str, apis: dict, status: dict) -> list[tuple[str, str, str]]:
+    candidates = []
+    for _type in ["rpc", "rest"]:
+        last_time_endpoints = status.get(_type, {}).get("current", {})
+
+        for api in apis.get(_type, []):
+            addr = api.get("address", "")
+            # the probe history stores addresses without a trailing slash
+            endpoint_status = last_time_endpoints.get(addr, last_time_endpoints.get(addr.rstrip("/")))
+            if endpoint_status is not None and is_stale(endpoint_status):
+                candidates.append((folder, _type, addr))
+
+    return candidates
+
+
+async def check_endpoint(session, semaphore, hosts, folder: str, _type: str, addr: str, timeout: float) -> Optional[tuple[str, str, str]]:
+    # a stale endpoint is only removed if it still doesn't answer
+    url = addr[:-1] if addr.endswith("/") else addr
+    test = EndpointTest(chain=folder, endpoint=_type, provider="", address=f"{url}/")
+    result = await probe_endpoint(session, test, timeout, semaphore, hosts=hosts)
+    if result.status not in [200, 501]:  # 501 = default REST API
+        print(f"[?] {folder} {_type} {addr} ({result.error or result.status})")
+        return folder, _type, addr
+    return None
+
+
+async def check_chain(session, semaphore, hosts, source, folder: str, apis: dict, timeout: float, statuses: dict) -> list[tuple[str, str, str]]:
+    try:
+        async with semaphore:
+            status = await source.fetch(session, folder, timeout)
+    except Exception as e:
+        print(f"[!] {folder} status unavailable: {type(e).__name__} {e}")
+        return []
+    statuses[folder] = status
+
+    # a chain that can't be checked keeps all its endpoints, without stopping the other chains
+    try:
+        decisions = await asyncio.gather(*[
+            check_endpoint(session, semaphore, hosts, folder, _type, addr, timeout)
+            for folder, _type, addr in stale_candidates(folder, apis, status)
+        ])
+    except Exception as e:
+        print(f"[!] {folder} could not be checked: {type(e).__name__} {e}")
+        return []
+    return [decision for decision in decisions if decision]
+
+
+async def find_stale_endpoints(to_check: list, source, timeout: float, concurrency: int, statuses: dict) -> list[tuple[str, str, str]]:
+    # status lookups and endpoint probes of all chains overlap on one pooled session
+    semaphore = asyncio.Semaphore(concurrency)
+    hosts = HostSlots()
+    async with make_session(concurrency) as session:
+        per_chain = await asyncio.gather(*[
+            check_chain(session, semaphore, hosts, source, folder, apis, timeout, statuses)
+            for folder, apis in to_check
+        ])
+    return [decision for decisions in per_chain for decision in decisions]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Remove endpoints that have been offline for a long time from chain.json files.")
+    parser.add_argument("--dry-run", action="store_true", help="only report which endpoints would be removed")
+    parser.add_argument("--status-url", default=STATUS_URL, help="base url of the status directory")
+    parser.add_argument("--status-snapshot", metavar="FILE", help="read statuses from a saved snapshot instead")
+    parser.add_argument("--status-history", metavar="FILE", help="read statuses from our own endpoint history database instead")
+    parser.add_argument("--save-snapshot", metavar="FILE", help="save the fetched statuses for offline re-runs")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT_SECONDS)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--root", default=parent_dir, help="registry root (default: this repository)")
+    instrumentation.add_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    with instrumentation.instrumented(args):
+        run(args)
+
+
+def run(args) -> dict[str, list[tuple[str, str]]]:
+    # -> folder -> [(endpoint_type, address)] removed (or, with --dry-run, to be removed)
+    if args.status_history:
+        source = HistoryStatusSource(args.status_history)
+    elif args.status_snapshot:
+        source = SnapshotStatusSource(args.status_snapshot)
+    else:
+        source = DirectoryStatusSource(args.status_url)
+
+    to_check: list[tuple[str, dict]] = []
+
+    # only mainnet cosmos chains are listed on status.cosmos.directory
+    registry = load_registry(args.root)
+    for path, _ in registry.errors:
+        if path.endswith("chain.json"):
+            print(f"[!] {os.path.dirname(path)} chain.json issue")
+
+    for chain in registry.iter_chains("mainnet", "cosmos"):
+        folder = chain.directory
+        if folder in IGNORE_CHAINS or chain.chain is None:
+            continue
 
-    tasks = [task for sublist in tasks for task in sublist]
+        apis: dict = chain.chain.get("apis", {})  # rpc, rest, grpc
+
+        if len(apis) == 0:
+            continue
 
-    with Pool(os.cpu_count() * 2) as p:
-        p.starmap(do_last_time, tasks)
+        to_check.append((folder, apis))
+
+    statuses: dict = {}
+    with instrumentation.span("find_stale_endpoints", chains=len(to_check)) as span:
+        decisions = asyncio.run(find_stale_endpoints(to_check, source, args.timeout, args.concurrency, statuses))
+        span.set(stale=len(decisions))
+
+    if args.save_snapshot:
+        with open(args.save_snapshot, "w") as f:
+            json.dump(statuses, f, indent=2, sort_keys=True)
+
+    # one read and one write per chain, after every decision is known
+    removals: dict[str, list[tuple[str, str]]] = {}
+    for folder, _type, addr in decisions:
+        removals.setdefault(folder, []).append((_type, addr))
+
+    with instrumentation.span("remove_endpoints", chains=len(removals)):
+        for folder in sorted(removals):
+            if args.dry_run:
+                for _type, addr in sorted(removals[folder]):
+                    print(f"[dry-run] {folder} {_type} {addr}")
+            else:
+                remove_endpoints(folder, removals[folder], args.root)
+    return removals
 
 
 if __name__ == "__main__":
@@ -1,72 +1,157 @@
-from colorthief import ColorThief
-
-import pathlib
+# Purpose:
+#   to fill in theme.primary_color_hex for every png image in the mainnet
+#   chain.json/assetlist.json files that doesn't have one yet. The dominant
+#   color is found with NumPy (a histogram of quantized colors over a
+#   downsampled copy of the image) in a process pool. Images are deduplicated by
+#   path and content hash (from image_index.py's hash cache), and computed colors
+#   are cached by content hash in .cache/primary_colors.json, so a re-run only
+#   processes new or changed images.
+#   Colors are written as JSON-pointer patches, leaving the rest of each file as is.
+#
+# Usage:
+#   python primary_colors.py [--jobs N] [--cache FILE]
+
+import argparse
 import json
+import os
+import pathlib
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
 
 
 chain_registry = pathlib.Path(".")
 
+sys.path.insert(0, str(chain_registry / ".github" / "workflows" / "utility"))
+from chain_registry import load_registry
+from image_index import file_digests
+from json_patch import Patch, patch_files
 
-def get_primary_color(png):
-    color_thief = ColorThief(png)
+default_cache_path = chain_registry / ".cache" / "primary_colors.json"
+# bump when dominant_color changes, so cached colors are recomputed
+COLOR_VERSION = 1
 
-    dominant_color = color_thief.get_color(quality=1)
+SAMPLE_SIZE = 128
+QUANT_BITS = 4
+# like ColorThief, pixels that are mostly transparent or nearly white don't count
+MIN_ALPHA = 125
+WHITE_LEVEL = 250
 
-    return "#%02x%02x%02x" % dominant_color
 
+def dominant_color(png):
+    with Image.open(png) as image:
+        image = image.convert("RGBA")
+        image.thumbnail((SAMPLE_SIZE, SAMPLE_SIZE))
+        pixels = np.asarray(image).reshape(-1, 4)
 
-def add_primary_color_to_image(image):
-    if "png" not in image.keys():
-        return
+    rgb = pixels[:, :3]
+    rgb = rgb[(pixels[:, 3] >= MIN_ALPHA) & ~np.all(rgb > WHITE_LEVEL, axis=1)]
+    if not len(rgb):
+        return None
 
-    if "theme" in image.keys() and "primary_color_hex" in image["theme"].keys():
-        return
+    # most common bucket of the quantized colors, reported as the mean of its pixels
+    buckets = (rgb >> (8 - QUANT_BITS)).astype(np.int32)
+    index = (buckets[:, 0] << (2 * QUANT_BITS)) | (buckets[:, 1] << QUANT_BITS) | buckets[:, 2]
+    top = np.bincount(index, minlength=1 << (3 * QUANT_BITS)).argmax()
+    r, g, b = np.rint(rgb[index == top].mean(axis=0)).astype(int)
+    return "#%02x%02x%02x" % (r, g, b)
 
-    png = image["png"]
-    png = png.replace(
-        "https://raw.githubusercontent.com/cosmos/chain-registry/master",
-        ".",
-    )
 
+def color_for_file(item):
+    digest, png = item
     try:
-        hex = get_primary_color(png)
-    except:
-        return
-
-    image.setdefault("theme", {})["primary_color_hex"] = hex
+        return digest, dominant_color(png)
+    except Exception:
+        return digest, None
 
-    print(image["theme"]["primary_color_hex"])
 
-    return image
-
-
-for item in chain_registry.rglob("*"):
-    if (
-        item.is_file()
-        and ("assetlist.json" in item.name or "chain.json" in item.name)
-        and "_template" not in item.parts
-        and "_IBC" not in item.parts
-        and "testnets" not in item.parts
-    ):
-        with open(item, "r+", encoding="utf-8") as f:
-            data = json.load(f)
-
-            if "images" in data.keys():
-                for image in data["images"]:
-                    new_image = add_primary_color_to_image(image)
-                    if new_image:
-                        image = new_image
+def local_png(image):
+    # the repo path of an image that still needs a primary color, else None
+    if "png" not in image.keys():
+        return None
 
-            if "assets" in data.keys():
-                for asset in data["assets"]:
+    if "theme" in image.keys() and "primary_color_hex" in image["theme"].keys():
+        return None
 
-                    print(asset["symbol"])
+    return image["png"].replace(
+        "https://raw.githubusercontent.com/cosmos/chain-registry/master",
+        ".",
+    )
 
-                    if "images" in asset.keys():
-                        for image in asset["images"]:
-                            new_image = add_primary_color_to_image(image)
-                            if new_image:
-                                image = new_image
 
-            print(data)
-            item.write_text(json.dumps(data, indent=2, ensure_ascii=False))
+def read_cache(path):
+    try:
+        cache = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+    return cache.get("colors", {}) if cache.get("version") == COLOR_VERSION else {}
+
+
+def write_cache(path, colors):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(path.name + ".tmp")
+    temp_path.write_text(json.dumps({"version": COLOR_VERSION, "colors": colors}, indent=0, sort_keys=True))
+    os.replace(temp_path, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Add theme.primary_color_hex to chain and asset images.")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--cache", type=pathlib.Path, default=default_cache_path, help="color cache file")
+    args = parser.parse_args(argv)
+
+    registry = load_registry(chain_registry)
+
+    # (file to patch, JSON pointer to the image, image, png path) for every image missing a color
+    targets = []
+    for chain in registry.iter_chains(network_type="mainnet"):
+        for file_name, data in (("chain.json", chain.chain), ("assetlist.json", chain.assetlist)):
+            if data is None:
+                continue
+            item = str(chain_registry / chain.directory / file_name)
+            images = [(f"/images/{i}", image) for i, image in enumerate(data.get("images", []))]
+            for a, asset in enumerate(data.get("assets", [])):
+                images.extend((f"/assets/{a}/images/{i}", image) for i, image in enumerate(asset.get("images", [])))
+            for pointer, image in images:
+                png = local_png(image)
+                if png:
+                    targets.append((item, pointer, image, png))
+
+    # content hashes come from the image index's hash cache (see image_index.py)
+    digests = file_digests({png for _, _, _, png in targets}, root=str(chain_registry))
+
+    colors = read_cache(args.cache)
+    todo = {}
+    for png, digest in sorted(digests.items()):
+        if digest not in colors:
+            todo.setdefault(digest, png)
+    if todo:
+        if args.jobs > 1 and len(todo) > 1:
+            with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+                colors.update(executor.map(color_for_file, todo.items(), chunksize=16))
+        else:
+            colors.update(map(color_for_file, todo.items()))
+        write_cache(args.cache, colors)
+
+    # patched in place, so the rest of each file keeps its formatting
+    patches = {}
+    for item, pointer, image, png in targets:
+        color = colors.get(digests.get(png))
+        if not color:
+            continue
+        if "theme" in image:
+            patch = Patch("add", f"{pointer}/theme/primary_color_hex", color)
+        else:
+            patch = Patch("add", f"{pointer}/theme", {"primary_color_hex": color})
+        patches.setdefault(item, []).append(patch)
+    changed = patch_files(patches)
+
+    print(f"{len(targets)} images without a primary color, {len(digests)} distinct files, "
+          f"{len(todo)} computed, {len(changed)} files updated")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())